@@ -1,7 +1,6 @@
 from dataclasses import dataclass
-import os
-import pyodbc
 from datetime import datetime
+from core.database import get_connection
 
 @dataclass
 class UserValidationResult:
@@ -34,14 +33,6 @@ def validate_user_credentials_in_db(username: str, password: str) -> bool:
             conn.close()
 
 
-def get_connection():
-    return pyodbc.connect(
-        f"SERVER={os.getenv('DB_SERVER')};"
-        f"DATABASE={os.getenv('DB_DATABASE')};"
-        f"UID={os.getenv('DB_USERNAME')};"
-        f"PWD={os.getenv('DB_PASSWORD')}"
-    )
-
 @dataclass
 class ScannerLoginResult:
     is_valid_user: bool
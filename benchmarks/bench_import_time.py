@@ -0,0 +1,86 @@
+"""
+Cold-start check: how long `import main` takes and which packages pay for it.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter and
+prints the cumulative import time per top-level package, heaviest first.
+Exits non-zero when the total exceeds --budget-ms, or when a package that
+should only load on first use (PDF/QR rendering, Twilio, Pillow, httpx)
+is imported at start-up.
+
+Run from the repo root:
+    python -m benchmarks.bench_import_time [--budget-ms 1500] [--top 15]
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+from collections import defaultdict
+
+# Only needed once a payment is issued / an image variant is rendered
+LAZY_MODULES = ("reportlab", "qrcode", "twilio", "PIL", "httpx", "Crypto", "cryptography", "jinja2")
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module: str = "main") -> list:
+    """
+    [(module, self_us, cumulative_us, depth)] as reported by -X importtime.
+    """
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=repo_root,
+        capture_output=True,
+        text=True
+    )
+
+    if result.returncode != 0:
+        tail = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise SystemExit("import failed:\n" + "\n".join(tail[-20:]))
+
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure `import main` cold-start time")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    rows = measure(args.module)
+
+    by_package = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+
+    total_ms = sum(self_us for _, self_us, _, _ in rows) / 1000
+    loaded = {name.split(".")[0] for name, _, _, _ in rows}
+
+    print(f"import {args.module}: {total_ms:.1f} ms ({len(rows)} modules)")
+    print(f"{'package':<30}{'ms':>10}")
+    for package, us in sorted(by_package.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"{package:<30}{us / 1000:>10.1f}")
+
+    failures = []
+    eager = [m for m in LAZY_MODULES if m in loaded]
+    if eager:
+        failures.append(f"imported at start-up: {', '.join(eager)}")
+    if total_ms > args.budget_ms:
+        failures.append(f"{total_ms:.1f} ms exceeds budget of {args.budget_ms:.0f} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Micro-benchmark: FastAPI default row serialization vs utils.fast_json.
+
+Default path:  dict(zip(columns, row)) -> jsonable_encoder -> json.dumps
+                (what a plain `return {...}` from an endpoint costs)
+Fast path:     rows_to_dicts -> orjson (json_response)
+
+Run from the repo root:
+    python -m benchmarks.bench_json_rows [rows] [repeats]
+"""
+import sys
+import json
+import time
+from datetime import date, datetime, time as dtime
+from decimal import Decimal
+from fastapi.encoders import jsonable_encoder
+from utils.fast_json import dumps, rows_to_dicts
+
+
+class FakeCursor:
+    # Shaped like the /getEventList query
+    description = [(name,) for name in (
+        "TicketMasterId", "EventDate", "EventDay", "Venue", "Country",
+        "CountryCode", "Currency", "EntryDateTime", "EntryUserMasterId",
+        "MaxLimit", "EventPostpone", "EventClose", "EventName", "EventTime",
+        "TicketRate"
+    )]
+
+
+def make_rows(n: int) -> list:
+    return [
+        (
+            i, date(2026, 1, 1), "Saturday", f"Venue {i}", "India",
+            "91", "INR", datetime(2025, 12, 1, 10, 30, i % 60), 1,
+            500, False, False, f"Event {i}", dtime(19, 30),
+            Decimal("1499.50")
+        )
+        for i in range(n)
+    ]
+
+
+def default_path(cursor, rows) -> bytes:
+    columns = [col[0] for col in cursor.description]
+    data = [dict(zip(columns, row)) for row in rows]
+    content = jsonable_encoder({"total_records": len(data), "tickets": data})
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(cursor, rows) -> bytes:
+    data = rows_to_dicts(cursor, rows)
+    return dumps({"total_records": len(data), "tickets": data})
+
+
+def bench(fn, cursor, rows, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(cursor, rows)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    cursor = FakeCursor()
+    rows = make_rows(n)
+
+    assert json.loads(default_path(cursor, rows)) == json.loads(fast_path(cursor, rows))
+
+    slow = bench(default_path, cursor, rows, repeats)
+    fast = bench(fast_path, cursor, rows, repeats)
+
+    print(f"rows={n} best of {repeats}")
+    print(f"jsonable_encoder + json : {slow * 1000:8.1f} ms  ({n / slow:,.0f} rows/s)")
+    print(f"orjson fast path        : {fast * 1000:8.1f} ms  ({n / fast:,.0f} rows/s)")
+    print(f"speedup                 : {slow / fast:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+QR payload comparison: legacy AES-ECB/base64 vs the compact codec.
+
+For each format prints the payload length, the QR symbol version qrcode
+picks (error correction Q, as on the tickets) and the time to build the
+symbol and save it as PNG.
+
+Run from the repo root:
+    python -m benchmarks.bench_qr_codec [repeats]
+"""
+import io
+import sys
+import time
+import base64
+from datetime import datetime
+from utils.qr_codec import QR_VERSION_ED25519, QR_VERSION_HMAC, encode_qr_payload
+
+
+def legacy_payload(ticket_issue_id: int, details_id: int) -> str:
+    from Crypto.Cipher import AES
+    from utils.utils import ENCRYPTION_KEY
+
+    raw = f"{ticket_issue_id}|{details_id}|{int(datetime.utcnow().timestamp())}".encode("utf-8")
+    raw += b" " * (16 - len(raw) % 16)
+    return base64.b64encode(AES.new(ENCRYPTION_KEY, AES.MODE_ECB).encrypt(raw)).decode("utf-8")
+
+
+def render(payload: str) -> int:
+    import qrcode
+
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_Q)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    qr.make_image(fill_color="black", back_color="white").save(io.BytesIO())
+    return qr.version
+
+
+def bench(name: str, payload: str, repeats: int):
+    started = time.perf_counter()
+    for _ in range(repeats):
+        version = render(payload)
+    per_code_ms = (time.perf_counter() - started) * 1000 / repeats
+
+    print(f"{name:<22}{len(payload):>8}{version:>10}{per_code_ms:>12.2f}")
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    ticket_issue_id, details_id = 123456, 654321
+
+    formats = [
+        ("legacy aes/base64", legacy_payload(ticket_issue_id, details_id)),
+        ("v1 hmac/base45", encode_qr_payload(ticket_issue_id, details_id, version=QR_VERSION_HMAC)),
+    ]
+
+    try:
+        formats.append(
+            ("v2 ed25519/base45", encode_qr_payload(ticket_issue_id, details_id, version=QR_VERSION_ED25519))
+        )
+    except RuntimeError:
+        print("QR_SIGNING_KEY not set, skipping v2")
+
+    print(f"{'format':<22}{'chars':>8}{'version':>10}{'ms/code':>12}")
+    for name, payload in formats:
+        bench(name, payload, repeats)
+
+
+if __name__ == "__main__":
+    main()
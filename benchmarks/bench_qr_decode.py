@@ -0,0 +1,78 @@
+"""
+Throughput of batch QR decoding: utils.utils.decode_qr_batch against
+decode_ticket_qr called once per code (what a loop over /qrScanner's
+decoder would do).
+
+The input mixes legacy AES codes, compact v1 codes and a few corrupted
+ones. Results of both paths are compared before timing.
+
+Run from the repo root:
+    python -m benchmarks.bench_qr_decode [codes] [repeats]
+"""
+import sys
+import time
+import logging
+from benchmarks.bench_qr_codec import legacy_payload
+from utils.qr_codec import QR_VERSION_HMAC, encode_qr_payload
+from utils.utils import QR_STATUS_OK, decode_qr_batch, decode_ticket_qr, logger
+
+
+def make_codes(n: int) -> list:
+    codes = []
+    for i in range(n):
+        if i % 50 == 49:
+            codes.append("NOT A TICKET")
+        elif i % 2:
+            codes.append(legacy_payload(100000 + i, 200000 + i))
+        else:
+            codes.append(encode_qr_payload(100000 + i, 200000 + i, version=QR_VERSION_HMAC))
+    return codes
+
+
+def single_path(codes: list) -> list:
+    results = []
+    for code in codes:
+        try:
+            payload = decode_ticket_qr(code)
+            results.append((payload.ticket_issue_id, payload.details_id))
+        except ValueError:
+            results.append(None)
+    return results
+
+
+def batch_path(codes: list) -> list:
+    return [
+        (ticket_issue_id, details_id) if status == QR_STATUS_OK else None
+        for ticket_issue_id, details_id, _, status in decode_qr_batch(codes).rows()
+    ]
+
+
+def bench(fn, codes: list, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(codes)
+        best = min(best, time.perf_counter() - started)
+    return len(codes) / best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    # The single path logs every bad code
+    logger.setLevel(logging.CRITICAL)
+
+    codes = make_codes(n)
+    assert single_path(codes) == batch_path(codes), "batch and single decode disagree"
+
+    single = bench(single_path, codes, repeats)
+    batch = bench(batch_path, codes, repeats)
+
+    print(f"{n} codes, best of {repeats}")
+    print(f"single decode_ticket_qr: {single:>12,.0f} codes/s")
+    print(f"decode_qr_batch:         {batch:>12,.0f} codes/s  ({batch / single:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
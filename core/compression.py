@@ -0,0 +1,169 @@
+import zlib
+from core.config import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_SIZE = settings.compression_min_size
+GZIP_LEVEL = settings.gzip_level
+BROTLI_QUALITY = settings.brotli_quality
+# Latency-sensitive endpoints with tiny bodies, never worth compressing
+COMPRESSION_EXCLUDE_PATHS = settings.compression_exclude_paths
+
+# Already compressed formats
+_SKIP_CONTENT_TYPES = ("image/", "video/", "audio/", "application/zip", "application/gzip", "application/pdf")
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """
+    Picks br or gzip from an Accept-Encoding header, honouring q=0.
+    """
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token.strip()] = q
+
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._c = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        # Flushed so every streamed chunk reaches the client right away
+        if self.encoding == "br":
+            return self._c.process(data) + self._c.flush()
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._c.process(data) + self._c.finish()
+        return self._c.compress(data) + self._c.flush()
+
+
+class CompressionMiddleware:
+    """
+    gzip/brotli response compression (pure ASGI).
+
+    Single-body responses are compressed only above minimum_size.
+    Streaming responses (StreamingResponse exports) are compressed chunk by
+    chunk without buffering. Paths in exclude_paths are passed through.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        gzip_level: int = GZIP_LEVEL,
+        brotli_quality: int = BROTLI_QUALITY,
+        exclude_paths: tuple = COMPRESSION_EXCLUDE_PATHS
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+
+        encoding = negotiate_encoding(accept) if accept else None
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send):
+        self.mw = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start_message = None
+        self.compressor = None
+        self.passthrough = False
+
+    def _headers(self) -> list:
+        return list(self.start_message.get("headers", []))
+
+    async def _start(self, headers: list):
+        self.start_message["headers"] = headers
+        await self.send(self.start_message)
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = {k.lower(): v for k, v in message.get("headers", [])}
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+
+            if b"content-encoding" in headers or content_type.startswith(_SKIP_CONTENT_TYPES):
+                self.passthrough = True
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            # First body message decides between buffered and streaming mode
+            if not more_body and len(body) < self.mw.minimum_size:
+                self.passthrough = True
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+
+            self.compressor = _Compressor(self.encoding, self.mw.gzip_level, self.mw.brotli_quality)
+            headers = [
+                (k, v) for k, v in self._headers()
+                if k.lower() not in (b"content-length", b"content-encoding")
+            ]
+            headers.append((b"content-encoding", self.encoding.encode("ascii")))
+            headers.append((b"vary", b"Accept-Encoding"))
+
+            if not more_body:
+                compressed = self.compressor.finish(body)
+                headers.append((b"content-length", str(len(compressed)).encode("ascii")))
+                await self._start(headers)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+
+            await self._start(headers)
+
+        if more_body:
+            chunk = self.compressor.chunk(body)
+            if chunk:
+                await self.send({"type": "http.response.body", "body": chunk, "more_body": True})
+        else:
+            await self.send({"type": "http.response.body", "body": self.compressor.finish(body)})
@@ -0,0 +1,243 @@
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from dotenv import load_dotenv
+
+
+def _int(name: str, default: int | None) -> int | None:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def _bool(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.lower() in ("1", "true", "yes")
+
+
+def _list(name: str, default: str) -> tuple:
+    return tuple(v.strip() for v in os.getenv(name, default).split(",") if v.strip())
+
+
+@dataclass(frozen=True)
+class Settings:
+    # Database
+    db_server: str | None
+    db_database: str | None
+    db_username: str | None
+    db_password: str | None
+    slow_query_ms: float
+
+    # Logging / admin
+    log_level: str
+    admin_token: str | None
+    health_cache_ttl: float
+    health_check_timeout: float
+    admin_list_count_ttl: float
+    stall_availability_cache_ttl: float
+
+    # QR payload keys
+    encryption_key: bytes
+    qr_hmac_key: bytes | None
+    qr_signing_key: str | None
+
+    # SMTP
+    email_host: str | None
+    email_port: int | None
+    email_user: str | None
+    email_password: str | None
+    email_from: str | None
+
+    # Event images
+    image_base_path: str
+    image_base_url: str | None
+    image_variant_widths: tuple
+    image_variant_webp_quality: int
+    image_variant_jpeg_quality: int
+    event_page_cache_ttl: float
+
+    # Ticket artifacts
+    qr_path: str
+    pdf_path: str
+
+    # Twilio WhatsApp
+    twilio_account_sid: str | None
+    twilio_auth_token: str | None
+    twilio_service_id: str | None
+    twilio_content_sid: str | None
+    twilio_notice_content_sid: str | None
+
+    # Razorpay
+    razorpay_api_url: str
+    razorpay_key_id: str | None
+    razorpay_key_secret: str | None
+    razorpay_timeout: float
+    razorpay_connect_timeout: float
+    razorpay_max_connections: int
+    razorpay_webhook_secret: str | None
+    webhook_queue_path: str
+    webhook_batch_size: int
+    webhook_max_attempts: int
+    webhook_process_interval: float
+
+    # Enquiry write-behind buffer
+    enquiry_spill_dir: str
+    enquiry_batch_size: int
+    enquiry_flush_interval: float
+    enquiry_rate_cache_ttl: float
+    enquiry_followup_interval: float
+    enquiry_followup_batch_size: int
+    enquiry_followup_max_age_days: int
+
+    # Event notice fan-out
+    notify_job_dir: str
+    notify_page_size: int
+    notify_email_rate: float
+    notify_email_workers: int
+    notify_whatsapp_rate: float
+    notify_whatsapp_workers: int
+
+    # Bulk CSV import
+    bulk_import_chunk_size: int
+    bulk_import_max_rows: int
+
+    # Inventory
+    inventory_hold_seconds: int
+    inventory_sweep_interval: float
+    inventory_reconcile_interval: float
+
+    # Waiting room
+    waiting_room_enabled: bool
+    waiting_room_secret: str | None
+    waiting_room_admit_rate: float
+    waiting_room_burst: int
+    waiting_room_queue_token_ttl: int
+    waiting_room_admission_ttl: int
+
+    # Compression
+    compression_min_size: int
+    gzip_level: int
+    brotli_quality: int
+    compression_exclude_paths: tuple
+
+    # Profiling
+    profile_token: str | None
+    profile_dir: str
+    profile_interval: float
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            db_server=os.getenv("DB_SERVER"),
+            db_database=os.getenv("DB_DATABASE"),
+            db_username=os.getenv("DB_USERNAME"),
+            db_password=os.getenv("DB_PASSWORD"),
+            slow_query_ms=_float("SLOW_QUERY_MS", 500),
+
+            log_level=os.getenv("LOG_LEVEL", "INFO").upper(),
+            admin_token=os.getenv("ADMIN_TOKEN"),
+            health_cache_ttl=_float("HEALTH_CACHE_TTL", 15),
+            health_check_timeout=_float("HEALTH_CHECK_TIMEOUT", 5),
+            admin_list_count_ttl=_float("ADMIN_LIST_COUNT_TTL", 60),
+            # Writes in this process invalidate at once; the TTL bounds other workers
+            stall_availability_cache_ttl=_float("STALL_AVAILABILITY_CACHE_TTL", 30),
+
+            # AES key of legacy ticket QRs. The misspelt ENCRPYTION_KEY that the
+            # old base64 QR obfuscation read is no longer used anywhere: compact
+            # QR payloads use QR_HMAC_KEY / QR_SIGNING_KEY (or derive from this key).
+            encryption_key=os.getenv("ENCRYPTION_KEY", "ThisIsA16ByteKey!")[:16].encode("utf-8"),
+            qr_hmac_key=os.getenv("QR_HMAC_KEY", "").encode("utf-8") or None,
+            # base64 Ed25519 seed; when set, QR payloads are signed (v2)
+            qr_signing_key=os.getenv("QR_SIGNING_KEY"),
+
+            email_host=os.getenv("EMAIL_HOST"),
+            email_port=_int("EMAIL_PORT", None),
+            email_user=os.getenv("EMAIL_USER"),
+            email_password=os.getenv("EMAIL_PASSWORD"),
+            email_from=os.getenv("EMAIL_FROM"),
+
+            image_base_path=os.path.join(os.getcwd(), "static", "ticket_images"),
+            image_base_url=os.getenv("IMAGE_BASE_URL"),
+            image_variant_widths=tuple(int(w) for w in _list("IMAGE_VARIANT_WIDTHS", "320,640,1024")),
+            image_variant_webp_quality=_int("IMAGE_VARIANT_WEBP_QUALITY", 80),
+            image_variant_jpeg_quality=_int("IMAGE_VARIANT_JPEG_QUALITY", 82),
+            event_page_cache_ttl=_float("EVENT_PAGE_CACHE_TTL", 60),
+
+            qr_path=os.getenv("TICKET_QR_CODE_PATH", "./qrs"),
+            pdf_path=os.getenv("PDF_PATH", "./pdfs"),
+
+            twilio_account_sid=os.getenv("TWILIO_ACCOUNT_SID"),
+            twilio_auth_token=os.getenv("TWILIO_AUTH_TOKEN"),
+            twilio_service_id=os.getenv("TWILIO_SERVICE_ID"),
+            twilio_content_sid=os.getenv("TWILIO_CONTENT_SID"),
+            twilio_notice_content_sid=os.getenv("TWILIO_NOTICE_CONTENT_SID"),
+
+            razorpay_api_url=os.getenv("RAZORPAY_API_URL", "https://api.razorpay.com/v1"),
+            razorpay_key_id=os.getenv("RAZORPAY_KEY_ID"),
+            razorpay_key_secret=os.getenv("RAZORPAY_KEY_SECRET"),
+            razorpay_timeout=_float("RAZORPAY_TIMEOUT", 10),
+            razorpay_connect_timeout=_float("RAZORPAY_CONNECT_TIMEOUT", 3),
+            razorpay_max_connections=_int("RAZORPAY_MAX_CONNECTIONS", 20),
+            razorpay_webhook_secret=os.getenv("RAZORPAY_WEBHOOK_SECRET"),
+            webhook_queue_path=os.getenv("WEBHOOK_QUEUE_PATH", "./data/webhook_queue.db"),
+            webhook_batch_size=_int("WEBHOOK_BATCH_SIZE", 50),
+            webhook_max_attempts=_int("WEBHOOK_MAX_ATTEMPTS", 5),
+            webhook_process_interval=_float("WEBHOOK_PROCESS_INTERVAL", 5),
+
+            enquiry_spill_dir=os.getenv("ENQUIRY_SPILL_DIR", "./data/enquiries"),
+            enquiry_batch_size=_int("ENQUIRY_BATCH_SIZE", 200),
+            enquiry_flush_interval=_float("ENQUIRY_FLUSH_INTERVAL", 2),
+            enquiry_rate_cache_ttl=_float("ENQUIRY_RATE_CACHE_TTL", 60),
+            # 0 disables the periodic organizer digest
+            enquiry_followup_interval=_float("ENQUIRY_FOLLOWUP_INTERVAL", 900),
+            enquiry_followup_batch_size=_int("ENQUIRY_FOLLOWUP_BATCH_SIZE", 500),
+            enquiry_followup_max_age_days=_int("ENQUIRY_FOLLOWUP_MAX_AGE_DAYS", 7),
+
+            notify_job_dir=os.getenv("NOTIFY_JOB_DIR", "./data/notify_jobs"),
+            notify_page_size=_int("NOTIFY_PAGE_SIZE", 500),
+            notify_email_rate=_float("NOTIFY_EMAIL_RATE", 10),
+            notify_email_workers=_int("NOTIFY_EMAIL_WORKERS", 4),
+            notify_whatsapp_rate=_float("NOTIFY_WHATSAPP_RATE", 20),
+            notify_whatsapp_workers=_int("NOTIFY_WHATSAPP_WORKERS", 8),
+
+            bulk_import_chunk_size=_int("BULK_IMPORT_CHUNK_SIZE", 500),
+            bulk_import_max_rows=_int("BULK_IMPORT_MAX_ROWS", 20000),
+
+            inventory_hold_seconds=_int("INVENTORY_HOLD_SECONDS", 900),
+            inventory_sweep_interval=_float("INVENTORY_SWEEP_INTERVAL", 30),
+            inventory_reconcile_interval=_float("INVENTORY_RECONCILE_INTERVAL", 300),
+
+            waiting_room_enabled=_bool("WAITING_ROOM_ENABLED"),
+            waiting_room_secret=os.getenv("WAITING_ROOM_SECRET") or os.getenv("ENCRYPTION_KEY"),
+            waiting_room_admit_rate=_float("WAITING_ROOM_ADMIT_RATE", 5),
+            waiting_room_burst=_int("WAITING_ROOM_BURST", 50),
+            waiting_room_queue_token_ttl=_int("WAITING_ROOM_QUEUE_TOKEN_TTL", 7200),
+            waiting_room_admission_ttl=_int("WAITING_ROOM_ADMISSION_TTL", 1800),
+
+            compression_min_size=_int("COMPRESSION_MIN_SIZE", 1024),
+            gzip_level=_int("GZIP_LEVEL", 6),
+            brotli_quality=_int("BROTLI_QUALITY", 4),
+            compression_exclude_paths=_list("COMPRESSION_EXCLUDE_PATHS", "/qrScanner"),
+
+            profile_token=os.getenv("PROFILE_TOKEN"),
+            profile_dir=os.getenv("PROFILE_DIR", "./data/profiles"),
+            profile_interval=_float("PROFILE_INTERVAL", 0.005),
+        )
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """
+    Reads .env and the environment once per process.
+    """
+    load_dotenv()
+    return Settings.from_env()
+
+
+settings = get_settings()
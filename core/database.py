@@ -1,13 +1,329 @@
 import pyodbc
 import os
-from dotenv import load_dotenv
+import re
+import hmac
+import time
+import hashlib
+import logging
+import threading
+from functools import lru_cache
+from core.config import settings
+from core.metrics import record_db_time
+from utils.cache import TTLCache
 
-load_dotenv()
+SLOW_QUERY_MS = settings.slow_query_ms
 
-def get_connection():
-    return pyodbc.connect(
-        f"SERVER={os.getenv('DB_SERVER')};"
-        f"DATABASE={os.getenv('DB_DATABASE')};"
-        f"UID={os.getenv('DB_USERNAME')};"
-        f"PWD={os.getenv('DB_PASSWORD')}"
-    )
+logger = logging.getLogger("ticket-system.sql")
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING_RE = re.compile(r"N?'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w@#\]])-?\d+(?:\.\d+)?")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint_sql(sql: str) -> tuple:
+    """
+    (fingerprint id, normalized SQL). Literals become ?, IN lists collapse
+    and whitespace/comments are dropped, so the same statement with
+    different values or formatting shares one fingerprint.
+    """
+    normalized = _COMMENT_RE.sub(" ", sql)
+    normalized = _STRING_RE.sub("?", normalized)
+    normalized = _NUMBER_RE.sub("?", normalized)
+    normalized = _IN_LIST_RE.sub("IN (...)", normalized)
+    normalized = _SPACE_RE.sub(" ", normalized).strip()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12], normalized
+
+
+class QueryStats:
+    """
+    Per-fingerprint call count, total/max time and rows fetched.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, fingerprint: str, sql: str, seconds: float = 0.0, calls: int = 0, rows: int = 0):
+        with self._lock:
+            entry = self._stats.get(fingerprint)
+            if entry is None:
+                entry = self._stats[fingerprint] = {
+                    "fingerprint": fingerprint,
+                    "sql": sql,
+                    "calls": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "rows": 0
+                }
+            entry["calls"] += calls
+            entry["total_ms"] += seconds * 1000
+            entry["max_ms"] = max(entry["max_ms"], seconds * 1000)
+            entry["rows"] += rows
+
+    def top(self, sort: str = "total_ms", limit: int = 50) -> list:
+        with self._lock:
+            entries = [dict(e) for e in self._stats.values()]
+
+        for e in entries:
+            e["avg_ms"] = e["total_ms"] / e["calls"] if e["calls"] else 0.0
+            e["total_ms"] = round(e["total_ms"], 3)
+            e["max_ms"] = round(e["max_ms"], 3)
+            e["avg_ms"] = round(e["avg_ms"], 3)
+
+        entries.sort(key=lambda e: e.get(sort, 0), reverse=True)
+        return entries[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+query_stats = QueryStats()
+
+
+# Per-process key: identical params share a digest within one log, but the
+# digest can't be matched against guessed values (mobile numbers, emails...)
+_PARAMS_DIGEST_KEY = os.urandom(16)
+
+
+def _loggable_params(params) -> str:
+    """
+    Count, types and a keyed digest of the bound values, never the values.
+    """
+    if not isinstance(params, (list, tuple)):
+        params = (params,)
+    types = ", ".join(type(value).__name__ for value in params[:20])
+    if len(params) > 20:
+        types += ", ..."
+    digest = hmac.new(_PARAMS_DIGEST_KEY, repr(params).encode("utf-8"), hashlib.sha256).hexdigest()[:12]
+    return f"<{len(params)} params: {types}; digest={digest}>"
+
+
+class InstrumentedCursor:
+    """
+    pyodbc cursor proxy timing execute/executemany/fetch* calls.
+    Everything else (description, rowcount, nextset, fast_executemany...)
+    goes straight to the real cursor.
+    """
+
+    def __init__(self, cursor):
+        object.__setattr__(self, "_cursor", cursor)
+        # Fingerprint of the last statement, fetched rows are counted against it
+        object.__setattr__(self, "_last", None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _statement(self, operation: str, method, sql, args, log_params):
+        fingerprint, normalized = fingerprint_sql(sql)
+        object.__setattr__(self, "_last", (fingerprint, normalized))
+
+        start = time.perf_counter()
+        try:
+            return method(sql, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            record_db_time(operation, elapsed)
+            query_stats.record(fingerprint, normalized, elapsed, calls=1)
+
+            if elapsed * 1000 >= SLOW_QUERY_MS:
+                logger.warning(
+                    f"Slow query {elapsed * 1000:.0f}ms [{fingerprint}] {normalized} "
+                    f"params={log_params()}"
+                )
+
+    def _fetch(self, method, *args):
+        start = time.perf_counter()
+        result = None
+        try:
+            result = method(*args)
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            record_db_time("fetch", elapsed)
+
+            if self._last:
+                if isinstance(result, list):
+                    rows = len(result)
+                else:
+                    rows = 0 if result is None else 1
+                query_stats.record(*self._last, seconds=elapsed, rows=rows)
+
+    def execute(self, sql, *params):
+        self._statement(
+            "execute", self._cursor.execute, sql, params,
+            lambda: _loggable_params(params[0] if len(params) == 1 else params)
+        )
+        return self
+
+    def executemany(self, sql, params):
+        self._statement(
+            "executemany", self._cursor.executemany, sql, (params,),
+            lambda: f"<{len(params)} rows>"
+        )
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+    def fetchmany(self, *args):
+        return self._fetch(self._cursor.fetchmany, *args)
+
+
+class ConnectionStats:
+    """
+    Connections handed out by get_connection(). Physical connections are
+    pooled by the ODBC driver manager (pyodbc.pooling), so "checked_out"
+    is what the app holds, not sockets to SQL Server.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked_out = 0
+        self.peak = 0
+        self.opened_total = 0
+        self.failed_total = 0
+
+    def opened(self):
+        with self._lock:
+            self.checked_out += 1
+            self.opened_total += 1
+            self.peak = max(self.peak, self.checked_out)
+
+    def closed(self):
+        with self._lock:
+            self.checked_out -= 1
+
+    def failed(self):
+        with self._lock:
+            self.failed_total += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "pooling": pyodbc.pooling,
+                "checked_out": self.checked_out,
+                "peak": self.peak,
+                "opened_total": self.opened_total,
+                "failed_total": self.failed_total
+            }
+
+
+connection_stats = ConnectionStats()
+
+
+class InstrumentedConnection:
+    def __init__(self, conn):
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_closed", False)
+        connection_stats.opened()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def __del__(self):
+        # Connections dropped without close() still go back to the pool
+        if not self._closed:
+            connection_stats.closed()
+
+    def close(self):
+        if not self._closed:
+            object.__setattr__(self, "_closed", True)
+            connection_stats.closed()
+        self._conn.close()
+
+    def cursor(self):
+        return InstrumentedCursor(self._conn.cursor())
+
+    def execute(self, sql, *params):
+        return self.cursor().execute(sql, *params)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            self._conn.commit()
+        finally:
+            record_db_time("commit", time.perf_counter() - start)
+
+
+def get_connection(timeout: float | None = None):
+    """
+    timeout (seconds) bounds the login, for probes that must fail fast;
+    otherwise the driver's default login timeout applies.
+    """
+    start = time.perf_counter()
+    kwargs = {"timeout": max(1, int(timeout))} if timeout else {}
+    try:
+        conn = pyodbc.connect(
+            f"SERVER={settings.db_server};"
+            f"DATABASE={settings.db_database};"
+            f"UID={settings.db_username};"
+            f"PWD={settings.db_password}",
+            **kwargs
+        )
+    except Exception:
+        connection_stats.failed()
+        raise
+    finally:
+        record_db_time("connect", time.perf_counter() - start)
+
+    return InstrumentedConnection(conn)
+
+
+# Columns and tables added by sql/schema.sql, so code can run before the migration
+# has been applied. A result is re-checked after a minute.
+_column_cache = TTLCache(ttl=60, maxsize=64)
+
+
+def _load_has_column(table: str, column: str) -> bool:
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT COL_LENGTH(?, ?)", table, column)
+        return cursor.fetchone()[0] is not None
+
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def has_column(table: str, column: str) -> bool:
+    return _column_cache.get_or_load((table, column), _load_has_column, table, column)
+
+
+def _load_has_table(table: str) -> bool:
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT OBJECT_ID(?, 'U')", table)
+        return cursor.fetchone()[0] is not None
+
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def has_table(table: str) -> bool:
+    return _column_cache.get_or_load((table, None), _load_has_table, table)
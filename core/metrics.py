@@ -0,0 +1,218 @@
+import time
+import asyncio
+import threading
+import functools
+import contextvars
+from collections import deque
+
+QUANTILES = (0.5, 0.95, 0.99)
+# Observations kept per series for quantile estimates
+WINDOW_SIZE = 1024
+
+# Per-request accumulator for DB time, mutated in place so that sync
+# endpoints running in the threadpool (copied context) still add to it
+_request_db_time = contextvars.ContextVar("request_db_time", default=None)
+
+
+class Summary:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.window = deque(maxlen=WINDOW_SIZE)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.window.append(value)
+
+    def quantiles(self) -> dict:
+        values = sorted(self.window)
+        if not values:
+            return {q: 0.0 for q in QUANTILES}
+        return {q: values[min(len(values) - 1, int(q * len(values)))] for q in QUANTILES}
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(labels: tuple, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics with Prometheus text exposition.
+    Latencies are summaries (p50/p95/p99 over the last WINDOW_SIZE
+    observations plus _sum/_count), counts are counters and point-in-time
+    values (queue depth, lag) are gauges.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._summaries = {}
+        self._counters = {}
+        self._gauges = {}
+        self._help = {}
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def observe(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._summaries.setdefault(name, {})
+            summary = series.get(key)
+            if summary is None:
+                summary = series[key] = Summary()
+            summary.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def render(self) -> str:
+        lines = []
+
+        with self._lock:
+            for name, series in sorted(self._summaries.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} summary")
+                for key, summary in series.items():
+                    for q, v in summary.quantiles().items():
+                        quantile = 'quantile="%s"' % q
+                        lines.append(f"{name}{_labels(key, quantile)} {v:.6f}")
+                    lines.append(f"{name}_sum{_labels(key)} {summary.total:.6f}")
+                    lines.append(f"{name}_count{_labels(key)} {summary.count}")
+
+            for name, series in sorted(self._counters.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_labels(key)} {value}")
+
+            for name, series in sorted(self._gauges.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} gauge")
+                for key, value in series.items():
+                    lines.append(f"{name}{_labels(key)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+registry.describe("http_request_duration_seconds", "Request latency by route")
+registry.describe("http_request_db_seconds", "Time spent in SQL per request, by route")
+registry.describe("http_requests_total", "Requests by route, method and status")
+registry.describe("db_call_duration_seconds", "pyodbc cursor call latency")
+registry.describe("dependency_duration_seconds", "External dependency call latency")
+registry.describe("dependency_errors_total", "External dependency call failures")
+
+
+# --------------------------------
+# HOOKS
+# --------------------------------
+def record_db_time(operation: str, seconds: float):
+    registry.observe("db_call_duration_seconds", seconds, operation=operation)
+
+    holder = _request_db_time.get()
+    if holder is not None:
+        holder[0] += seconds
+
+
+def timed(dependency: str):
+    """
+    Decorator recording call latency (and failures) of an external dependency:
+    PDF rendering, SMTP, WhatsApp, Razorpay...
+    """
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    registry.inc("dependency_errors_total", dependency=dependency)
+                    raise
+                finally:
+                    registry.observe(
+                        "dependency_duration_seconds",
+                        time.perf_counter() - start,
+                        dependency=dependency
+                    )
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                registry.inc("dependency_errors_total", dependency=dependency)
+                raise
+            finally:
+                registry.observe(
+                    "dependency_duration_seconds",
+                    time.perf_counter() - start,
+                    dependency=dependency
+                )
+        return wrapper
+
+    return decorator
+
+
+class MetricsMiddleware:
+    """
+    Records latency, DB time and status per route template (/getEventTicketRate/{ticket_master_id},
+    not the raw URL). Latency stops at the last body message, so
+    BackgroundTasks (email, WhatsApp) don't count against the route.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        db_time = [0.0]
+        token = _request_db_time.set(db_time)
+        state = {"status": 500, "elapsed": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                state["elapsed"] = time.perf_counter() - start
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_db_time.reset(token)
+
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            elapsed = state["elapsed"] if state["elapsed"] is not None else time.perf_counter() - start
+
+            registry.observe("http_request_duration_seconds", elapsed, route=path, method=method)
+            registry.observe("http_request_db_seconds", db_time[0], route=path, method=method)
+            registry.inc("http_requests_total", route=path, method=method, status=state["status"])
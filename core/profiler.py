@@ -0,0 +1,180 @@
+import os
+import sys
+import time
+import uuid
+import inspect
+import threading
+import functools
+import contextvars
+from collections import Counter
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from core.config import settings
+
+# Requests carrying "X-Profile: <PROFILE_TOKEN>" are sampled; unset = disabled
+PROFILE_TOKEN = settings.profile_token
+PROFILE_DIR = settings.profile_dir
+PROFILE_INTERVAL = settings.profile_interval
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Sampler of the profiled request; sync endpoints see it in the threadpool (copied context)
+_active_sampler = contextvars.ContextVar("active_sampler", default=None)
+
+
+class StackSampler:
+    """
+    Wall-clock sampling profiler. A daemon thread snapshots the stacks of
+    the profiled request's threads each interval and counts identical
+    stacks: the event loop thread, plus the threadpool thread while it runs
+    the request's sync endpoint. Other async requests interleaved on the
+    event loop can still show up. Only stacks going through project code
+    are kept.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()
+        self.total = 0
+        self.thread_ids = set()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._started = None
+        self.duration = 0.0
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.total += 1
+            frames = sys._current_frames()
+            for thread_id in list(self.thread_ids):
+                frame = frames.get(thread_id)
+
+                stack = []
+                in_project = False
+                while frame is not None:
+                    code = frame.f_code
+                    filename = code.co_filename
+                    if filename.startswith(PROJECT_DIR) and "site-packages" not in filename:
+                        in_project = True
+                    stack.append(f"{code.co_name} ({os.path.relpath(filename, PROJECT_DIR)}:{frame.f_lineno})")
+                    frame = frame.f_back
+
+                if in_project:
+                    self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._started = time.perf_counter()
+        self.thread_ids.add(threading.get_ident())
+        self._thread.start()
+
+    def stop(self):
+        """
+        Blocks for up to one interval; call it off the event loop.
+        """
+        self.duration = time.perf_counter() - self._started
+        self._stop.set()
+        self._thread.join()
+
+    def report(self, title: str = "") -> str:
+        """
+        Folded stacks ("frame;frame;frame count"), heaviest first, as read
+        by flamegraph.pl / speedscope.
+        """
+        lines = [
+            f"# {title}",
+            f"# duration={self.duration:.3f}s interval={self.interval}s ticks={self.total}",
+        ]
+        lines += [f"{stack} {count}" for stack, count in self.samples.most_common()]
+        return "\n".join(lines) + "\n"
+
+
+def _sample_thread(func):
+    """
+    Adds the threadpool thread running a sync endpoint to the active
+    sampler for the duration of the call.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        sampler = _active_sampler.get()
+        if sampler is None:
+            return func(*args, **kwargs)
+
+        thread_id = threading.get_ident()
+        sampler.thread_ids.add(thread_id)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sampler.thread_ids.discard(thread_id)
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    Route class (app.router.route_class) that lets the sampler follow sync
+    endpoints into the threadpool.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = _sample_thread(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _save_profile(sampler: StackSampler, profile_id: str, title: str):
+    sampler.stop()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.folded"), "w", encoding="utf-8") as f:
+        f.write(sampler.report(title))
+
+
+def profile_path(profile_id: str) -> str | None:
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.folded")
+    return path if os.path.isfile(path) else None
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in per-request profiling. The response is returned unchanged with an
+    X-Profile-Id header; the folded stacks are served by /metrics/profile/{id}.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILE_TOKEN:
+            await self.app(scope, receive, send)
+            return
+
+        token = None
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                token = value.decode("latin-1")
+                break
+
+        if token != PROFILE_TOKEN:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"x-profile-id", profile_id.encode("ascii"))
+                ]
+            await send(message)
+
+        sampler = StackSampler()
+        sampler.start()
+        token = _active_sampler.set(sampler)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _active_sampler.reset(token)
+            # Joining the sampler and writing the file stay off the event loop
+            await run_in_threadpool(
+                _save_profile, sampler, profile_id, f"{scope.get('method')} {scope.get('path')}"
+            )
@@ -1,38 +1,58 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from core.database import get_connection
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Header, Depends, Query, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from core.config import settings
+from core.database import get_connection, has_column, query_stats
+from core.compression import CompressionMiddleware
+from core.metrics import MetricsMiddleware, registry
+from core.profiler import ProfiledRoute, ProfilingMiddleware, profile_path
 from fastapi.middleware.cors import CORSMiddleware
-import os
-from dotenv import load_dotenv
-from datetime import datetime
+from fastapi.responses import ORJSONResponse, PlainTextResponse, FileResponse
+import json
+import base64
+import pyodbc
+import hmac
+from datetime import datetime, date
+from decimal import Decimal
 from typing import Optional
-from services.mail_service import send_ticket_email, send_email
-from services.qr_pdf import create_ticket_pdf
-from services.whatsapp_service import send_whatsapp_with_pdf
+from services.mail_service import SMTPSession, build_text_email, send_email
+from services.bulk_import import import_csv
+from services.sales_analytics import get_hourly_sales
+from services.stall_availability import get_stall_availability, invalidate_stall_availability
+from services.admin_listings import STALL_BOOKINGS, SPONSORS, invalidate_listing_counts, list_page
+from services.ticket_issuance import issue_tickets_once, send_email_and_whatsapp
+from services.image_variants import get_image_variants
+from services.event_page import get_event_page, invalidate_event_page
+from services.health import deep_health, runtime_stats, worker_stats
+from services.enquiry_buffer import enquiry_buffer, get_enquiry_rate
+from services.enquiry_followup import process_unsent_enquiries
+from services.event_notify import create_job, notify_jobs
+from services.ticket_resend import find_tickets, prepare_ticket_artifacts, send_ticket_copies
+from services.payment_webhook import (
+    verify_webhook_signature,
+    enqueue_webhook_event,
+    process_pending_events
+)
+from services.inventory import inventory, SoldOutError
+from services.waiting_room import waiting_room, check_admission, AdmissionError
+from services.razorpay_gateway import create_order, close_client, to_paise, RazorpayError
+from utils.background import start_periodic_task, stop_periodic_tasks
 from api.validation_login import validate_user_credentials_in_db, validate_user_and_get_tickets
-from utils.utils import decrypt_qr_data, generate_qr_string
+from utils.utils import decode_qr_batch, decode_ticket_qr, logger, QR_STATUS_OK
+from utils.qr_codec import QR_VERSION_ED25519, public_key_bytes
+from utils.fast_json import json_response, rows_to_dicts, RawJSONResponse
+from utils.pagination import MAX_PAGE_SIZE, encode_cursor, decode_cursor, parse_fields
 from pydantic import BaseModel, EmailStr
-import razorpay
-
-load_dotenv()
-
-EMAIL_HOST = os.getenv("EMAIL_HOST")
-EMAIL_PORT = int(os.getenv("EMAIL_PORT"))
-EMAIL_USER = os.getenv("EMAIL_USER")
-EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
-EMAIL_FROM = os.getenv("EMAIL_FROM")
-IMAGE_BASE_PATH = os.path.join(os.getcwd(), "static", "ticket_images")
-IMAGE_BASE_URL = os.getenv("IMAGE_BASE_URL")  
-BASE_DIR = os.getcwd()
-IMAGE_BASE_PATH = os.path.join(BASE_DIR, "static", "ticket_images")
-razorpay_client = razorpay.Client(
-    auth=(os.getenv("RAZORPAY_KEY_ID"), os.getenv("RAZORPAY_KEY_SECRET"))
-)
+
+IMAGE_BASE_URL = settings.image_base_url
 
 app = FastAPI(
     title="AKADIT API",
     docs_url=None,
-    redoc_url=None
+    redoc_url=None,
+    default_response_class=ORJSONResponse
 )
+# Lets request profiling follow sync endpoints into the threadpool
+app.router.route_class = ProfiledRoute
 
 # CORS
 app.add_middleware(
@@ -46,8 +66,37 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor"],
 )
 
+# Compression (large list/report payloads, scanner excluded)
+app.add_middleware(CompressionMiddleware)
+
+# Per-route latency / DB time, and opt-in request profiling (X-Profile)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+
+@app.on_event("startup")
+def start_background_tasks():
+    start_periodic_task("webhook-processor", settings.webhook_process_interval, process_pending_events)
+    start_periodic_task("inventory-hold-sweeper", settings.inventory_sweep_interval, inventory.release_expired)
+    start_periodic_task("inventory-reconciler", settings.inventory_reconcile_interval, inventory.reconcile)
+    enquiry_buffer.start()
+    if settings.enquiry_followup_interval > 0:
+        start_periodic_task("enquiry-followup", settings.enquiry_followup_interval, process_unsent_enquiries)
+
+
+@app.on_event("shutdown")
+def stop_background_tasks():
+    stop_periodic_tasks()
+    enquiry_buffer.stop()
+
+
+@app.on_event("shutdown")
+async def close_gateway_client():
+    await close_client()
+
 
 @app.get("/")
 def list_only_project_routes():
@@ -81,59 +130,220 @@ def list_only_project_routes():
     }
 
 @app.get("/health")
-def health():
-    try:
-        conn = get_connection()
-        conn.close()
-        return {"status": "UP", "db": "connected"}
-    except Exception as e:
-        return {"status": "DOWN", "error": str(e)}
+async def health():
+    """
+    Liveness: process state only, never opens a DB connection.
+    """
+    return {"status": "UP", "workers": worker_stats(), **runtime_stats()}
+
+
+@app.get("/health/ready")
+async def health_ready():
+    """
+    Readiness: DB/SMTP checks, cached for HEALTH_CACHE_TTL seconds.
+    """
+    deep = await run_in_threadpool(deep_health)
+    return json_response(
+        {**deep, "workers": worker_stats(), **runtime_stats()},
+        status_code=200 if deep["status"] == "UP" else 503
+    )
+
+def is_admin(x_admin_token: Optional[str]) -> bool:
+    admin_token = settings.admin_token
+    # Compared as bytes: compare_digest raises TypeError on non-ASCII str
+    return bool(
+        admin_token
+        and x_admin_token
+        and hmac.compare_digest(x_admin_token.encode("utf-8"), admin_token.encode("utf-8"))
+    )
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    Admin endpoints need X-Admin-Token == ADMIN_TOKEN (disabled when unset).
+    """
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+
+@app.get("/admin/queryStats", dependencies=[Depends(require_admin)])
+def get_query_stats(sort: str = "total_ms", limit: int = 50):
+    if sort not in ("total_ms", "max_ms", "avg_ms", "calls", "rows"):
+        raise HTTPException(status_code=400, detail="Invalid sort")
+
+    return {"queries": query_stats.top(sort, limit)}
+
+
+@app.post("/admin/queryStats/reset", dependencies=[Depends(require_admin)])
+def reset_query_stats():
+    query_stats.reset()
+    return {"status": 1, "message": "Query stats reset"}
+
+
+@app.get("/metrics", dependencies=[Depends(require_admin)])
+def metrics():
+    return PlainTextResponse(
+        registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/metrics/profile/{profile_id}", dependencies=[Depends(require_admin)])
+def get_profile(profile_id: str):
+    path = profile_path(profile_id) if profile_id.isalnum() else None
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain")
+
+
+# Public columns of TicketMaster; the email columns are only returned to admins
+EVENT_LIST_FIELDS = (
+    "TicketMasterId",
+    "EventDate",
+    "EventDay",
+    "Venue",
+    "Country",
+    "CountryCode",
+    "Currency",
+    "EntryDateTime",
+    "EntryUserMasterId",
+    "MaxLimit",
+    "EventPostpone",
+    "EventClose",
+    "EventName",
+    "EventTime"
+)
+EVENT_LIST_ADMIN_FIELDS = EVENT_LIST_FIELDS + ("EnquiryToEmailId", "BCCEmailId")
+# Keyset sort key, always selected
+EVENT_LIST_KEY = ("EventDate", "TicketMasterId")
+
+EVENT_STATUS_FILTERS = {
+    "open": "ISNULL(EventClose, 0) = 0 AND ISNULL(EventPostpone, 0) = 0",
+    "closed": "EventClose = 1",
+    "postponed": "EventPostpone = 1"
+}
+
 
 @app.get("/getEventList")
-def get_ticketmaster():
-    conn = get_connection()
-    cursor = conn.cursor()
+def get_ticketmaster(
+    country: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    status: Optional[str] = None,
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Upcoming events (EventDate >= today unless date_from is given), ordered
+    by EventDate, TicketMasterId.
 
-    query = """
-    SELECT
-        TicketMasterId,
-        EventDate,
-        EventDay,
-        Venue,
-        Country,
-        CountryCode,
-        Currency,
-        EntryDateTime,
-        EntryUserMasterId,
-        MaxLimit,
-        EnquiryToEmailId,
-        BCCEmailId,
-        EventPostpone,
-        EventClose,
-        EventName,
-        EventTime
+    status: open | closed | postponed
+    fields: comma separated column list (default: all public columns)
+    limit / cursor: keyset paging, pass back next_cursor for the next page
+    """
+    allowed = EVENT_LIST_ADMIN_FIELDS if is_admin(x_admin_token) else EVENT_LIST_FIELDS
+
+    try:
+        columns = parse_fields(fields, allowed, EVENT_LIST_FIELDS, EVENT_LIST_KEY)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if status is not None and status not in EVENT_STATUS_FILTERS:
+        raise HTTPException(status_code=400, detail="status must be open, closed or postponed")
+
+    where = ["EventDate >= ?"]
+    params = [date_from or date.today()]
+
+    if date_to:
+        where.append("EventDate <= ?")
+        params.append(date_to)
+
+    if country:
+        where.append("Country = ?")
+        params.append(country)
+
+    if status:
+        where.append(EVENT_STATUS_FILTERS[status])
+
+    if cursor:
+        try:
+            after_date, after_id = decode_cursor(cursor, datetime.fromisoformat, int)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        where.append("(EventDate > ? OR (EventDate = ? AND TicketMasterId > ?))")
+        params += [after_date, after_date, after_id]
+
+    query = f"""
+    SELECT {"TOP (?) " if limit else ""}{", ".join(columns)}
     FROM TicketMaster
-    WHERE EventDate >= CAST(GETDATE() AS DATE)
-    ORDER BY EventDate ASC
+    WHERE {" AND ".join(where)}
+    ORDER BY EventDate ASC, TicketMasterId ASC
     """
 
-    cursor.execute(query)
+    if limit:
+        # One extra row tells whether there is a next page
+        params.insert(0, limit + 1)
 
-    columns = [col[0] for col in cursor.description]
-    rows = cursor.fetchall()
+    conn = get_connection()
+    db_cursor = conn.cursor()
 
-    data = [dict(zip(columns, row)) for row in rows]
+    try:
+        db_cursor.execute(query, *params)
+        rows = db_cursor.fetchall()
+        data = rows_to_dicts(db_cursor, rows)
 
-    conn.close()
+    finally:
+        db_cursor.close()
+        conn.close()
 
-    return {
+    next_cursor = None
+    if limit and len(data) > limit:
+        data = data[:limit]
+        last = data[-1]
+        next_cursor = encode_cursor(last["EventDate"], last["TicketMasterId"])
+
+    return json_response({
         "total_records": len(data),
-        "tickets": data
-    }
+        "tickets": data,
+        "next_cursor": next_cursor
+    })
+
+
+def require_admission(admission_token: str | None, ticket_master_id: int):
+    try:
+        check_admission(admission_token, ticket_master_id)
+    except AdmissionError as e:
+        raise HTTPException(status_code=403, detail=f"Waiting room: {e}")
+
+
+class WaitingRoomJoinRequest(BaseModel):
+    ticket_master_id: int
+
+
+@app.post("/waitingRoom/join")
+def join_waiting_room(data: WaitingRoomJoinRequest):
+    return waiting_room.join(data.ticket_master_id)
+
+
+@app.get("/waitingRoom/status")
+def waiting_room_status(queue_token: str):
+    # Polled by queued clients: in-memory only, never touches the DB
+    try:
+        return waiting_room.status(queue_token)
+    except AdmissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
 
 
 @app.get("/getEventTicketRate/{ticket_master_id}")
-def get_event_rates(ticket_master_id: int):
+def get_event_rates(
+    ticket_master_id: int,
+    x_admission_token: Optional[str] = Header(None)
+):
+    require_admission(x_admission_token, ticket_master_id)
+
     conn = get_connection()
     cursor = conn.cursor()
 
@@ -178,6 +388,122 @@ def get_event_rates(ticket_master_id: int):
         ]
     }
 
+@app.get("/event/{ticket_master_id}/page")
+def get_event_page_data(ticket_master_id: int):
+    """
+    Event details, ticket rates and banner images in one call (cached per event).
+    """
+    if ticket_master_id <= 0:
+        raise HTTPException(status_code=400, detail="Invalid TicketMasterId")
+
+    body = get_event_page(ticket_master_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    return RawJSONResponse(body)
+
+
+@app.post("/admin/eventPage/invalidate", dependencies=[Depends(require_admin)])
+def invalidate_event_page_cache(ticket_master_id: Optional[int] = None):
+    # Events are edited outside this API, so the editor (or a deploy hook) calls this
+    invalidate_event_page(ticket_master_id)
+    return {"status": 1, "message": "Event page cache cleared"}
+
+class EventNoticeRequest(BaseModel):
+    kind: Optional[str] = None  # postponed / cancelled, default from the event flags
+    message: Optional[str] = None
+    channels: Optional[list[str]] = None
+
+
+@app.post("/admin/events/{ticket_master_id}/notify", dependencies=[Depends(require_admin)])
+def notify_ticket_holders(ticket_master_id: int, data: EventNoticeRequest):
+    """
+    Starts emailing / WhatsApp-ing every ticket holder of a postponed or
+    cancelled event. Poll /admin/notifyJobs/{job_id} for progress.
+    """
+    try:
+        job = create_job(ticket_master_id, data.kind, data.message, data.channels)
+        notify_jobs.start(job)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return job.progress()
+
+
+@app.get("/admin/notifyJobs", dependencies=[Depends(require_admin)])
+def list_notify_jobs():
+    return {"jobs": notify_jobs.jobs()}
+
+
+@app.get("/admin/notifyJobs/{job_id}", dependencies=[Depends(require_admin)])
+def get_notify_job(job_id: str):
+    job = notify_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.progress()
+
+
+@app.post("/admin/notifyJobs/{job_id}/resume", dependencies=[Depends(require_admin)])
+def resume_notify_job(job_id: str):
+    try:
+        return notify_jobs.resume(job_id).progress()
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.post("/admin/notifyJobs/{job_id}/cancel", dependencies=[Depends(require_admin)])
+def cancel_notify_job(job_id: str):
+    if not notify_jobs.cancel(job_id):
+        raise HTTPException(status_code=404, detail="Job not running")
+    return {"status": 1, "message": "Cancelling after the current page"}
+
+@app.get("/admin/tickets", dependencies=[Depends(require_admin)])
+def lookup_tickets(mobile_no: Optional[str] = None, email_id: Optional[str] = None):
+    """
+    Support lookup of paid tickets by exact MobileNo or EmailId.
+    """
+    try:
+        tickets = find_tickets(mobile_no=mobile_no, email_id=email_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return json_response({"total_records": len(tickets), "tickets": tickets})
+
+
+class TicketResendRequest(BaseModel):
+    channels: list[str] = ["email", "whatsapp"]
+
+
+@app.post("/admin/tickets/{ticket_issue_id}/resend", dependencies=[Depends(require_admin)])
+def resend_tickets(ticket_issue_id: int, data: TicketResendRequest, background_tasks: BackgroundTasks):
+    """
+    Sends an issued ticket again, reusing the stored QR codes and PDFs.
+    Missing PDFs are rendered by the background task, not in the request.
+    """
+    unknown = set(data.channels) - {"email", "whatsapp"}
+    if unknown or not data.channels:
+        raise HTTPException(status_code=400, detail="channels must be email and/or whatsapp")
+
+    artifacts = prepare_ticket_artifacts(ticket_issue_id)
+    if artifacts is None:
+        raise HTTPException(status_code=404, detail="Paid TicketIssue not found")
+
+    background_tasks.add_task(send_ticket_copies, artifacts, data.channels)
+
+    return {
+        "status": 1,
+        "message": "Tickets queued for resend",
+        "tickets": len(artifacts["pdf_files"]),
+        "pdfs_reused": len(artifacts["pdf_files"]) - len(artifacts["missing"]),
+        "pdfs_to_render": len(artifacts["missing"])
+    }
+
 class TicketEnquiryRequest(BaseModel):
     ticket_master_id: int
     name: str
@@ -194,88 +520,56 @@ def save_ticket_enquiry(data: TicketEnquiryRequest):
     if data.ticket_count <= 0:
         raise HTTPException(status_code=400, detail="Invalid ticket count")
 
-    conn = get_connection()
-    cursor = conn.cursor()
-
+    # =========================
+    # 1. GET TICKET RATE (cached)
+    # =========================
     try:
-        # =========================
-        # 1. GET TICKET RATE
-        # =========================
-        cursor.execute("""
-            SELECT TOP 1 TicketRate, MinimumTickets
-            FROM TicketClassification
-            WHERE TicketMasterId = ?
-        """, data.ticket_master_id)
-
-        rate_row = cursor.fetchone()
-
-        if not rate_row:
-            raise HTTPException(status_code=404, detail="Ticket rate not found")
-
-        ticket_rate = rate_row[0]
-        minimum_tickets = rate_row[1]
+        rate = get_enquiry_rate(data.ticket_master_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # =========================
-        # 2. VALIDATE MINIMUM TICKETS
-        # =========================
-        if data.ticket_count < minimum_tickets:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Minimum {minimum_tickets} tickets required"
-            )
+    if not rate:
+        raise HTTPException(status_code=404, detail="Ticket rate not found")
 
-        # =========================
-        # 3. CALCULATE TOTAL
-        # =========================
-        total_amount = ticket_rate * data.ticket_count
+    ticket_rate, minimum_tickets = rate
 
-        # =========================
-        # 4. INSERT ENQUIRY
-        # =========================
-        cursor.execute("""
-            INSERT INTO TicketEnquiry
-            (
-                TicketMasterId,
-                MobileNo,
-                EmailId,
-                TicketCount,
-                TotalAmount,
-                EntryDateTime,
-                Name,
-                IsSend
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            data.ticket_master_id,
-            data.mobile_no,
-            data.email_id,
-            data.ticket_count,
-            total_amount,
-            datetime.now(),
-            data.name,
-            0
-        ))
+    # =========================
+    # 2. VALIDATE MINIMUM TICKETS
+    # =========================
+    if data.ticket_count < minimum_tickets:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Minimum {minimum_tickets} tickets required"
+        )
 
-        conn.commit()
+    # =========================
+    # 3. CALCULATE TOTAL
+    # =========================
+    total_amount = ticket_rate * data.ticket_count
 
-        return {
-            "status": "success",
-            "ticket_rate": ticket_rate,
+    # =========================
+    # 4. QUEUE ENQUIRY (written to TicketEnquiry in batches)
+    # =========================
+    try:
+        enquiry_buffer.add({
+            "ticket_master_id": data.ticket_master_id,
+            "mobile_no": data.mobile_no,
+            "email_id": data.email_id,
             "ticket_count": data.ticket_count,
-            "total_amount": total_amount,
-            "message": "Ticket enquiry saved successfully"
-        }
-
-    except HTTPException:
-        raise
-
+            "total_amount": str(total_amount),
+            "entry_datetime": datetime.now().isoformat(),
+            "name": data.name
+        })
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
-    finally:
-        conn.close()
+    return {
+        "status": "success",
+        "ticket_rate": ticket_rate,
+        "ticket_count": data.ticket_count,
+        "total_amount": total_amount,
+        "message": "Ticket enquiry saved successfully"
+    }
 
 class TicketIssueRequest(BaseModel):
     ticket_master_id: int
@@ -286,39 +580,6 @@ class TicketIssueRequest(BaseModel):
     ticket_count: int
     transaction_id: Optional[str] = None
 
-def send_email_and_whatsapp(
-    email_id,
-    name,
-    mobile_no,
-    entry_datetime,
-    ticket_count,
-    total_amount,
-    pdf_files
-):
-    # EMAIL
-    send_ticket_email(
-        email_id,
-        name,
-        mobile_no,
-        entry_datetime,
-        ticket_count,
-        total_amount,
-        "USD",
-        "Event Name",
-        None,
-        pdf_files
-    )
-
-    # WHATSAPP (ONE MESSAGE PER TICKET)
-    for i, pdf in enumerate(pdf_files, start=1):
-        send_whatsapp_with_pdf(
-            mobile_no=mobile_no,
-            pdf_file=pdf,
-            ticket_no=i,
-            total_tickets=ticket_count
-        )
-
-
 class QRScanRequest(BaseModel):
     qrCode: str
 
@@ -338,27 +599,18 @@ def scan_qr(data: QRScanRequest):
             }
 
         # ----------------------------
-        # 2. Decrypt QR
+        # 2. Decode + verify QR
         # ----------------------------
         try:
-            decoded = decrypt_qr_data(data.qrCode)
+            payload = decode_ticket_qr(data.qrCode)
         except Exception:
             return {
                 "status": 2,
                 "message": "Invalid QR code"
             }
 
-        # ----------------------------
-        # 3. Validate QR format
-        # ----------------------------
-        try:
-            ticket_issue_id, details_id, ts = decoded.split("|")
-            details_id = int(details_id)
-        except Exception:
-            return {
-                "status": 2,
-                "message": "Invalid QR code format"
-            }
+        ticket_issue_id = payload.ticket_issue_id
+        details_id = payload.details_id
 
         # ----------------------------
         # 4. DB check
@@ -367,14 +619,14 @@ def scan_qr(data: QRScanRequest):
         cursor = conn.cursor()
 
         cursor.execute("""
-            SELECT IsPersonEntered
+            SELECT IsPersonEntered, TicketIssueId
             FROM TicketIssueDetails
             WHERE TicketIssueDetailsId = ?
         """, details_id)
 
         row = cursor.fetchone()
 
-        if not row:
+        if not row or row.TicketIssueId != ticket_issue_id:
             return {
                 "status": 2,
                 "message": "Invalid ticket"
@@ -407,7 +659,7 @@ def scan_qr(data: QRScanRequest):
         return {
             "status": 0,
             "message": "Entry allowed",
-            "ticket_issue_id": int(ticket_issue_id),
+            "ticket_issue_id": ticket_issue_id,
             "ticket_issue_details_id": details_id
         }
 
@@ -423,6 +675,54 @@ def scan_qr(data: QRScanRequest):
         if conn:
             conn.close()
 
+@app.get("/qr/publicKey")
+def get_qr_public_key():
+    """
+    Ed25519 key scanner devices use to verify ticket QR codes offline.
+    """
+    key = public_key_bytes()
+    if key is None:
+        raise HTTPException(status_code=404, detail="QR signing is not enabled")
+
+    return {
+        "algorithm": "Ed25519",
+        "payload_version": QR_VERSION_ED25519,
+        "public_key": base64.b64encode(key).decode("ascii")
+    }
+
+QR_BATCH_MAX = 10000
+QR_STATUS_NAMES = ("valid", "malformed", "tampered")
+
+
+class QRBatchRequest(BaseModel):
+    qrCodes: list[str]
+
+
+@app.post("/admin/qr/verifyBatch", dependencies=[Depends(require_admin)])
+def verify_qr_batch(data: QRBatchRequest):
+    """
+    Decodes and verifies many ticket QR codes (manifests, reconciliation).
+    Nothing is marked as entered.
+    """
+    if len(data.qrCodes) > QR_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {QR_BATCH_MAX} codes per request")
+
+    batch = decode_qr_batch(data.qrCodes)
+
+    return json_response({
+        "total_records": len(batch),
+        "valid": sum(1 for status in batch.status if status == QR_STATUS_OK),
+        "results": [
+            {
+                "ticket_issue_id": ticket_issue_id,
+                "ticket_issue_details_id": details_id,
+                "issued_at": issued_at,
+                "status": QR_STATUS_NAMES[status]
+            }
+            for ticket_issue_id, details_id, issued_at, status in batch.rows()
+        ]
+    })
+
 class LoginRequest(BaseModel):
     username: str
     password: str
@@ -470,10 +770,30 @@ def scanner_login(data: LoginRequest):
             "message": "Invalid username or password"
         }
 
-    return {
+    return json_response({
         "tickets": result.tickets,
         "summary": result.summary
-    }
+    })
+
+
+@app.get("/admin/analytics/salesHourly", dependencies=[Depends(require_admin)])
+def get_sales_hourly(
+    ticket_master_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    ticket_classification_id: Optional[int] = None,
+    bucket: str = "hour"
+):
+    """
+    Sales velocity (orders, tickets, revenue) per hour or day and ticket
+    classification, read from the TicketSalesHourly buckets.
+    """
+    try:
+        return json_response(get_hourly_sales(
+            ticket_master_id, date_from, date_to, ticket_classification_id, bucket
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 class BannerLoginRequest(BaseModel):
@@ -507,11 +827,13 @@ def get_event_by_master_id(data: BannerLoginRequest):
             raise HTTPException(status_code=404, detail="Event not found")
 
         images = {}
+        variants = {}
         for i in range(1, 7):
             img = getattr(row, f"Image{i}", None)
             images[f"image{i}"] = f"{IMAGE_BASE_URL}/{data.ticket_master_id}/{img}" if img else None
+            variants[f"image{i}"] = get_image_variants(data.ticket_master_id, img) if img else None
 
-        return {"images": images}
+        return {"images": images, "variants": variants}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -528,6 +850,34 @@ class StallMasterRequest(BaseModel):
     deposit_amount: float
     entry_user_master_id: int
 
+
+STALL_MASTER_INSERT = """
+    INSERT INTO [EventManagement].[dbo].[StallMaster]
+    (
+        StallNo,
+        EventMasterId,
+        StallExpenses,
+        Eminities,
+        DepositAmount,
+        EntryDateTime,
+        EntryUserMasterId
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def stall_master_params(data: StallMasterRequest) -> tuple:
+    return (
+        data.stall_no,
+        data.event_master_id,
+        data.stall_expenses,
+        data.eminities,
+        data.deposit_amount,
+        datetime.now(),
+        data.entry_user_master_id
+    )
+
+
 @app.post("/addStallMaster")
 def add_stall_master(data: StallMasterRequest):
     conn = None
@@ -537,34 +887,10 @@ def add_stall_master(data: StallMasterRequest):
         conn = get_connection()
         cursor = conn.cursor()
 
-        query = """
-        INSERT INTO [EventManagement].[dbo].[StallMaster]
-        (
-            StallNo,
-            EventMasterId,
-            StallExpenses,
-            Eminities,
-            DepositAmount,
-            EntryDateTime,
-            EntryUserMasterId
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        """
-
-        cursor.execute(
-            query,
-            (
-                data.stall_no,
-                data.event_master_id,
-                data.stall_expenses,
-                data.eminities,
-                data.deposit_amount,
-                datetime.now(),
-                data.entry_user_master_id
-            )
-        )
+        cursor.execute(STALL_MASTER_INSERT, stall_master_params(data))
 
         conn.commit()
+        invalidate_stall_availability(data.event_master_id)
 
         return {
             "status": 1,
@@ -587,6 +913,27 @@ class CategoryRequest(BaseModel):
     entry_user_master_id: int
 
 
+CATEGORY_INSERT = """
+    INSERT INTO [EventManagement].[dbo].[CategoryMaster]
+    (
+        CategoryName,
+        CategoryType,
+        EntryDateTime,
+        EntryUserMasterId
+    )
+    VALUES (?, ?, ?, ?)
+"""
+
+
+def category_params(data: CategoryRequest) -> tuple:
+    return (
+        data.category_name,
+        data.category_type,
+        datetime.now(),
+        data.entry_user_master_id
+    )
+
+
 @app.post("/addCategory")
 def add_category(data: CategoryRequest):
     conn = None
@@ -596,26 +943,7 @@ def add_category(data: CategoryRequest):
         conn = get_connection()
         cursor = conn.cursor()
 
-        query = """
-        INSERT INTO [EventManagement].[dbo].[CategoryMaster]
-        (
-            CategoryName,
-            CategoryType,
-            EntryDateTime,
-            EntryUserMasterId
-        )
-        VALUES (?, ?, ?, ?)
-        """
-
-        cursor.execute(
-            query,
-            (
-                data.category_name,
-                data.category_type,
-                datetime.now(),
-                data.entry_user_master_id
-            )
-        )
+        cursor.execute(CATEGORY_INSERT, category_params(data))
 
         conn.commit()
 
@@ -645,6 +973,32 @@ class StallBookingMasterRequest(BaseModel):
     IsExecutedBefore: bool = False
     SpecialRequirement: str | None = None
     EntryUserMasterId: int
+    StallMasterId: int | None = None
+
+STALL_BOOKING_INSERT = """
+    INSERT INTO [dbo].[StallBookingMaster]
+    (EventMasterId, TenantName, TenantBrandName, TenantEmail, TenantContactNo,
+     SocialMediaLink, CategoryId, IsExecutedBefore, SpecialRequirement, EntryUserMasterId,
+     StallMasterId)
+    SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+    WHERE ? IS NULL OR (
+        EXISTS (
+            SELECT 1 FROM [dbo].[StallMaster]
+            WHERE StallMasterId = ? AND EventMasterId = ?
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM [dbo].[StallBookingMaster]
+            WHERE StallMasterId = ?
+        )
+    )
+"""
+
+LEGACY_STALL_BOOKING_INSERT = """
+    INSERT INTO [dbo].[StallBookingMaster]
+    (EventMasterId, TenantName, TenantBrandName, TenantEmail, TenantContactNo,
+     SocialMediaLink, CategoryId, IsExecutedBefore, SpecialRequirement, EntryUserMasterId)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
 
 # --------------------------
 # API Endpoint
@@ -660,28 +1014,52 @@ def add_stall_booking_master(data: StallBookingMasterRequest):
         # ---------------------------
         # Insert Stall Booking
         # ---------------------------
-        query = """
-            INSERT INTO [dbo].[StallBookingMaster]
-            (EventMasterId, TenantName, TenantBrandName, TenantEmail, TenantContactNo,
-             SocialMediaLink, CategoryId, IsExecutedBefore, SpecialRequirement, EntryUserMasterId)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
-        cursor.execute(
-            query,
-            (
+        params = (
+            data.EventMasterId,
+            data.TenantName,
+            data.TenantBrandName,
+            data.TenantEmail,
+            data.TenantContactNo,
+            data.SocialMediaLink,
+            data.CategoryId,
+            int(data.IsExecutedBefore), 
+            data.SpecialRequirement,
+            data.EntryUserMasterId
+        )
+
+        if has_column("dbo.StallBookingMaster", "StallMasterId"):
+            # The stall, when given, must belong to the event and still be free
+            query = STALL_BOOKING_INSERT
+            params += (
+                data.StallMasterId,
+                data.StallMasterId,
+                data.StallMasterId,
                 data.EventMasterId,
-                data.TenantName,
-                data.TenantBrandName,
-                data.TenantEmail,
-                data.TenantContactNo,
-                data.SocialMediaLink,
-                data.CategoryId,
-                int(data.IsExecutedBefore), 
-                data.SpecialRequirement,
-                data.EntryUserMasterId
+                data.StallMasterId
             )
-        )
+        elif data.StallMasterId is not None:
+            raise HTTPException(
+                status_code=503,
+                detail="Stall assignment is unavailable until sql/schema.sql is applied"
+            )
+        else:
+            # sql/schema.sql not applied yet: bookings without a stall, as before
+            query = LEGACY_STALL_BOOKING_INSERT
+
+        try:
+            cursor.execute(query, params)
+            booked = cursor.rowcount == 1
+        except pyodbc.IntegrityError:
+            # Lost a race for the same stall (UX_StallBookingMaster_StallMasterId)
+            booked = False
+
+        if not booked:
+            conn.rollback()
+            raise HTTPException(status_code=409, detail="Stall is not available for this event")
+
         conn.commit()
+        invalidate_listing_counts()
+        invalidate_stall_availability(data.EventMasterId)
 
         # ---------------------------
         # Send Confirmation Email
@@ -709,6 +1087,9 @@ def add_stall_booking_master(data: StallBookingMasterRequest):
             "message": "Stall booking confirmed successfully and email sent"
         }
 
+    except HTTPException:
+        raise
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -718,49 +1099,68 @@ def add_stall_booking_master(data: StallBookingMasterRequest):
         if conn:
             conn.close()
 
-@app.get("/getStallBookingMasters")
-def get_stall_booking_masters():
-    conn = None
-    cursor = None
+def listing_response(listing, filters: dict, limit: int, cursor: Optional[str]):
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        query = """
-            SELECT 
-                sbm.[StallBookingMasterId],
-                tm.[EventName] AS EventName,
-                sbm.[TenantName],
-                sbm.[TenantBrandName],
-                sbm.[TenantEmail],
-                sbm.[TenantContactNo],
-                sbm.[SocialMediaLink],
-                cm.[CategoryName] AS CategoryName,
-                sbm.[IsExecutedBefore],
-                sbm.[SpecialRequirement]
-            FROM [EventManagement].[dbo].[StallBookingMaster] sbm
-            LEFT JOIN [EventManagement].[dbo].[TicketMaster] tm
-                ON sbm.EventMasterId = tm.TicketMasterId
-            LEFT JOIN [EventManagement].[dbo].[CategoryMaster] cm
-                ON sbm.CategoryId = cm.CategoryMasterId
-            ORDER BY sbm.[EntryDateTime] DESC
-        """
-        cursor.execute(query)
-        rows = cursor.fetchall()
-
-        # Convert rows to list of dicts
-        columns = [column[0] for column in cursor.description]
-        result = [dict(zip(columns, row)) for row in rows]
-
-        return result
+        data, total, next_cursor = list_page(listing, filters, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    headers = {"X-Total-Count": str(total)}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+
+    return json_response(data, headers=headers)
+
+
+@app.get("/getStallBookingMasters")
+def get_stall_booking_masters(
+    event_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    q: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """
+    Stall bookings, newest first. q is a prefix search on tenant and brand
+    name. The body stays a plain list; the total matching count is in
+    X-Total-Count and the next page's cursor in X-Next-Cursor. Without
+    limit/cursor the whole list is returned, as before paging existed.
+    """
+    filters = {
+        "event_id": event_id,
+        "category_id": category_id,
+        "date_from": date_from,
+        "date_to": date_to,
+        "q": q
+    }
+    return listing_response(STALL_BOOKINGS, filters, limit, cursor)
+
+@app.get("/getStallAvailability/{event_master_id}")
+def get_stall_availability_map(event_master_id: int):
+    """
+    Every StallMaster stall of the event with booked/free state (cached per
+    event, cleared by stall and stall booking writes).
+    """
+    if event_master_id <= 0:
+        raise HTTPException(status_code=400, detail="Invalid EventMasterId")
 
+    try:
+        if not has_column("dbo.StallBookingMaster", "StallMasterId"):
+            raise HTTPException(
+                status_code=503,
+                detail="Stall availability is unavailable until sql/schema.sql is applied"
+            )
+        body = get_stall_availability(event_master_id)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+
+    return RawJSONResponse(body)
 
 class SponsorMasterRequest(BaseModel):
     EventMasterId: int
@@ -778,6 +1178,70 @@ class SponsorMasterRequest(BaseModel):
     EntryUserMasterId: int
 
 
+SPONSOR_MASTER_INSERT = """
+    INSERT INTO [EventManagement].[dbo].[SponsorMaster]
+    (
+        EventMasterId,
+        SponsorName,
+        SponsorCompanyName,
+        SponsorContactNo,
+        SponsorEmail,
+        ContactPersonName,
+        ContactPersonDesignation,
+        ContactPersonEmail,
+        ContactPersonMobile,
+        BusinessCategory,
+        ApproximateBudget,
+        InterestedSponsorCategory,
+        EntryUserMasterId
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def sponsor_master_params(data: SponsorMasterRequest) -> tuple:
+    return (
+        data.EventMasterId,
+        data.SponsorName,
+        data.SponsorCompanyName,
+        data.SponsorContactNo,
+        data.SponsorEmail,
+        data.ContactPersonName,
+        data.ContactPersonDesignation,
+        data.ContactPersonEmail,
+        data.ContactPersonMobile,
+        data.BusinessCategory,
+        data.ApproximateBudget,
+        data.InterestedSponsorCategory,
+        data.EntryUserMasterId
+    )
+
+
+def sponsor_confirmation_email(data: SponsorMasterRequest) -> tuple:
+    """
+    (subject, plain-text body) sent to the sponsor's contact person.
+    """
+    return "Sponsor Booking Confirmed", f"""
+Dear {data.ContactPersonName},
+
+Your sponsor booking has been successfully confirmed.
+
+Booking Details:
+Sponsor Name: {data.SponsorName}
+Company Name: {data.SponsorCompanyName}
+Event ID: {data.EventMasterId}
+Business Category: {data.BusinessCategory}
+Interested Sponsor Category: {data.InterestedSponsorCategory}
+Approximate Budget: {data.ApproximateBudget}
+Contact Person: {data.ContactPersonName} ({data.ContactPersonDesignation})
+
+Thank you for partnering with us.
+
+Regards,
+Event Management Team
+"""
+
+
 @app.post("/addSponsorMaster")
 def add_sponsor_master(data: SponsorMasterRequest):
     conn = None
@@ -789,45 +1253,9 @@ def add_sponsor_master(data: SponsorMasterRequest):
         # ---------------------------
         # Insert Sponsor Master
         # ---------------------------
-        query = """
-            INSERT INTO [EventManagement].[dbo].[SponsorMaster]
-            (
-                EventMasterId,
-                SponsorName,
-                SponsorCompanyName,
-                SponsorContactNo,
-                SponsorEmail,
-                ContactPersonName,
-                ContactPersonDesignation,
-                ContactPersonEmail,
-                ContactPersonMobile,
-                BusinessCategory,
-                ApproximateBudget,
-                InterestedSponsorCategory,
-                EntryUserMasterId
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
-
-            SELECT SCOPE_IDENTITY();
-        """
-
         cursor.execute(
-            query,
-            (
-                data.EventMasterId,
-                data.SponsorName,
-                data.SponsorCompanyName,
-                data.SponsorContactNo,
-                data.SponsorEmail,
-                data.ContactPersonName,
-                data.ContactPersonDesignation,
-                data.ContactPersonEmail,
-                data.ContactPersonMobile,
-                data.BusinessCategory,
-                data.ApproximateBudget,
-                data.InterestedSponsorCategory,
-                data.EntryUserMasterId
-            )
+            SPONSOR_MASTER_INSERT + ";\n    SELECT SCOPE_IDENTITY();",
+            sponsor_master_params(data)
         )
 
         # Get inserted ID
@@ -835,32 +1263,13 @@ def add_sponsor_master(data: SponsorMasterRequest):
         sponsor_master_id = cursor.fetchone()[0]
 
         conn.commit()
+        invalidate_listing_counts()
 
         # ---------------------------
         # Send Email (PLAIN TEXT)
         # ---------------------------
         if data.ContactPersonEmail:
-            email_subject = "Sponsor Booking Confirmed"
-
-            email_body = f"""
-Dear {data.ContactPersonName},
-
-Your sponsor booking has been successfully confirmed.
-
-Booking Details:
-Sponsor Name: {data.SponsorName}
-Company Name: {data.SponsorCompanyName}
-Event ID: {data.EventMasterId}
-Business Category: {data.BusinessCategory}
-Interested Sponsor Category: {data.InterestedSponsorCategory}
-Approximate Budget: {data.ApproximateBudget}
-Contact Person: {data.ContactPersonName} ({data.ContactPersonDesignation})
-
-Thank you for partnering with us.
-
-Regards,
-Event Management Team
-"""
+            email_subject, email_body = sponsor_confirmation_email(data)
 
             send_email(
                 data.ContactPersonEmail,
@@ -885,50 +1294,83 @@ Event Management Team
 
 
 @app.get("/getSponsorMasters")
-def get_sponsor_masters():
-    conn = None
-    cursor = None
-    try:
-        conn = get_connection()
-        cursor = conn.cursor()
+def get_sponsor_masters(
+    event_id: Optional[int] = None,
+    business_category: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    q: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """
+    Sponsors, newest first. q is a prefix search on sponsor and company
+    name. Paging headers as for /getStallBookingMasters.
+    """
+    filters = {
+        "event_id": event_id,
+        "business_category": business_category,
+        "date_from": date_from,
+        "date_to": date_to,
+        "q": q
+    }
+    return listing_response(SPONSORS, filters, limit, cursor)
 
-        query = """
-            SELECT
-                sm.[SponsorMasterId],
-                tm.[EventName] AS EventName,
-                sm.[SponsorName],
-                sm.[SponsorCompanyName],
-                sm.[SponsorContactNo],
-                sm.[SponsorEmail],
-                sm.[ContactPersonName],
-                sm.[ContactPersonDesignation],
-                sm.[ContactPersonEmail],
-                sm.[ContactPersonMobile],
-                sm.[BusinessCategory],
-                sm.[ApproximateBudget],
-                sm.[InterestedSponsorCategory]
-            FROM [EventManagement].[dbo].[SponsorMaster] sm
-            LEFT JOIN [EventManagement].[dbo].[TicketMaster] tm
-                ON sm.EventMasterId = tm.TicketMasterId
-            ORDER BY sm.[EntryDateTime] DESC
-        """
-
-        cursor.execute(query)
-        rows = cursor.fetchall()
-
-        columns = [col[0] for col in cursor.description]
-        result = [dict(zip(columns, row)) for row in rows]
-
-        return result  
+# --------------------------------
+# Bulk CSV import (admin)
+# CSV headers are the field names of the single-row request models
+# --------------------------------
+def send_sponsor_confirmations(sponsors: list):
+    """
+    Confirmation emails for imported sponsors over one SMTP session.
+    """
+    with SMTPSession() as smtp:
+        for data in sponsors:
+            if not data.ContactPersonEmail:
+                continue
 
+            try:
+                smtp.send(build_text_email(data.ContactPersonEmail, *sponsor_confirmation_email(data)))
+            except Exception as e:
+                logger.error(f"Sponsor confirmation to {data.ContactPersonEmail} failed: {e}")
+
+
+def run_bulk_import(file: UploadFile, model, query: str, to_params, dry_run: bool) -> tuple:
+    try:
+        report, inserted = import_csv(file.file, model, query, to_params, dry_run=dry_run)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+    return {"status": 1 if not report.failed else 0, "dry_run": dry_run, **report.to_dict()}, inserted
+
+
+@app.post("/admin/import/stallMasters", dependencies=[Depends(require_admin)])
+def import_stall_masters(file: UploadFile = File(...), dry_run: bool = False):
+    result, inserted = run_bulk_import(file, StallMasterRequest, STALL_MASTER_INSERT, stall_master_params, dry_run)
+
+    for event_master_id in {stall.event_master_id for stall in inserted}:
+        invalidate_stall_availability(event_master_id)
+
+    return json_response(result)
+
+
+@app.post("/admin/import/categories", dependencies=[Depends(require_admin)])
+def import_categories(file: UploadFile = File(...), dry_run: bool = False):
+    result, _ = run_bulk_import(file, CategoryRequest, CATEGORY_INSERT, category_params, dry_run)
+    return json_response(result)
+
+
+@app.post("/admin/import/sponsorMasters", dependencies=[Depends(require_admin)])
+def import_sponsor_masters(background_tasks: BackgroundTasks, file: UploadFile = File(...), dry_run: bool = False):
+    result, inserted = run_bulk_import(
+        file, SponsorMasterRequest, SPONSOR_MASTER_INSERT, sponsor_master_params, dry_run
+    )
+
+    if inserted:
+        invalidate_listing_counts()
+        background_tasks.add_task(send_sponsor_confirmations, inserted)
+
+    return json_response(result)
 
 class RazorpayOrderRequest(BaseModel):
     ticket_master_id: int
@@ -939,10 +1381,31 @@ class RazorpayOrderRequest(BaseModel):
     ticket_count: int
 
 
-@app.post("/ticket/addTicketIssue")
-def create_razorpay_order(data: RazorpayOrderRequest):
+TICKET_ISSUE_INSERT = """
+    INSERT INTO TicketIssue
+    (TicketMasterId, MobileNo, EmailId, TicketCount, TotalAmount,
+     EntryDateTime, Name, TransactionId, TicketClassificationId)
+    OUTPUT INSERTED.TicketIssueId
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+LEGACY_TICKET_ISSUE_INSERT = """
+    INSERT INTO TicketIssue
+    (TicketMasterId, MobileNo, EmailId, TicketCount, TotalAmount,
+     EntryDateTime, Name, TransactionId)
+    OUTPUT INSERTED.TicketIssueId
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def create_pending_ticket_issue(data: RazorpayOrderRequest) -> tuple:
+    """
+    Validates the rate and inserts TicketIssue with a blank TransactionId
+    in its own short transaction. Returns (ticket_issue_id, total_amount).
+    """
     conn = get_connection()
     cursor = conn.cursor()
+    hold_id = None
 
     try:
         # ----------------------------------
@@ -961,42 +1424,30 @@ def create_razorpay_order(data: RazorpayOrderRequest):
         if not row:
             raise HTTPException(400, "Invalid ticket")
 
-        rate = float(row.TicketRate)
+        rate = Decimal(str(row.TicketRate))
         min_tickets = row.MinimumTickets
 
         if data.ticket_count < min_tickets:
             raise HTTPException(400, f"Minimum {min_tickets} tickets required")
 
         total_amount = rate * data.ticket_count
-        total_amount_paise = int(total_amount * 100)
 
         # ----------------------------------
-        # Create Razorpay Order
+        # Hold inventory (MaxLimit)
         # ----------------------------------
-        razorpay_order = razorpay_client.order.create({
-            "amount": total_amount_paise,
-            "currency": "INR",
-            "receipt": f"TICKET_{data.mobile_no}"
-        })
+        try:
+            hold_id = inventory.reserve(
+                data.ticket_master_id,
+                data.ticket_classification_id,
+                data.ticket_count
+            )
+        except SoldOutError as e:
+            raise HTTPException(409, str(e))
 
         # ----------------------------------
         # Insert TicketIssue with blank TransactionId
         # ----------------------------------
-        cursor.execute("""
-            INSERT INTO TicketIssue
-            (
-                TicketMasterId,
-                MobileNo,
-                EmailId,
-                TicketCount,
-                TotalAmount,
-                EntryDateTime,
-                Name,
-                TransactionId
-            )
-            OUTPUT INSERTED.TicketIssueId
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+        params = (
             data.ticket_master_id,
             data.mobile_no,
             data.email_id,
@@ -1004,187 +1455,164 @@ def create_razorpay_order(data: RazorpayOrderRequest):
             total_amount,
             datetime.now(),
             data.name,
-            ""  
-        ))
+            ""
+        )
+
+        if has_column("dbo.TicketIssue", "TicketClassificationId"):
+            query = TICKET_ISSUE_INSERT
+            params += (data.ticket_classification_id,)
+        else:
+            # sql/schema.sql not applied yet: analytics match these on unit price
+            query = LEGACY_TICKET_ISSUE_INSERT
+
+        cursor.execute(query, params)
 
         ticket_issue_id = int(cursor.fetchone()[0])
         conn.commit()
 
-        # ----------------------------------
-        # Return both IDs for frontend
-        # ----------------------------------
-        return {
-            "order_id": razorpay_order["id"],  
-            "ticket_issue_id": ticket_issue_id 
-        }
+        inventory.bind(hold_id, ticket_issue_id)
 
-    except Exception as e:
+        return ticket_issue_id, total_amount
+
+    except Exception:
         conn.rollback()
-        raise HTTPException(500, str(e))
+        if hold_id:
+            inventory.release(hold_id)
+        raise
 
     finally:
         cursor.close()
         conn.close()
 
-class PaymentVerificationRequest(BaseModel):
-    ticket_issue_id: int
-    razorpay_payment_id: str
 
+def discard_pending_ticket_issue(ticket_issue_id: int):
+    """
+    Removes a TicketIssue whose Razorpay order could not be created
+    and gives its tickets back to the inventory.
+    """
+    inventory.release(ticket_issue_id=ticket_issue_id)
 
-@app.post("/ticket/verifyPayment")
-def verify_payment(
-    data: PaymentVerificationRequest,
-    background_tasks: BackgroundTasks
-):
     conn = get_connection()
     cursor = conn.cursor()
 
     try:
-        # ---------------------------
-        # Fetch TicketIssue
-        # ---------------------------
         cursor.execute("""
-            SELECT
-                TicketMasterId,
-                MobileNo,
-                EmailId,
-                TicketCount,
-                TotalAmount,
-                Name,
-                TransactionId
-            FROM TicketIssue
+            DELETE FROM TicketIssue
             WHERE TicketIssueId = ?
-        """, data.ticket_issue_id)
+              AND (TransactionId IS NULL OR TransactionId = '')
+        """, ticket_issue_id)
+        conn.commit()
 
-        row = cursor.fetchone()
-        if not row:
-            return {
-                "status": 0,
-                "message": "TicketIssue not found"
-            }
+    finally:
+        cursor.close()
+        conn.close()
 
-        ticket_master_id = row.TicketMasterId
-        mobile_no = row.MobileNo
-        email_id = row.EmailId
-        ticket_count = row.TicketCount
-        total_amount = row.TotalAmount
-        name = row.Name
-        existing_transaction = row.TransactionId
-        entry_datetime = datetime.now()
-
-        # ------------------------------
-        # Prevent duplicate payment
-        # ------------------------------
-        if existing_transaction and existing_transaction.startswith("pay_"):
-            return {
-                "status": 0,
-                "message": "Payment already processed"
-            }
 
-        # ----------------------------
-        # Get Ticket Images 
-        # ----------------------------
-        cursor.execute("""
-            SELECT Image5, Image6
-            FROM TicketMaster
-            WHERE TicketMasterId = ?
-        """, ticket_master_id)
+@app.post("/ticket/addTicketIssue")
+async def create_razorpay_order(
+    data: RazorpayOrderRequest,
+    x_admission_token: Optional[str] = Header(None)
+):
+    require_admission(x_admission_token, data.ticket_master_id)
 
-        img_row = cursor.fetchone()
-        image5_path = None
-        image6_path = None
+    # ----------------------------------
+    # DB work (short transaction, off the event loop)
+    # ----------------------------------
+    try:
+        ticket_issue_id, total_amount = await run_in_threadpool(
+            create_pending_ticket_issue, data
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(500, str(e))
+
+    # ----------------------------------
+    # Create Razorpay Order (no DB connection held)
+    # (TicketIssueId in receipt/notes lets the webhook find the order)
+    # ----------------------------------
+    try:
+        razorpay_order = await create_order(
+            amount=to_paise(total_amount),
+            currency="INR",
+            receipt=f"TICKET_{ticket_issue_id}",
+            notes={
+                "ticket_issue_id": str(ticket_issue_id),
+                "mobile_no": data.mobile_no
+            }
+        )
+    except RazorpayError as e:
+        logger.error(f"Razorpay order failed for TicketIssueId={ticket_issue_id}: {e}")
+        await run_in_threadpool(discard_pending_ticket_issue, ticket_issue_id)
+        raise HTTPException(502, f"Payment gateway error: {e}")
+
+    # ----------------------------------
+    # Return both IDs for frontend
+    # ----------------------------------
+    return {
+        "order_id": razorpay_order["id"],
+        "ticket_issue_id": ticket_issue_id
+    }
 
-        if img_row:
-            if img_row.Image5:
-                image5_path = os.path.join(IMAGE_BASE_PATH, img_row.Image5)
-            if img_row.Image6:
-                image6_path = os.path.join(IMAGE_BASE_PATH, img_row.Image6)
+class PaymentVerificationRequest(BaseModel):
+    ticket_issue_id: int
+    razorpay_payment_id: str
 
-        # --------------------------------------------------
-        # Update payment transaction ID
-        # --------------------------------------------------
-        cursor.execute("""
-            UPDATE TicketIssue
-            SET TransactionId = ?
-            WHERE TicketIssueId = ?
-        """, (
-            data.razorpay_payment_id,
-            data.ticket_issue_id
-        ))
 
+@app.post("/ticket/verifyPayment")
+def verify_payment(
+    data: PaymentVerificationRequest,
+    background_tasks: BackgroundTasks
+):
+    try:
         # --------------------------------------------------
-        # TicketIssueDetails + QR + PDF
+        # Claim + TicketIssueDetails + QR + PDF (deduplicated)
         # --------------------------------------------------
-        pdf_files = []
-
-        for i in range(1, ticket_count + 1):
-
-            cursor.execute("""
-                INSERT INTO TicketIssueDetails (TicketIssueId)
-                OUTPUT INSERTED.TicketIssueDetailsId
-                VALUES (?)
-            """, data.ticket_issue_id)
-
-            details_id = int(cursor.fetchone()[0])
-
-            qr_string = generate_qr_string(
-                data.ticket_issue_id,
-                details_id
-            )
-
-            cursor.execute("""
-                UPDATE TicketIssueDetails
-                SET QRCode = ?
-                WHERE TicketIssueDetailsId = ?
-            """, (qr_string, details_id))
-
-            pdf_path = create_ticket_pdf(
-                ticket_issue_id=data.ticket_issue_id,
-                ticket_master_id=ticket_master_id,
-                country_code="91",
-                mobile_no=mobile_no,
-                name=name,
-                ticket_no=i,
-                total_tickets=ticket_count,
-                details_id=details_id,
-                qr_code=qr_string,
-                image5_path=image5_path, 
-                image6_path=image6_path   
-            )
-
-            pdf_files.append(pdf_path)
-
-        conn.commit()
+        result, is_leader = issue_tickets_once(
+            data.ticket_issue_id,
+            data.razorpay_payment_id
+        )
 
         # --------------------------------------------------
-        # Email + WhatsApp
+        # Email + WhatsApp (only from the request that issued)
         # --------------------------------------------------
-        background_tasks.add_task(
-            send_email_and_whatsapp,
-            email_id,
-            name,
-            mobile_no,
-            entry_datetime,
-            ticket_count,
-            total_amount,
-            pdf_files
-        )
+        if is_leader and result.notification:
+            background_tasks.add_task(
+                send_email_and_whatsapp,
+                *result.notification
+            )
 
-        return {
-            "status": 1,
-            "message": "Payment verified and tickets issued successfully"
-        }
+        return result.response
 
     except Exception as e:
-        conn.rollback()
         return {
             "status": 0,
             "message": f"Payment verification failed: {str(e)}"
         }
 
-    finally:
-        cursor.close()
-        conn.close()
+@app.post("/razorpay/webhook")
+async def razorpay_webhook(request: Request):
+    body = await request.body()
+
+    if not verify_webhook_signature(body, request.headers.get("X-Razorpay-Signature")):
+        raise HTTPException(status_code=400, detail="Invalid signature")
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid payload")
+
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Invalid payload")
+
+    # Acknowledge fast, tickets are issued by the webhook-processor task
+    queued = await run_in_threadpool(
+        enqueue_webhook_event,
+        request.headers.get("X-Razorpay-Event-Id"),
+        payload
+    )
+
+    return {"status": 1, "queued": queued}
 
 @app.get("/addTicketEnquiry")
 def get_ticket_enquiry():
@@ -0,0 +1,208 @@
+from dataclasses import dataclass
+from datetime import timedelta
+from core.config import settings
+from core.database import get_connection, has_column
+from utils.cache import TTLCache
+from utils.fast_json import rows_to_dicts
+from utils.pagination import encode_cursor, decode_cursor
+
+ADMIN_LIST_PAGE_SIZE = 100
+
+# COUNT(*) per filter set; pages are always read live
+listing_count_cache = TTLCache(ttl=settings.admin_list_count_ttl, maxsize=256)
+
+
+@dataclass(frozen=True)
+class Listing:
+    name: str
+    table: str
+    alias: str
+    id_column: str
+    select: str
+    joins: str
+    search_columns: tuple
+    # Columns of the listing's table added by sql/schema.sql, selected once present
+    optional_columns: tuple = ()
+
+
+STALL_BOOKINGS = Listing(
+    name="stall_bookings",
+    table="[EventManagement].[dbo].[StallBookingMaster]",
+    alias="sbm",
+    id_column="StallBookingMasterId",
+    select="""
+        sbm.[StallBookingMasterId],
+        tm.[EventName] AS EventName,
+        sbm.[TenantName],
+        sbm.[TenantBrandName],
+        sbm.[TenantEmail],
+        sbm.[TenantContactNo],
+        sbm.[SocialMediaLink],
+        cm.[CategoryName] AS CategoryName,
+        sbm.[IsExecutedBefore],
+        sbm.[SpecialRequirement]
+    """,
+    joins="""
+        LEFT JOIN [EventManagement].[dbo].[TicketMaster] tm
+            ON sbm.EventMasterId = tm.TicketMasterId
+        LEFT JOIN [EventManagement].[dbo].[CategoryMaster] cm
+            ON sbm.CategoryId = cm.CategoryMasterId
+    """,
+    search_columns=("TenantName", "TenantBrandName"),
+    optional_columns=("StallMasterId",)
+)
+
+SPONSORS = Listing(
+    name="sponsors",
+    table="[EventManagement].[dbo].[SponsorMaster]",
+    alias="sm",
+    id_column="SponsorMasterId",
+    select="""
+        sm.[SponsorMasterId],
+        tm.[EventName] AS EventName,
+        sm.[SponsorName],
+        sm.[SponsorCompanyName],
+        sm.[SponsorContactNo],
+        sm.[SponsorEmail],
+        sm.[ContactPersonName],
+        sm.[ContactPersonDesignation],
+        sm.[ContactPersonEmail],
+        sm.[ContactPersonMobile],
+        sm.[BusinessCategory],
+        sm.[ApproximateBudget],
+        sm.[InterestedSponsorCategory]
+    """,
+    joins="""
+        LEFT JOIN [EventManagement].[dbo].[TicketMaster] tm
+            ON sm.EventMasterId = tm.TicketMasterId
+    """,
+    search_columns=("SponsorName", "SponsorCompanyName")
+)
+
+
+def _like_prefix(text: str) -> str:
+    # Prefix match only, so the name indexes can seek
+    escaped = text.replace("[", "[[]").replace("%", "[%]").replace("_", "[_]")
+    return escaped + "%"
+
+
+def build_filters(listing: Listing, filters: dict) -> tuple:
+    """
+    WHERE clauses + params on the listing's own table. Supported keys:
+    event_id, category_id, business_category, date_from, date_to, q.
+    """
+    alias = listing.alias
+    where = []
+    params = []
+
+    if filters.get("event_id") is not None:
+        where.append(f"{alias}.EventMasterId = ?")
+        params.append(filters["event_id"])
+
+    if filters.get("category_id") is not None:
+        where.append(f"{alias}.CategoryId = ?")
+        params.append(filters["category_id"])
+
+    if filters.get("business_category"):
+        where.append(f"{alias}.BusinessCategory = ?")
+        params.append(filters["business_category"])
+
+    if filters.get("date_from"):
+        where.append(f"{alias}.EntryDateTime >= ?")
+        params.append(filters["date_from"])
+
+    if filters.get("date_to"):
+        # date_to is inclusive of the whole day
+        where.append(f"{alias}.EntryDateTime < ?")
+        params.append(filters["date_to"] + timedelta(days=1))
+
+    q = (filters.get("q") or "").strip()
+    if q:
+        pattern = _like_prefix(q)
+        where.append("(" + " OR ".join(f"{alias}.{column} LIKE ?" for column in listing.search_columns) + ")")
+        params += [pattern] * len(listing.search_columns)
+
+    return where, params
+
+
+def _count(listing: Listing, where: list, params: list) -> int:
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            f"SELECT COUNT(*) FROM {listing.table} {listing.alias}"
+            + (f" WHERE {' AND '.join(where)}" if where else ""),
+            *params
+        )
+        return int(cursor.fetchone()[0])
+
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def list_page(listing: Listing, filters: dict, limit: int | None = None, cursor: str | None = None) -> tuple:
+    """
+    (rows, total, next_cursor): one page, newest first, keyset paged on
+    the identity column. total counts all rows matching the filters and
+    is cached for admin_list_count_ttl seconds.
+    Without limit and cursor every matching row is returned (the lists'
+    original behaviour); a cursor alone pages by ADMIN_LIST_PAGE_SIZE.
+    Raises ValueError for a bad cursor.
+    """
+    after_id = decode_cursor(cursor, int)[0] if cursor else None
+    if limit is None and after_id is not None:
+        limit = ADMIN_LIST_PAGE_SIZE
+    where, params = build_filters(listing, filters)
+
+    # Keyed on filter names too: event_id=5 and category_id=5 share params
+    count_key = (listing.name, tuple(sorted((k, v) for k, v in filters.items() if v not in (None, ""))))
+    total = listing_count_cache.get_or_load(count_key, _count, listing, list(where), list(params))
+
+    id_column = f"{listing.alias}.{listing.id_column}"
+    if after_id is not None:
+        where.append(f"{id_column} < ?")
+        params.append(after_id)
+
+    select = listing.select + "".join(
+        f", {listing.alias}.[{column}]"
+        for column in listing.optional_columns
+        # schema.table: COL_LENGTH resolves names in the current database
+        if has_column(listing.table.split(".", 1)[1], column)
+    )
+
+    query = f"""
+        SELECT {"TOP (?)" if limit is not None else ""} {select}
+        FROM {listing.table} {listing.alias}
+        {listing.joins}
+        {f"WHERE {' AND '.join(where)}" if where else ""}
+        ORDER BY {id_column} DESC
+    """
+
+    conn = get_connection()
+    db_cursor = conn.cursor()
+
+    try:
+        # One extra row tells whether there is a next page
+        top = [limit + 1] if limit is not None else []
+        db_cursor.execute(query, *top, *params)
+        data = rows_to_dicts(db_cursor, db_cursor.fetchall())
+
+    finally:
+        db_cursor.close()
+        conn.close()
+
+    next_cursor = None
+    if limit is not None and len(data) > limit:
+        data = data[:limit]
+        next_cursor = encode_cursor(data[-1][listing.id_column])
+
+    return data, total, next_cursor
+
+
+def invalidate_listing_counts():
+    """
+    Called after inserts so totals are not stale for a full TTL.
+    """
+    listing_count_cache.clear()
@@ -0,0 +1,174 @@
+import io
+import csv
+from typing import Callable
+from pydantic import BaseModel, ValidationError
+from core.config import settings
+from core.database import get_connection
+from utils.utils import logger
+
+BULK_IMPORT_CHUNK_SIZE = settings.bulk_import_chunk_size
+BULK_IMPORT_MAX_ROWS = settings.bulk_import_max_rows
+# Per-row errors returned in the report; the counts always cover every row
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportReport:
+    def __init__(self):
+        self.total_rows = 0
+        self.inserted = 0
+        self.failed = 0
+        self.truncated = False
+        self.errors = []
+
+    def error(self, row_no: int, messages: list):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_no, "errors": messages})
+
+    def to_dict(self) -> dict:
+        return {
+            "total_rows": self.total_rows,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "truncated": self.truncated,
+            # Validation errors are found while reading, insert errors per chunk
+            "errors": sorted(self.errors, key=lambda e: e["row"])
+        }
+
+
+def read_csv_rows(binary_file):
+    """
+    (row_no, dict) per CSV data row, read straight from the upload's
+    spooled file. row_no is the line number in the file (header is 1).
+    Blank cells become None so Optional model fields stay unset.
+    """
+    text = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+
+    try:
+        reader = csv.DictReader(text)
+        if reader.fieldnames:
+            reader.fieldnames = [name.strip() for name in reader.fieldnames]
+
+        for row in reader:
+            yield reader.line_num, {
+                key: (value.strip() or None) if isinstance(value, str) else value
+                for key, value in row.items()
+                if key
+            }
+
+    finally:
+        # Leave closing the underlying upload to the framework
+        text.detach()
+
+
+def _read_rows(binary_file, report: ImportReport):
+    row_no = 1
+    try:
+        for row_no, row in read_csv_rows(binary_file):
+            yield row_no, row
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Rows read so far are still imported
+        report.error(row_no + 1, [f"Unreadable CSV: {e}"])
+
+
+def _validation_messages(e: ValidationError) -> list:
+    return [
+        f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}"
+        for err in e.errors()
+    ]
+
+
+def _insert_chunk(conn, query: str, chunk: list, report: ImportReport, inserted: list):
+    """
+    One transaction per chunk. When the chunk fails (constraint, FK,
+    truncation...) it is rolled back and retried row by row, so only the
+    offending rows are reported.
+    """
+    cursor = conn.cursor()
+    cursor.fast_executemany = True
+
+    try:
+        cursor.executemany(query, [params for _, params, _ in chunk])
+        conn.commit()
+        report.inserted += len(chunk)
+        inserted += [model for _, _, model in chunk]
+        return
+
+    except Exception as e:
+        conn.rollback()
+        logger.warning(f"Bulk import chunk of {len(chunk)} rows failed, retrying per row: {e}")
+
+    finally:
+        cursor.close()
+
+    cursor = conn.cursor()
+
+    try:
+        for row_no, params, model in chunk:
+            try:
+                cursor.execute(query, params)
+                conn.commit()
+                report.inserted += 1
+                inserted.append(model)
+            except Exception as e:
+                conn.rollback()
+                report.error(row_no, [str(e)])
+
+    finally:
+        cursor.close()
+
+
+def import_csv(
+    binary_file,
+    model: type[BaseModel],
+    query: str,
+    to_params: Callable[[BaseModel], tuple],
+    dry_run: bool = False,
+    chunk_size: int = BULK_IMPORT_CHUNK_SIZE
+) -> tuple:
+    """
+    Validates every CSV row with `model` and inserts valid rows with
+    fast_executemany, chunk_size rows per transaction. CSV headers are the
+    model's field names. Returns (ImportReport, inserted models) so the
+    caller can queue notifications for the rows that landed.
+    """
+    report = ImportReport()
+    inserted = []
+    chunk = []
+    conn = None if dry_run else get_connection()
+
+    try:
+        for row_no, row in _read_rows(binary_file, report):
+            if report.total_rows >= BULK_IMPORT_MAX_ROWS:
+                report.truncated = True
+                break
+
+            report.total_rows += 1
+
+            try:
+                item = model(**row)
+            except ValidationError as e:
+                report.error(row_no, _validation_messages(e))
+                continue
+
+            if dry_run:
+                continue
+
+            chunk.append((row_no, to_params(item), item))
+            if len(chunk) >= chunk_size:
+                _insert_chunk(conn, query, chunk, report, inserted)
+                chunk = []
+
+        if chunk:
+            _insert_chunk(conn, query, chunk, report, inserted)
+
+    finally:
+        if conn:
+            conn.close()
+
+    logger.info(
+        f"Bulk import {model.__name__}: rows={report.total_rows} inserted={report.inserted} "
+        f"failed={report.failed} dry_run={dry_run}"
+    )
+
+    return report, inserted
@@ -0,0 +1,337 @@
+import os
+import json
+import time
+import threading
+from decimal import Decimal
+from datetime import datetime
+from core.config import settings
+from core.database import get_connection
+from utils.cache import TTLCache
+from utils.utils import logger
+
+ENQUIRY_SPILL_DIR = settings.enquiry_spill_dir
+ENQUIRY_BATCH_SIZE = settings.enquiry_batch_size
+ENQUIRY_FLUSH_INTERVAL = settings.enquiry_flush_interval
+
+# SQL Server allows 2100 parameters per statement: 200 rows x 8 columns
+INSERT_CHUNK_ROWS = 200
+
+_COLUMNS = (
+    "TicketMasterId",
+    "MobileNo",
+    "EmailId",
+    "TicketCount",
+    "TotalAmount",
+    "EntryDateTime",
+    "Name",
+    "IsSend"
+)
+_ROW_PLACEHOLDER = "(" + ", ".join("?" * len(_COLUMNS)) + ")"
+
+# (TicketRate, MinimumTickets) per event, () when the event has no rate
+_rate_cache = TTLCache(ttl=settings.enquiry_rate_cache_ttl, maxsize=1024)
+
+
+def _load_rate(ticket_master_id: int) -> tuple:
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            SELECT TOP 1 TicketRate, MinimumTickets
+            FROM TicketClassification
+            WHERE TicketMasterId = ?
+        """, ticket_master_id)
+
+        row = cursor.fetchone()
+        return (row[0], row[1]) if row else ()
+
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def get_enquiry_rate(ticket_master_id: int) -> tuple | None:
+    """
+    (TicketRate, MinimumTickets) used to price an enquiry, cached.
+    """
+    return _rate_cache.get_or_load(ticket_master_id, _load_rate, ticket_master_id) or None
+
+
+def _insert_enquiries(records: list):
+    """
+    Multi-row INSERTs, all chunks in one transaction.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        for i in range(0, len(records), INSERT_CHUNK_ROWS):
+            chunk = records[i:i + INSERT_CHUNK_ROWS]
+            params = []
+            for r in chunk:
+                params += [
+                    r["ticket_master_id"],
+                    r["mobile_no"],
+                    r["email_id"],
+                    r["ticket_count"],
+                    Decimal(r["total_amount"]),
+                    datetime.fromisoformat(r["entry_datetime"]),
+                    r["name"],
+                    0
+                ]
+
+            cursor.execute(
+                f"INSERT INTO TicketEnquiry ({', '.join(_COLUMNS)}) "
+                f"VALUES {', '.join([_ROW_PLACEHOLDER] * len(chunk))}",
+                *params
+            )
+
+        conn.commit()
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _database_reachable() -> bool:
+    try:
+        conn = get_connection()
+    except Exception:
+        return False
+    conn.close()
+    return True
+
+
+def _write_segment(path: str, records: list):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, default=str, separators=(",", ":")) + "\n")
+    os.replace(tmp_path, path)
+
+
+def _read_segment(path: str) -> list:
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Torn last line after a crash
+                logger.warning(f"Skipping malformed enquiry line in {path}")
+    return records
+
+
+class EnquiryBuffer:
+    """
+    Write-behind buffer for TicketEnquiry.
+
+    add() appends the enquiry to the open spill segment (JSON lines) and
+    returns. A flusher thread seals the segment once it holds batch_size
+    enquiries or every flush_interval seconds, inserts it in batched
+    multi-row INSERTs and deletes the file after commit. A segment that
+    fails is retried row by row; rows the database still rejects are moved
+    to a dead-letter file (dead-*.jsonl, same format, rename to
+    enquiries-*.jsonl to replay) so one bad row cannot block the queue.
+    When the database is unreachable the segment stays on disk and is
+    retried on the next flush, including after a restart.
+    """
+
+    CURRENT = "current.jsonl"
+
+    def __init__(
+        self,
+        spill_dir: str = ENQUIRY_SPILL_DIR,
+        batch_size: int = ENQUIRY_BATCH_SIZE,
+        flush_interval: float = ENQUIRY_FLUSH_INTERVAL,
+        insert=_insert_enquiries,
+        reachable=_database_reachable
+    ):
+        self.spill_dir = spill_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._insert = insert
+        self._reachable = reachable
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._file = None
+        self._buffered = 0
+        self._sealed_count = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _current_path(self) -> str:
+        return os.path.join(self.spill_dir, self.CURRENT)
+
+    def _seal(self):
+        # Caller holds self._lock
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        path = self._current_path()
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            os.replace(path, os.path.join(self.spill_dir, f"enquiries-{time.time_ns()}.jsonl"))
+            self._sealed_count += self._buffered
+        self._buffered = 0
+
+    def _sealed_segments(self) -> list:
+        return sorted(
+            os.path.join(self.spill_dir, name)
+            for name in os.listdir(self.spill_dir)
+            if name.startswith("enquiries-") and name.endswith(".jsonl")
+        )
+
+    def add(self, record: dict):
+        line = json.dumps(record, default=str, separators=(",", ":")) + "\n"
+
+        with self._lock:
+            if self._file is None:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                self._file = open(self._current_path(), "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            self._buffered += 1
+            full = self._buffered >= self.batch_size
+
+        if full:
+            self._wake.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._buffered + self._sealed_count
+
+    def _insert_rows(self, path: str, records: list) -> tuple:
+        """
+        Per-row retry of a failed segment. Returns (inserted, failed
+        [(record, error)], complete). The segment is rewritten after every
+        insert so a crash never replays a row that already landed. Stops
+        (complete=False) as soon as a row fails with the database
+        unreachable; the segment then holds every row not inserted.
+        """
+        inserted = 0
+        failed = []
+
+        for i, record in enumerate(records):
+            try:
+                self._insert([record])
+                inserted += 1
+            except Exception as e:
+                if not self._reachable():
+                    return inserted, failed, False
+                failed.append((record, e))
+                continue
+
+            _write_segment(path, [r for r, _ in failed] + records[i + 1:])
+
+        return inserted, failed, True
+
+    def _dead_letter(self, path: str, failed: list):
+        dead_path = os.path.join(self.spill_dir, f"dead-{time.time_ns()}.jsonl")
+        _write_segment(dead_path, [record for record, _ in failed])
+
+        for record, e in failed:
+            logger.error(
+                f"Enquiry rejected, moved to {dead_path}: "
+                f"TicketMasterId={record.get('ticket_master_id')} {e}"
+            )
+
+    def flush(self) -> int:
+        """
+        Seals the open segment and inserts every sealed one, oldest first.
+        Returns the number of enquiries written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not os.path.isdir(self.spill_dir):
+                    return 0
+                self._seal()
+
+            written = 0
+            for path in self._sealed_segments():
+                records = _read_segment(path)
+                inserted = len(records)
+
+                try:
+                    if records:
+                        self._insert(records)
+
+                except Exception as e:
+                    # Database down: keep the segment, and the later ones, for
+                    # the next flush instead of a connect timeout per row
+                    if not self._reachable():
+                        logger.error(f"Enquiry flush failed, {len(records)} kept in {path}: {e}")
+                        break
+
+                    logger.warning(f"Enquiry segment of {len(records)} failed, retrying per row: {e}")
+                    inserted, failed, complete = self._insert_rows(path, records)
+
+                    if not complete:
+                        logger.error(
+                            f"Enquiry flush stopped, database unreachable: "
+                            f"{len(records) - inserted} kept in {path}"
+                        )
+                        written += inserted
+                        with self._lock:
+                            self._sealed_count = max(0, self._sealed_count - inserted)
+                        break
+
+                    if failed:
+                        self._dead_letter(path, failed)
+
+                os.remove(path)
+                written += inserted
+                with self._lock:
+                    self._sealed_count = max(0, self._sealed_count - len(records))
+
+            if written:
+                logger.info(f"Flushed {written} ticket enquiries")
+
+            return written
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Enquiry flusher failed: {e}")
+
+    def start(self):
+        """
+        Recovers segments left by a previous process and starts the flusher.
+        """
+        if os.path.isdir(self.spill_dir):
+            with self._lock:
+                self._seal()
+                self._sealed_count = 0
+                for path in self._sealed_segments():
+                    self._sealed_count += len(_read_segment(path))
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="enquiry-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 10):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+
+        # Whatever can't be written now stays in the spill dir for next start
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Final enquiry flush failed: {e}")
+
+
+enquiry_buffer = EnquiryBuffer()
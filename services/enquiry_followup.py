@@ -0,0 +1,242 @@
+import time
+import argparse
+from datetime import datetime, timedelta
+from core.config import settings
+from core.database import get_connection
+from core.metrics import registry
+from services.mail_service import SMTPSession, build_html_email
+from utils.template_loader import render_html_template
+from utils.utils import logger
+
+ENQUIRY_FOLLOWUP_BATCH_SIZE = settings.enquiry_followup_batch_size
+# Older unsent enquiries (everything from before this job existed) are left alone
+ENQUIRY_FOLLOWUP_MAX_AGE_DAYS = settings.enquiry_followup_max_age_days
+DIGEST_TEMPLATE = "templates/enquiry_digest.html"
+
+registry.describe("enquiry_followup_sent_total", "Enquiries delivered to organizers in a digest")
+registry.describe("enquiry_followup_failed_total", "Enquiries returned to the queue after a failed digest")
+registry.describe("enquiry_followup_digests_total", "Organizer digest emails sent")
+registry.describe("enquiry_followup_lag_seconds", "Enquiry age when its digest was sent")
+registry.describe("enquiry_followup_run_seconds", "Duration of one follow-up run")
+registry.describe("enquiry_followup_last_run_timestamp", "Unix time of the last completed follow-up run")
+
+# Only enquiries whose event has an organizer address are claimed
+_CLAIM_QUERY = """
+    UPDATE TOP (?) TicketEnquiry
+    SET IsSend = 1
+    OUTPUT
+        INSERTED.TicketEnquiryId,
+        INSERTED.TicketMasterId,
+        INSERTED.Name,
+        INSERTED.MobileNo,
+        INSERTED.EmailId,
+        INSERTED.TicketCount,
+        INSERTED.TotalAmount,
+        INSERTED.EntryDateTime
+    WHERE IsSend = 0
+      AND EntryDateTime >= ?
+      AND TicketMasterId IN (
+          SELECT TicketMasterId
+          FROM TicketMaster
+          WHERE ISNULL(EnquiryToEmailId, '') <> ''
+      )
+"""
+
+
+def claim_unsent_enquiries(batch_size: int = ENQUIRY_FOLLOWUP_BATCH_SIZE) -> list:
+    """
+    Atomically marks up to batch_size unsent enquiries as sent and returns
+    them. Concurrent runs never claim the same row.
+    """
+    since = datetime.now() - timedelta(days=ENQUIRY_FOLLOWUP_MAX_AGE_DAYS)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(_CLAIM_QUERY, batch_size, since)
+        columns = [col[0] for col in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        conn.commit()
+        return rows
+
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def release_enquiries(enquiry_ids: list):
+    """
+    Puts enquiries back in the queue (IsSend = 0) after a failed send.
+    """
+    if not enquiry_ids:
+        return
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        for i in range(0, len(enquiry_ids), 1000):
+            chunk = enquiry_ids[i:i + 1000]
+            cursor.execute(
+                f"UPDATE TicketEnquiry SET IsSend = 0 "
+                f"WHERE TicketEnquiryId IN ({','.join('?' * len(chunk))})",
+                *chunk
+            )
+        conn.commit()
+
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _load_events(ticket_master_ids: list) -> dict:
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(f"""
+            SELECT
+                TicketMasterId,
+                EventName,
+                EventDate,
+                Currency,
+                EnquiryToEmailId,
+                BCCEmailId
+            FROM TicketMaster
+            WHERE TicketMasterId IN ({','.join('?' * len(ticket_master_ids))})
+        """, *ticket_master_ids)
+
+        return {row.TicketMasterId: row for row in cursor.fetchall()}
+
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def render_digest(event, enquiries: list) -> str:
+    return render_html_template(DIGEST_TEMPLATE, {
+        "event_name": event.EventName,
+        "event_date": event.EventDate,
+        "currency": event.Currency,
+        "total_tickets": sum(e["TicketCount"] for e in enquiries),
+        "total_amount": sum(e["TotalAmount"] for e in enquiries),
+        "enquiries": [
+            {
+                "entry_datetime": e["EntryDateTime"].strftime("%d-%m-%Y %H:%M"),
+                "name": e["Name"],
+                "mobile_no": e["MobileNo"],
+                "email_id": e["EmailId"],
+                "ticket_count": e["TicketCount"],
+                "total_amount": e["TotalAmount"]
+            }
+            for e in enquiries
+        ]
+    })
+
+
+def process_unsent_enquiries(
+    batch_size: int = ENQUIRY_FOLLOWUP_BATCH_SIZE,
+    max_batches: int | None = None,
+    session_factory=SMTPSession
+) -> dict:
+    """
+    Claims unsent enquiries chunk by chunk and mails one digest per event
+    organizer (TicketMaster.EnquiryToEmailId, BCC BCCEmailId) over a single
+    SMTP session. Enquiries of a digest that fails to send are released.
+    """
+    started = time.perf_counter()
+    report = {"claimed": 0, "sent": 0, "failed": 0, "digests": 0}
+    batches = 0
+    # Connects on the first digest, so empty runs never touch SMTP
+    session = session_factory()
+
+    try:
+        while max_batches is None or batches < max_batches:
+            enquiries = claim_unsent_enquiries(batch_size)
+            if not enquiries:
+                break
+
+            batches += 1
+            report["claimed"] += len(enquiries)
+
+            by_event = {}
+            for enquiry in enquiries:
+                by_event.setdefault(enquiry["TicketMasterId"], []).append(enquiry)
+
+            events = _load_events(list(by_event))
+            failed_ids = []
+
+            for ticket_master_id, group in by_event.items():
+                event = events.get(ticket_master_id)
+                ids = [e["TicketEnquiryId"] for e in group]
+
+                try:
+                    msg = build_html_email(
+                        event.EnquiryToEmailId,
+                        f"New ticket enquiries - {event.EventName} ({len(group)})",
+                        render_digest(event, group),
+                        event.BCCEmailId
+                    )
+                    session.send(msg)
+
+                except Exception as e:
+                    logger.error(f"Enquiry digest for TicketMasterId={ticket_master_id} failed: {e}")
+                    failed_ids += ids
+                    registry.inc("enquiry_followup_failed_total", len(ids))
+                    continue
+
+                now = datetime.now()
+                for enquiry in group:
+                    registry.observe(
+                        "enquiry_followup_lag_seconds",
+                        (now - enquiry["EntryDateTime"]).total_seconds()
+                    )
+                registry.inc("enquiry_followup_sent_total", len(ids))
+                registry.inc("enquiry_followup_digests_total")
+                report["sent"] += len(ids)
+                report["digests"] += 1
+
+            if failed_ids:
+                release_enquiries(failed_ids)
+                report["failed"] += len(failed_ids)
+                # The rest of the queue would most likely fail the same way
+                break
+
+            if len(enquiries) < batch_size:
+                break
+
+    finally:
+        session.close()
+
+        registry.observe("enquiry_followup_run_seconds", time.perf_counter() - started)
+        registry.set("enquiry_followup_last_run_timestamp", time.time())
+
+    if report["claimed"]:
+        logger.info(
+            f"Enquiry follow-up: claimed={report['claimed']} sent={report['sent']} "
+            f"failed={report['failed']} digests={report['digests']}"
+        )
+
+    return report
+
+
+# --------------------------------
+# CLI: python -m services.enquiry_followup
+# --------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Mail unsent ticket enquiries to event organizers")
+    parser.add_argument("--batch-size", type=int, default=ENQUIRY_FOLLOWUP_BATCH_SIZE)
+    parser.add_argument("--max-batches", type=int, help="Stop after this many claimed batches")
+    args = parser.parse_args()
+
+    report = process_unsent_enquiries(args.batch_size, args.max_batches)
+
+    print(
+        f"claimed={report['claimed']} sent={report['sent']} "
+        f"failed={report['failed']} digests={report['digests']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
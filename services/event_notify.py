@@ -0,0 +1,519 @@
+import os
+import re
+import json
+import time
+import uuid
+import argparse
+import threading
+from dataclasses import dataclass, field, asdict
+from concurrent.futures import ThreadPoolExecutor
+from core.config import settings
+from core.database import get_connection
+from core.metrics import registry
+from services.mail_service import SMTPSession, build_html_email
+from services.whatsapp_service import send_whatsapp_text
+from utils.rate_limit import RateLimiter
+from utils.template_loader import render_html_template
+from utils.utils import logger
+
+NOTIFY_JOB_DIR = settings.notify_job_dir
+NOTIFY_PAGE_SIZE = settings.notify_page_size
+NOTICE_TEMPLATE = "templates/event_notice.html"
+SEND_ATTEMPTS = 3
+# Mobile numbers are stored without a country code, as on the ticket PDFs
+DEFAULT_COUNTRY_CODE = "91"
+
+CHANNELS = ("email", "whatsapp")
+
+NOTICE_MESSAGES = {
+    "postponed": (
+        "{event_name} scheduled on {event_date} has been postponed. "
+        "Your tickets remain valid for the new date, which we will share soon."
+    ),
+    "cancelled": (
+        "{event_name} scheduled on {event_date} has been cancelled. "
+        "We will contact you about your refund."
+    ),
+}
+
+registry.describe("event_notify_sent_total", "Event notices delivered, by channel")
+registry.describe("event_notify_failed_total", "Event notices that failed after retries, by channel")
+
+_MOBILE_RE = re.compile(r"\D")
+
+# One keyset page of an event's paid tickets, in TicketIssueId order (resume point)
+_RECIPIENT_QUERY = """
+    SELECT TOP (?) TicketIssueId, Name, MobileNo, EmailId
+    FROM TicketIssue
+    WHERE TicketMasterId = ?
+      AND TransactionId LIKE 'pay[_]%'
+      AND TicketIssueId > ?
+    ORDER BY TicketIssueId
+"""
+
+
+def normalize_mobile(mobile_no) -> str | None:
+    """
+    Digits only: the dedupe key, not a number to send to.
+    """
+    digits = _MOBILE_RE.sub("", str(mobile_no or ""))
+    return digits or None
+
+
+def to_e164(mobile_no) -> str | None:
+    """
+    "+<country code><number>", the form Twilio expects after "whatsapp:".
+    Local numbers (10 digits, or 0 + 10 digits) get DEFAULT_COUNTRY_CODE.
+    """
+    raw = str(mobile_no or "").strip()
+    digits = normalize_mobile(raw)
+    if not digits:
+        return None
+
+    if raw.startswith("+"):
+        return f"+{digits}"
+    if raw.startswith("00"):
+        return f"+{digits[2:]}"
+    if len(digits) == 11 and digits.startswith("0"):
+        digits = digits[1:]
+    if len(digits) == 10:
+        return f"+{DEFAULT_COUNTRY_CODE}{digits}"
+    return f"+{digits}"
+
+
+def normalize_email(email_id) -> str | None:
+    email = str(email_id or "").strip().lower()
+    return email if "@" in email else None
+
+
+@dataclass
+class NotifyJob:
+    job_id: str
+    ticket_master_id: int
+    kind: str
+    message: str
+    event_name: str
+    event_date: str
+    venue: str | None = None
+    channels: list = field(default_factory=lambda: list(CHANNELS))
+    status: str = "pending"  # pending / running / done / failed / cancelled
+    total_rows: int = 0
+    rows_scanned: int = 0
+    # Every row up to here is fully processed; resume streams after it
+    last_ticket_issue_id: int = 0
+    sent: dict = field(default_factory=lambda: {c: 0 for c in CHANNELS})
+    failed: dict = field(default_factory=lambda: {c: 0 for c in CHANNELS})
+    duplicates: dict = field(default_factory=lambda: {c: 0 for c in CHANNELS})
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    @property
+    def path(self) -> str:
+        return os.path.join(NOTIFY_JOB_DIR, f"{self.job_id}.json")
+
+    @property
+    def sent_path(self) -> str:
+        return os.path.join(NOTIFY_JOB_DIR, f"{self.job_id}.sent.jsonl")
+
+    @property
+    def failures_path(self) -> str:
+        return os.path.join(NOTIFY_JOB_DIR, f"{self.job_id}.failed.jsonl")
+
+    def progress(self) -> dict:
+        data = asdict(self)
+        data["percent"] = round(100 * self.rows_scanned / self.total_rows, 1) if self.total_rows else None
+        return data
+
+    def save(self):
+        """
+        Checkpoint, written atomically so a crash never leaves half a file.
+        """
+        self.updated_at = time.time()
+        os.makedirs(NOTIFY_JOB_DIR, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f)
+        os.replace(tmp_path, self.path)
+
+    @classmethod
+    def load(cls, job_id: str) -> "NotifyJob | None":
+        path = os.path.join(NOTIFY_JOB_DIR, f"{os.path.basename(job_id)}.json")
+        if not os.path.isfile(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+
+def load_event(ticket_master_id: int):
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            SELECT TicketMasterId, EventName, EventDate, Venue, EventPostpone, EventClose
+            FROM TicketMaster
+            WHERE TicketMasterId = ?
+        """, ticket_master_id)
+        return cursor.fetchone()
+
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def create_job(
+    ticket_master_id: int,
+    kind: str | None = None,
+    message: str | None = None,
+    channels: list | None = None
+) -> NotifyJob:
+    """
+    Builds a job for an event. kind defaults to the event's current
+    EventClose / EventPostpone flag. Raises LookupError / ValueError.
+    """
+    event = load_event(ticket_master_id)
+    if event is None:
+        raise LookupError("Event not found")
+
+    if kind is None:
+        kind = "cancelled" if event.EventClose else "postponed" if event.EventPostpone else None
+    if kind not in NOTICE_MESSAGES:
+        raise ValueError("kind must be postponed or cancelled (event is neither closed nor postponed)")
+
+    channels = list(channels or CHANNELS)
+    unknown = set(channels) - set(CHANNELS)
+    if unknown:
+        raise ValueError(f"Unknown channels: {', '.join(sorted(unknown))}")
+
+    event_date = str(event.EventDate)
+
+    return NotifyJob(
+        job_id=uuid.uuid4().hex,
+        ticket_master_id=ticket_master_id,
+        kind=kind,
+        message=message or NOTICE_MESSAGES[kind].format(event_name=event.EventName, event_date=event_date),
+        event_name=event.EventName,
+        event_date=event_date,
+        venue=event.Venue,
+        channels=channels
+    )
+
+
+class NotifyRunner:
+    """
+    Fans one job out to every paid ticket holder of the event.
+
+    Recipients are read in keyset pages of page_size rows (a short query
+    per page, no connection held while sending) and deduplicated per
+    channel (normalized mobile number for WhatsApp, lowercased email).
+    Each page is sent by rate-limited worker pools and checkpointed once
+    it has fully completed. Every delivered message is also appended to
+    the job's sent journal as soon as it is sent, and a resumed job skips
+    journaled addresses, so a crash can only repeat the messages that
+    were in flight at that moment (at most one per worker).
+    """
+
+    def __init__(
+        self,
+        job: NotifyJob,
+        page_size: int = NOTIFY_PAGE_SIZE,
+        send_email=None,
+        send_whatsapp=send_whatsapp_text
+    ):
+        self.job = job
+        self.page_size = page_size
+        self._send_whatsapp_fn = send_whatsapp
+        self._send_email_fn = send_email or self._send_email_smtp
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._seen = {c: set() for c in CHANNELS}
+        # Delivered by an earlier run after its last checkpoint
+        self._journaled = {c: set() for c in CHANNELS}
+        self._local = threading.local()
+        self._sessions = []
+        self._journal = None
+        self._limiters = {
+            "email": RateLimiter(settings.notify_email_rate),
+            "whatsapp": RateLimiter(settings.notify_whatsapp_rate),
+        }
+        self._workers = {
+            "email": settings.notify_email_workers,
+            "whatsapp": settings.notify_whatsapp_workers,
+        }
+
+    def cancel(self):
+        self._cancel.set()
+
+    # ---------------------------- senders
+
+    def _send_email_smtp(self, email: str, name: str):
+        # One pooled SMTP session per worker thread
+        session = getattr(self._local, "smtp", None)
+        if session is None:
+            session = self._local.smtp = SMTPSession()
+            with self._lock:
+                self._sessions.append(session)
+
+        html = render_html_template(NOTICE_TEMPLATE, {
+            "name": name,
+            "message": self.job.message,
+            "event_name": self.job.event_name,
+            "event_date": self.job.event_date,
+            "venue": self.job.venue or ""
+        })
+        session.send(build_html_email(email, f"Important: {self.job.event_name} {self.job.kind}", html))
+
+    def _deliver(self, channel: str, address: str, row):
+        error = None
+        for attempt in range(1, SEND_ATTEMPTS + 1):
+            self._limiters[channel].acquire()
+            try:
+                if channel == "email":
+                    self._send_email_fn(address, row.Name)
+                else:
+                    # address is the digits-only dedupe key; Twilio needs E.164
+                    self._send_whatsapp_fn(to_e164(row.MobileNo), self.job.event_name, self.job.message)
+                break
+            except Exception as e:
+                error = e
+                if attempt < SEND_ATTEMPTS:
+                    time.sleep(attempt)
+        else:
+            registry.inc("event_notify_failed_total", channel=channel)
+            with self._lock:
+                self.job.failed[channel] += 1
+                with open(self.job.failures_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({
+                        "channel": channel,
+                        "address": address,
+                        "ticket_issue_id": row.TicketIssueId,
+                        "error": str(error)
+                    }) + "\n")
+            return
+
+        registry.inc("event_notify_sent_total", channel=channel)
+        with self._lock:
+            self.job.sent[channel] += 1
+            self._journal.write(json.dumps({"channel": channel, "address": address}) + "\n")
+            self._journal.flush()
+
+    # ---------------------------- streaming
+
+    def _count_and_reseed(self):
+        """
+        Total rows for progress, and the dedupe sets of a resumed job
+        (addresses already handled before the checkpoint).
+        """
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+                SELECT COUNT(*)
+                FROM TicketIssue
+                WHERE TicketMasterId = ? AND TransactionId LIKE 'pay[_]%'
+            """, self.job.ticket_master_id)
+            self.job.total_rows = cursor.fetchone()[0]
+
+            if self.job.last_ticket_issue_id:
+                cursor.execute("""
+                    SELECT MobileNo, EmailId
+                    FROM TicketIssue
+                    WHERE TicketMasterId = ?
+                      AND TransactionId LIKE 'pay[_]%'
+                      AND TicketIssueId <= ?
+                """, self.job.ticket_master_id, self.job.last_ticket_issue_id)
+
+                while True:
+                    rows = cursor.fetchmany(5000)
+                    if not rows:
+                        break
+                    for row in rows:
+                        self._seen["whatsapp"].add(normalize_mobile(row.MobileNo))
+                        self._seen["email"].add(normalize_email(row.EmailId))
+
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _load_journal(self):
+        """
+        Addresses already delivered by an earlier run of the job, including
+        those after its last checkpoint. The sent counts follow the journal.
+        """
+        if not os.path.isfile(self.job.sent_path):
+            return
+
+        sent = {c: 0 for c in CHANNELS}
+        with open(self.job.sent_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn last line after a crash
+                    continue
+                self._journaled[entry["channel"]].add(entry["address"])
+                sent[entry["channel"]] += 1
+
+        self.job.sent = sent
+
+    def _fetch_page(self, after_id: int) -> list:
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(_RECIPIENT_QUERY, self.page_size, self.job.ticket_master_id, after_id)
+            return cursor.fetchall()
+
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _address(self, channel: str, row) -> str | None:
+        if channel == "email":
+            return normalize_email(row.EmailId)
+        return normalize_mobile(row.MobileNo)
+
+    def run(self) -> NotifyJob:
+        job = self.job
+        job.status = "running"
+        job.error = None
+
+        pools = {
+            channel: ThreadPoolExecutor(self._workers[channel], thread_name_prefix=f"notify-{channel}")
+            for channel in job.channels
+        }
+
+        try:
+            self._count_and_reseed()
+            self._load_journal()
+            job.save()
+            self._journal = open(job.sent_path, "a", encoding="utf-8")
+
+            while not self._cancel.is_set():
+                rows = self._fetch_page(job.last_ticket_issue_id)
+                if not rows:
+                    break
+
+                futures = []
+                for row in rows:
+                    for channel in job.channels:
+                        address = self._address(channel, row)
+                        if not address or address in self._journaled[channel]:
+                            continue
+                        if address in self._seen[channel]:
+                            job.duplicates[channel] += 1
+                            continue
+                        self._seen[channel].add(address)
+                        futures.append(pools[channel].submit(self._deliver, channel, address, row))
+
+                for future in futures:
+                    future.result()
+
+                job.rows_scanned += len(rows)
+                job.last_ticket_issue_id = rows[-1].TicketIssueId
+                job.save()
+
+            job.status = "cancelled" if self._cancel.is_set() else "done"
+
+        except Exception as e:
+            logger.error(f"Notify job {job.job_id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True)
+            for session in self._sessions:
+                session.close()
+            if self._journal is not None:
+                self._journal.close()
+            job.save()
+
+        logger.info(
+            f"Notify job {job.job_id} {job.status}: TicketMasterId={job.ticket_master_id} "
+            f"rows={job.rows_scanned}/{job.total_rows} sent={job.sent} failed={job.failed}"
+        )
+        return job
+
+
+class NotifyManager:
+    """
+    Runs notify jobs on background threads, one at a time per event.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runners = {}
+
+    def start(self, job: NotifyJob) -> NotifyJob:
+        with self._lock:
+            for runner in self._runners.values():
+                if runner.job.ticket_master_id == job.ticket_master_id and runner.job.status in ("pending", "running"):
+                    raise RuntimeError(f"Job {runner.job.job_id} is already running for this event")
+
+            runner = NotifyRunner(job)
+            self._runners[job.job_id] = runner
+
+        job.save()
+        threading.Thread(target=runner.run, name=f"notify-{job.job_id[:8]}", daemon=True).start()
+        return job
+
+    def resume(self, job_id: str) -> NotifyJob:
+        job = NotifyJob.load(job_id)
+        if job is None:
+            raise LookupError("Job not found")
+        if job.status == "done":
+            return job
+        return self.start(job)
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            runner = self._runners.get(job_id)
+        if runner is None:
+            return False
+        runner.cancel()
+        return True
+
+    def get(self, job_id: str) -> NotifyJob | None:
+        with self._lock:
+            runner = self._runners.get(job_id)
+        return runner.job if runner else NotifyJob.load(job_id)
+
+    def jobs(self) -> list:
+        with self._lock:
+            return [runner.job.progress() for runner in self._runners.values()]
+
+
+notify_jobs = NotifyManager()
+
+
+# --------------------------------
+# CLI: python -m services.event_notify
+# --------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Notify ticket holders that an event was postponed or cancelled")
+    parser.add_argument("--event", type=int, help="TicketMasterId")
+    parser.add_argument("--kind", choices=sorted(NOTICE_MESSAGES), help="Default: from EventClose / EventPostpone")
+    parser.add_argument("--message", help="Override the default notice text")
+    parser.add_argument("--channels", default=",".join(CHANNELS))
+    parser.add_argument("--resume", metavar="JOB_ID", help="Continue an interrupted job from its checkpoint")
+    args = parser.parse_args()
+
+    if args.resume:
+        job = NotifyJob.load(args.resume)
+        if job is None:
+            raise SystemExit(f"Job {args.resume} not found in {NOTIFY_JOB_DIR}")
+    elif args.event:
+        job = create_job(args.event, args.kind, args.message, args.channels.split(","))
+    else:
+        parser.error("--event or --resume is required")
+
+    print(f"job_id={job.job_id}")
+    job = NotifyRunner(job).run()
+    print(json.dumps(job.progress(), indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+from core.config import settings
+from core.database import get_connection
+from services.image_variants import get_image_variants
+from utils.cache import TTLCache
+from utils.fast_json import dumps, rows_to_dicts
+
+IMAGE_BASE_URL = settings.image_base_url
+
+# Encoded page bodies keyed by TicketMasterId
+event_page_cache = TTLCache(ttl=settings.event_page_cache_ttl, maxsize=512)
+
+# Event, its rates and its images in one round trip (two result sets)
+_EVENT_PAGE_QUERY = """
+    SET NOCOUNT ON;
+
+    SELECT
+        TicketMasterId,
+        EventDate,
+        EventDay,
+        Venue,
+        Country,
+        CountryCode,
+        Currency,
+        MaxLimit,
+        EventPostpone,
+        EventClose,
+        EventName,
+        EventTime,
+        Image1,
+        Image2,
+        Image3,
+        Image4,
+        Image5,
+        Image6
+    FROM TicketMaster
+    WHERE TicketMasterId = ?;
+
+    SELECT
+        TicketClassificationId,
+        TicketType,
+        TicketRate,
+        MinimumTickets
+    FROM TicketClassification
+    WHERE TicketMasterId = ?
+    ORDER BY TicketClassificationId;
+"""
+
+IMAGE_COLUMNS = ("Image1", "Image2", "Image3", "Image4", "Image5", "Image6")
+
+
+def load_event_page(ticket_master_id: int) -> bytes | None:
+    """
+    Everything the event page renders, as an encoded JSON body:
+    {"event": {...}, "TicketRates": [...], "images": {...}, "variants": {...}}
+    Same shapes as /getEventList, /getEventTicketRate and /banner_image.
+    Returns None when the event doesn't exist.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(_EVENT_PAGE_QUERY, ticket_master_id, ticket_master_id)
+
+        events = rows_to_dicts(cursor, cursor.fetchall())
+        if not events:
+            return None
+
+        cursor.nextset()
+        rates = rows_to_dicts(cursor, cursor.fetchall())
+
+    finally:
+        cursor.close()
+        conn.close()
+
+    event = events[0]
+    images = {}
+    variants = {}
+    for i, column in enumerate(IMAGE_COLUMNS, start=1):
+        img = event.pop(column)
+        images[f"image{i}"] = f"{IMAGE_BASE_URL}/{ticket_master_id}/{img}" if img else None
+        variants[f"image{i}"] = get_image_variants(ticket_master_id, img) if img else None
+
+    return dumps({
+        "event": event,
+        "TicketRates": rates,
+        "images": images,
+        "variants": variants
+    })
+
+
+def get_event_page(ticket_master_id: int) -> bytes | None:
+    return event_page_cache.get_or_load(ticket_master_id, load_event_page, ticket_master_id)
+
+
+def invalidate_event_page(ticket_master_id: int | None = None):
+    """
+    Drops one cached event page, or all of them. Call after editing an
+    event, its rates or its images.
+    """
+    if ticket_master_id is None:
+        event_page_cache.clear()
+    else:
+        event_page_cache.invalidate(ticket_master_id)
@@ -0,0 +1,98 @@
+import time
+import smtplib
+import anyio
+from core.config import settings
+from core.database import get_connection, connection_stats
+from services.enquiry_buffer import enquiry_buffer
+from services.inventory import inventory
+from services.payment_webhook import pending_event_count
+from services.ticket_issuance import payment_flight
+from services.waiting_room import waiting_room
+from utils.background import periodic_task_status
+from utils.cache import TTLCache
+from utils.utils import logger
+
+HEALTH_CHECK_TIMEOUT = settings.health_check_timeout
+
+# Deep probe results, so frequent readiness checks don't each hit DB/SMTP
+_deep_cache = TTLCache(ttl=settings.health_cache_ttl, maxsize=1)
+
+
+def _timed_check(check) -> dict:
+    start = time.perf_counter()
+    try:
+        check()
+        result = {"status": "UP"}
+    except Exception as e:
+        logger.warning(f"Health check {check.__name__} failed: {e}")
+        result = {"status": "DOWN", "error": str(e)}
+    result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+def check_database():
+    conn = get_connection(timeout=HEALTH_CHECK_TIMEOUT)
+    try:
+        # Query timeout too, so a stalled server also fails the probe
+        conn.timeout = max(1, int(HEALTH_CHECK_TIMEOUT))
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def check_smtp():
+    with smtplib.SMTP(settings.email_host, settings.email_port, timeout=HEALTH_CHECK_TIMEOUT) as server:
+        server.noop()
+
+
+def _run_deep_checks() -> dict:
+    checks = {"db": _timed_check(check_database)}
+    if settings.email_host:
+        checks["smtp"] = _timed_check(check_smtp)
+
+    return {
+        "status": "UP" if all(c["status"] == "UP" for c in checks.values()) else "DOWN",
+        "checks": checks,
+        "checked_at": time.time()
+    }
+
+
+def deep_health() -> dict:
+    """
+    DB and SMTP status, cached for HEALTH_CACHE_TTL seconds.
+    """
+    return _deep_cache.get_or_load("deep", _run_deep_checks)
+
+
+def worker_stats() -> dict:
+    """
+    Saturation of the threadpool that runs sync endpoints. Must be called
+    from the event loop (an async endpoint).
+    """
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return {
+        "threadpool_size": limiter.total_tokens,
+        "threadpool_busy": limiter.borrowed_tokens,
+        "threadpool_waiting": limiter.statistics().tasks_waiting,
+        "saturation": round(limiter.borrowed_tokens / limiter.total_tokens, 2)
+    }
+
+
+def runtime_stats() -> dict:
+    """
+    In-process state only, no I/O: called from the event loop.
+    """
+    return {
+        "connections": connection_stats.snapshot(),
+        "queues": {
+            "webhook_pending": pending_event_count(),
+            "enquiries_pending": enquiry_buffer.pending(),
+            "inventory_holds": inventory.active_holds(),
+            "waiting_room": sum(waiting_room.depth().values()),
+            "payments_in_flight": payment_flight.in_flight()
+        },
+        "background_tasks": periodic_task_status()
+    }
@@ -0,0 +1,205 @@
+import os
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from core.config import settings
+from utils.utils import logger
+
+IMAGE_BASE_PATH = settings.image_base_path
+IMAGE_BASE_URL = settings.image_base_url
+
+# Widths (px) generated for every event image, smallest first
+VARIANT_WIDTHS = sorted(settings.image_variant_widths)
+VARIANT_FORMATS = {
+    "webp": {"format": "WEBP", "quality": settings.image_variant_webp_quality},
+    "jpg": {"format": "JPEG", "quality": settings.image_variant_jpeg_quality},
+}
+VARIANT_DIR = "variants"
+
+# Variants are rendered off the request path, a couple of images at a time
+_render_pool = ThreadPoolExecutor(2, thread_name_prefix="image-variants")
+
+# Per source image: [lock, users]. Entries are dropped once nobody holds or
+# waits for them, so the map only ever holds images being rendered.
+_locks = {}
+# Source images queued on _render_pool, so repeated requests queue them once
+_scheduled = set()
+_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _source_lock(path: str):
+    with _locks_guard:
+        entry = _locks.get(path)
+        if entry is None:
+            entry = _locks[path] = [threading.Lock(), 0]
+        entry[1] += 1
+
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _locks[path]
+
+
+def _source_path(ticket_master_id: int, image_name: str) -> str | None:
+    """
+    Uploaded images live under static/ticket_images/<TicketMasterId>/,
+    older events were uploaded flat into static/ticket_images/.
+    """
+    for path in (
+        os.path.join(IMAGE_BASE_PATH, str(ticket_master_id), image_name),
+        os.path.join(IMAGE_BASE_PATH, image_name),
+    ):
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _variant_name(image_name: str, width: int, ext: str) -> str:
+    # Keep the source extension, a.png and a.jpg otherwise share variants
+    stem, source_ext = os.path.splitext(os.path.basename(image_name))
+    if source_ext:
+        stem = f"{stem}_{source_ext[1:]}"
+    return f"{stem}_{width}w.{ext}"
+
+
+def _is_fresh(variant_path: str, source_path: str) -> bool:
+    return (
+        os.path.exists(variant_path)
+        and os.path.getmtime(variant_path) >= os.path.getmtime(source_path)
+    )
+
+
+def _wanted_variants(ticket_master_id: int, image_name: str) -> list:
+    out_dir = os.path.join(IMAGE_BASE_PATH, str(ticket_master_id), VARIANT_DIR)
+    return [
+        (width, ext, os.path.join(out_dir, _variant_name(image_name, width, ext)))
+        for width in VARIANT_WIDTHS
+        for ext in VARIANT_FORMATS
+    ]
+
+
+def _render_variant(original, has_alpha: bool, width: int, ext: str, path: str):
+    from PIL import Image
+
+    # Never upscale, just re-encode at the original width
+    target_width = min(width, original.width)
+    target_height = max(1, round(original.height * target_width / original.width))
+
+    img = original.resize((target_width, target_height), Image.LANCZOS)
+
+    # JPEG has no alpha; WebP only takes RGB/RGBA (CMYK, I;16... uploads fail otherwise)
+    if ext == "jpg" or not has_alpha:
+        img = img.convert("RGB")
+    else:
+        img = img.convert("RGBA")
+
+    options = VARIANT_FORMATS[ext]
+    tmp_path = f"{path}.tmp"
+    try:
+        img.save(tmp_path, options["format"], quality=options["quality"], optimize=True)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def generate_image_variants(ticket_master_id: int, image_name: str) -> list:
+    """
+    Render resized WebP/JPEG copies of an event image next to the original.
+    Call at upload time, or let get_image_variants() queue it.
+    Existing up-to-date variants are left untouched, and a variant that
+    fails to render doesn't stop the others.
+
+    Returns list of (width, ext, file_path) for every variant on disk.
+    """
+    source = _source_path(ticket_master_id, image_name)
+    if not source:
+        return []
+
+    wanted = _wanted_variants(ticket_master_id, image_name)
+
+    if all(_is_fresh(path, source) for _, _, path in wanted):
+        return wanted
+
+    with _source_lock(source):
+        missing = [item for item in wanted if not _is_fresh(item[2], source)]
+        if not missing:
+            return wanted
+
+        from PIL import Image
+
+        os.makedirs(os.path.dirname(missing[0][2]), exist_ok=True)
+
+        try:
+            with Image.open(source) as original:
+                original.load()
+                has_alpha = original.mode in ("RGBA", "LA", "PA") or (
+                    original.mode == "P" and "transparency" in original.info
+                )
+
+                for width, ext, path in missing:
+                    try:
+                        _render_variant(original, has_alpha, width, ext, path)
+                    except Exception as e:
+                        logger.error(f"Image variant {width}w.{ext} failed for {source}: {e}")
+
+        except Exception as e:
+            logger.error(f"Image variant generation failed for {source}: {e}")
+
+    return [item for item in wanted if _is_fresh(item[2], source)]
+
+
+def _generate_scheduled(ticket_master_id: int, image_name: str, source: str):
+    try:
+        generate_image_variants(ticket_master_id, image_name)
+    finally:
+        with _locks_guard:
+            _scheduled.discard(source)
+
+
+def schedule_image_variants(ticket_master_id: int, image_name: str) -> list:
+    """
+    Variants already on disk and up to date; missing or stale ones are
+    queued for rendering in the background (once per source image).
+    """
+    source = _source_path(ticket_master_id, image_name)
+    if not source:
+        return []
+
+    wanted = _wanted_variants(ticket_master_id, image_name)
+    ready = [item for item in wanted if _is_fresh(item[2], source)]
+
+    if len(ready) < len(wanted):
+        with _locks_guard:
+            queue = source not in _scheduled
+            _scheduled.add(source)
+        if queue:
+            _render_pool.submit(_generate_scheduled, ticket_master_id, image_name, source)
+
+    return ready
+
+
+def get_image_variants(ticket_master_id: int, image_name: str) -> dict:
+    """
+    Variant URLs for /banner_image, grouped by format:
+    {"webp": [{"width": 320, "url": ...}, ...], "jpg": [...]}
+    Only variants already rendered are listed, the rest are rendered in
+    the background for later requests; clients fall back to the original.
+    """
+    variants = {ext: [] for ext in VARIANT_FORMATS}
+
+    for width, ext, _ in schedule_image_variants(ticket_master_id, image_name):
+        variants[ext].append({
+            "width": width,
+            "url": (
+                f"{IMAGE_BASE_URL}/{ticket_master_id}/{VARIANT_DIR}/"
+                f"{_variant_name(image_name, width, ext)}"
+            )
+        })
+
+    return variants
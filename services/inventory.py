@@ -0,0 +1,294 @@
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from collections import defaultdict
+from core.config import settings
+from core.database import get_connection
+from utils.utils import logger
+
+INVENTORY_HOLD_SECONDS = settings.inventory_hold_seconds
+
+# Paid = TransactionId carries a Razorpay payment id (see ticket_issuance).
+# READPAST: a row locked by an issuance that has not committed yet is
+# skipped rather than waited for (that issuance may be waiting for
+# reconcile to finish, see InventoryManager.sale); it is counted by its
+# own confirm() once reconcile is done.
+_SOLD_QUERY = """
+    SELECT
+        tm.TicketMasterId,
+        tm.MaxLimit,
+        ISNULL(SUM(ti.TicketCount), 0) AS Sold
+    FROM TicketMaster tm
+    LEFT JOIN TicketIssue ti WITH (READPAST)
+        ON ti.TicketMasterId = tm.TicketMasterId
+       AND ti.TransactionId LIKE 'pay[_]%'
+    {where}
+    GROUP BY tm.TicketMasterId, tm.MaxLimit
+"""
+
+
+class SoldOutError(Exception):
+    def __init__(self, available: int):
+        super().__init__(
+            "Tickets sold out" if available <= 0 else f"Only {available} tickets left"
+        )
+        self.available = available
+
+
+@dataclass
+class Hold:
+    hold_id: str
+    ticket_master_id: int
+    ticket_classification_id: int
+    count: int
+    expires_at: float
+    ticket_issue_id: int | None = None
+
+
+@dataclass
+class EventCounts:
+    max_limit: int | None  # None / 0 = unlimited
+    sold: int = 0
+    held: int = 0
+    held_by_classification: dict = field(default_factory=lambda: defaultdict(int))
+
+    @property
+    def available(self) -> int | None:
+        if not self.max_limit:
+            return None
+        return self.max_limit - self.sold - self.held
+
+
+def _load_counts(ticket_master_ids: list | None = None) -> dict:
+    """
+    {TicketMasterId: (MaxLimit, Sold)} for the given events, or every upcoming event.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        if ticket_master_ids:
+            where = f"WHERE tm.TicketMasterId IN ({','.join('?' * len(ticket_master_ids))})"
+            cursor.execute(_SOLD_QUERY.format(where=where), *ticket_master_ids)
+        else:
+            where = "WHERE tm.EventDate >= CAST(GETDATE() AS DATE)"
+            cursor.execute(_SOLD_QUERY.format(where=where))
+
+        return {
+            row.TicketMasterId: (row.MaxLimit, int(row.Sold))
+            for row in cursor.fetchall()
+        }
+
+    finally:
+        cursor.close()
+        conn.close()
+
+
+class InventoryManager:
+    """
+    In-memory ticket availability per event, enforcing TicketMaster.MaxLimit.
+
+    Checkout takes a short-lived hold (reserve), which becomes a sale once
+    the payment is issued (confirm) or is given back (release / expiry).
+    All count changes happen under one lock, so check-and-decrement is atomic.
+    Sold counts are periodically re-read from TicketIssue (reconcile).
+    Issuance commits and confirms inside sale(), which reconcile excludes
+    while its query runs, so every sale is counted by exactly one of them.
+
+    Counts are per process: run a single worker per app (web.config
+    processesPerApplication=1) or MaxLimit is enforced per worker.
+    """
+
+    def __init__(self, hold_seconds: int = INVENTORY_HOLD_SECONDS, loader=_load_counts):
+        self.hold_seconds = hold_seconds
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._events = {}
+        self._holds = {}
+        self._holds_by_issue = {}
+        # sale() / reconcile() exclusion: many sales or one reconcile
+        self._fence = threading.Condition()
+        self._selling = 0
+        self._reconciling = False
+
+    def _ensure_loaded(self, ticket_master_id: int):
+        if ticket_master_id in self._events:
+            return
+
+        counts = self._loader([ticket_master_id])
+        max_limit, sold = counts.get(ticket_master_id, (None, 0))
+
+        with self._lock:
+            self._events.setdefault(ticket_master_id, EventCounts(max_limit, sold))
+
+    def reserve(self, ticket_master_id: int, ticket_classification_id: int, count: int) -> str:
+        """
+        Holds count tickets for hold_seconds. Raises SoldOutError if not enough are left.
+        """
+        self._ensure_loaded(ticket_master_id)
+
+        with self._lock:
+            ev = self._events[ticket_master_id]
+            available = ev.available
+
+            if available is not None and count > available:
+                raise SoldOutError(max(available, 0))
+
+            hold = Hold(
+                hold_id=uuid.uuid4().hex,
+                ticket_master_id=ticket_master_id,
+                ticket_classification_id=ticket_classification_id,
+                count=count,
+                expires_at=time.monotonic() + self.hold_seconds
+            )
+            self._holds[hold.hold_id] = hold
+            ev.held += count
+            ev.held_by_classification[ticket_classification_id] += count
+
+        return hold.hold_id
+
+    def bind(self, hold_id: str, ticket_issue_id: int):
+        """
+        Associates a hold with the TicketIssue created for it.
+        """
+        with self._lock:
+            hold = self._holds.get(hold_id)
+            if hold:
+                hold.ticket_issue_id = ticket_issue_id
+                self._holds_by_issue[ticket_issue_id] = hold_id
+
+    def _drop_hold(self, hold: Hold):
+        # Caller holds self._lock
+        self._holds.pop(hold.hold_id, None)
+        if hold.ticket_issue_id is not None:
+            self._holds_by_issue.pop(hold.ticket_issue_id, None)
+
+        ev = self._events.get(hold.ticket_master_id)
+        if ev:
+            ev.held -= hold.count
+            ev.held_by_classification[hold.ticket_classification_id] -= hold.count
+
+    def release(self, hold_id: str | None = None, ticket_issue_id: int | None = None):
+        with self._lock:
+            if hold_id is None and ticket_issue_id is not None:
+                hold_id = self._holds_by_issue.get(ticket_issue_id)
+            hold = self._holds.get(hold_id) if hold_id else None
+            if hold:
+                self._drop_hold(hold)
+
+    @contextmanager
+    def sale(self):
+        """
+        Wraps an issuance's commit and confirm(). Waits while reconcile is
+        reading TicketIssue, so a sale is never committed before the query
+        and confirmed after it (which would count it twice).
+        """
+        with self._fence:
+            while self._reconciling:
+                self._fence.wait()
+            self._selling += 1
+
+        try:
+            yield
+        finally:
+            with self._fence:
+                self._selling -= 1
+                if not self._selling:
+                    self._fence.notify_all()
+
+    def confirm(self, ticket_issue_id: int, ticket_master_id: int, count: int):
+        """
+        Turns the hold for a paid TicketIssue into sold tickets. Payments
+        whose hold already expired (or was taken by another worker) are
+        still counted as sold. Call it inside sale(), right after commit.
+        """
+        with self._lock:
+            hold_id = self._holds_by_issue.get(ticket_issue_id)
+            hold = self._holds.get(hold_id) if hold_id else None
+            if hold:
+                self._drop_hold(hold)
+
+            ev = self._events.get(ticket_master_id)
+            if ev:
+                ev.sold += count
+
+    def release_expired(self) -> int:
+        now = time.monotonic()
+
+        with self._lock:
+            expired = [h for h in self._holds.values() if h.expires_at <= now]
+            for hold in expired:
+                self._drop_hold(hold)
+
+        if expired:
+            logger.info(f"Released {len(expired)} expired ticket holds")
+
+        return len(expired)
+
+    def reconcile(self):
+        """
+        Resets sold counts from TicketIssue for every upcoming event.
+        Sales in flight finish first and new ones wait until the counts
+        are applied, so the query result is exact.
+        """
+        with self._fence:
+            self._reconciling = True
+            while self._selling:
+                self._fence.wait()
+
+        try:
+            counts = self._loader(None)
+            self._apply_counts(counts)
+
+        finally:
+            with self._fence:
+                self._reconciling = False
+                self._fence.notify_all()
+
+    def _apply_counts(self, counts: dict):
+        with self._lock:
+            for ticket_master_id, (max_limit, sold) in counts.items():
+                ev = self._events.get(ticket_master_id)
+
+                if ev is None:
+                    self._events[ticket_master_id] = EventCounts(max_limit, sold)
+                    continue
+
+                if ev.sold != sold:
+                    logger.info(
+                        f"Inventory reconcile TicketMasterId={ticket_master_id}: "
+                        f"sold {ev.sold} -> {sold}"
+                    )
+                ev.max_limit = max_limit
+                ev.sold = sold
+
+    def snapshot(self, ticket_master_id: int | None = None) -> dict:
+        with self._lock:
+            events = (
+                {ticket_master_id: self._events[ticket_master_id]}
+                if ticket_master_id in self._events
+                else {} if ticket_master_id is not None
+                else dict(self._events)
+            )
+
+            return {
+                tm_id: {
+                    "maxLimit": ev.max_limit,
+                    "sold": ev.sold,
+                    "held": ev.held,
+                    "available": ev.available,
+                    "heldByClassification": {
+                        cls_id: n for cls_id, n in ev.held_by_classification.items() if n
+                    }
+                }
+                for tm_id, ev in events.items()
+            }
+
+    def active_holds(self) -> int:
+        with self._lock:
+            return len(self._holds)
+
+
+inventory = InventoryManager()
@@ -1,14 +1,13 @@
-from http import server
 import os
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
-from dotenv import load_dotenv
-
-load_dotenv()
+from core.config import settings
+from core.metrics import timed
 
 
+@timed("smtp")
 def send_ticket_email(
     to_email: str,
     name: str,
@@ -23,7 +22,7 @@ def send_ticket_email(
 ):
     msg = MIMEMultipart("alternative")
 
-    msg["From"] = os.getenv("EMAIL_FROM")
+    msg["From"] = settings.email_from
     msg["To"] = to_email
     msg["Subject"] = f"Ticket - {event_name} {mobile_no}"
 
@@ -97,22 +96,23 @@ def send_ticket_email(
     # Send Email
     # -------------------------
     with smtplib.SMTP(
-        os.getenv("EMAIL_HOST"),
-        int(os.getenv("EMAIL_PORT"))
+        settings.email_host,
+        settings.email_port
     ) as server:
         server.starttls()
         server.login(
-            os.getenv("EMAIL_USER"),
-            os.getenv("EMAIL_PASSWORD")
+            settings.email_user,
+            settings.email_password
         )
         server.send_message(msg)
 
     return True
 
 
+@timed("smtp")
 def send_stall_booking_email(to_email: str, full_name: str, stall_no: str):
     msg = MIMEMultipart()
-    msg["From"] = os.getenv("EMAIL_FROM")
+    msg["From"] = settings.email_from
     msg["To"] = to_email
     msg["Subject"] = "Stall Booking Confirmation"
 
@@ -129,24 +129,94 @@ Regards,
 Event Management Team
 """
     msg.attach(MIMEText(body, "plain"))
-    SMTP_HOST = os.getenv("EMAIL_HOST")
-    SMTP_PORT = int(os.getenv("EMAIL_PORT"))
+    SMTP_HOST = settings.email_host
+    SMTP_PORT = settings.email_port
     with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
         server.starttls()
-        server.login(os.getenv("EMAIL_USER"), os.getenv("EMAIL_PASSWORD"))
+        server.login(settings.email_user, settings.email_password)
         server.send_message(msg)
 
-def send_email(to_email: str, subject: str, body: str):
+def build_text_email(to_email: str, subject: str, body: str):
     msg = MIMEMultipart()
-    msg["From"] = os.getenv("EMAIL_FROM")
+    msg["From"] = settings.email_from
     msg["To"] = to_email
     msg["Subject"] = subject
 
     msg.attach(MIMEText(body, "plain"))
-    SMTP_HOST = os.getenv("EMAIL_HOST")
-    SMTP_PORT = int(os.getenv("EMAIL_PORT"))
+    return msg
+
+
+@timed("smtp")
+def send_email(to_email: str, subject: str, body: str):
+    msg = build_text_email(to_email, subject, body)
+    SMTP_HOST = settings.email_host
+    SMTP_PORT = settings.email_port
     with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
         server.starttls()
-        server.login(os.getenv("EMAIL_USER"), os.getenv("EMAIL_PASSWORD"))
+        server.login(settings.email_user, settings.email_password)
         server.send_message(msg)
-    return True
\ No newline at end of file
+    return True
+
+def build_html_email(to_email: str, subject: str, html_body: str, bcc_email: str | None = None):
+    msg = MIMEMultipart("alternative")
+    msg["From"] = settings.email_from
+    msg["To"] = to_email
+    msg["Subject"] = subject
+
+    if bcc_email:
+        msg["Bcc"] = bcc_email
+
+    msg.attach(MIMEText(html_body, "html"))
+    return msg
+
+
+class SMTPSession:
+    """
+    One authenticated SMTP connection reused for many messages, for bulk
+    jobs that would otherwise pay connect + STARTTLS + login per email.
+    Reconnects once if the server drops the connection mid-run.
+
+        with SMTPSession() as smtp:
+            for msg in messages:
+                smtp.send(msg)
+    """
+
+    def __init__(self, timeout: float = 30):
+        self.timeout = timeout
+        self._server = None
+        self.sent = 0
+
+    def _connect(self):
+        server = smtplib.SMTP(settings.email_host, settings.email_port, timeout=self.timeout)
+        server.starttls()
+        server.login(settings.email_user, settings.email_password)
+        self._server = server
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                self._server.close()
+            self._server = None
+
+    def __enter__(self):
+        self._connect()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @timed("smtp")
+    def send(self, msg):
+        if self._server is None:
+            self._connect()
+
+        try:
+            self._server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            self._server = None
+            self._connect()
+            self._server.send_message(msg)
+
+        self.sent += 1
@@ -0,0 +1,350 @@
+import os
+import hmac
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from core.config import settings
+from services.razorpay_gateway import fetch_order_sync
+from services.ticket_issuance import issue_tickets_once, send_email_and_whatsapp
+from utils.utils import logger
+
+RAZORPAY_WEBHOOK_SECRET = settings.razorpay_webhook_secret
+WEBHOOK_QUEUE_PATH = settings.webhook_queue_path
+WEBHOOK_BATCH_SIZE = settings.webhook_batch_size
+WEBHOOK_MAX_ATTEMPTS = settings.webhook_max_attempts
+
+HANDLED_EVENTS = ("payment.captured", "order.paid")
+
+# Event states in the local queue
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+# No TicketIssueId in the payment notes or order receipt; the worker looks
+# the order up (payments don't always carry the order's notes) and moves
+# the event to PENDING, or leaves it here once it has given up
+UNMATCHED = "unmatched"
+# Issuance answered status 0 (TicketIssue missing, or already paid by
+# another payment): captured money without tickets, for a human to check
+NEEDS_REVIEW = "needs_review"
+
+_write_lock = threading.Lock()
+
+# Pending events in the queue file, refreshed by every processing run and
+# bumped by enqueue, so /health reads it without touching SQLite.
+# None until the first run.
+_pending_count = None
+
+
+def verify_webhook_signature(body: bytes, signature: str | None, secret: str | None = None) -> bool:
+    """
+    X-Razorpay-Signature is hex(HMAC-SHA256(raw body, webhook secret)).
+    """
+    secret = secret or RAZORPAY_WEBHOOK_SECRET
+    if not secret or not signature:
+        return False
+
+    expected = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected.encode("ascii"), signature.encode("utf-8"))
+
+
+def ticket_issue_id_from_entity(entity: dict) -> int | None:
+    """
+    TicketIssueId recorded on a Razorpay payment or order entity, if any.
+    """
+    notes = entity.get("notes") or {}
+    if isinstance(notes, dict) and str(notes.get("ticket_issue_id", "")).isdigit():
+        return int(notes["ticket_issue_id"])
+
+    # Orders are created with receipt TICKET_<TicketIssueId>
+    receipt = str(entity.get("receipt") or "")
+    if receipt.startswith("TICKET_") and receipt[7:].isdigit():
+        return int(receipt[7:])
+
+    return None
+
+
+def _entity(body: dict, name: str) -> dict:
+    wrapper = body.get(name)
+    entity = wrapper.get("entity") if isinstance(wrapper, dict) else None
+    return entity if isinstance(entity, dict) else {}
+
+
+def parse_payment_event(payload: dict) -> dict | None:
+    """
+    Extracts {event, payment_id, ticket_issue_id} from a payment.captured /
+    order.paid webhook body. Returns None for events we don't handle and
+    for bodies that don't have the webhook's shape.
+    """
+    if not isinstance(payload, dict):
+        return None
+
+    event = payload.get("event")
+    if event not in HANDLED_EVENTS:
+        return None
+
+    body = payload.get("payload")
+    if not isinstance(body, dict):
+        return None
+
+    payment = _entity(body, "payment")
+    order = _entity(body, "order")
+
+    if not payment.get("id"):
+        return None
+
+    return {
+        "event": event,
+        "payment_id": payment["id"],
+        "ticket_issue_id": ticket_issue_id_from_entity(payment) or ticket_issue_id_from_entity(order)
+    }
+
+
+# --------------------------------
+# LOCAL QUEUE (SQLite)
+# --------------------------------
+def _connect(path: str | None = None) -> sqlite3.Connection:
+    path = path or WEBHOOK_QUEUE_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS webhook_events (
+            event_id TEXT PRIMARY KEY,
+            event TEXT NOT NULL,
+            payment_id TEXT NOT NULL,
+            ticket_issue_id INTEGER,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            received_at REAL NOT NULL,
+            processed_at REAL
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS ix_webhook_events_status
+        ON webhook_events (status, received_at)
+    """)
+    return conn
+
+
+def enqueue_webhook_event(event_id: str | None, payload: dict, path: str | None = None) -> bool:
+    """
+    Records a verified webhook in the local queue.
+    Returns False for events that are ignored or already queued (Razorpay redelivers).
+    """
+    parsed = parse_payment_event(payload)
+    if not parsed:
+        return False
+
+    event_id = event_id or f"{parsed['payment_id']}:{parsed['event']}"
+    status = PENDING if parsed["ticket_issue_id"] else UNMATCHED
+
+    if status == UNMATCHED:
+        logger.warning(f"Webhook {event_id}: no ticket_issue_id for payment {parsed['payment_id']}")
+
+    with _write_lock:
+        conn = _connect(path)
+        try:
+            cur = conn.execute("""
+                INSERT OR IGNORE INTO webhook_events
+                (event_id, event, payment_id, ticket_issue_id, payload, status, received_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (
+                event_id,
+                parsed["event"],
+                parsed["payment_id"],
+                parsed["ticket_issue_id"],
+                json.dumps(payload),
+                status,
+                time.time()
+            ))
+            conn.commit()
+            queued = cur.rowcount == 1
+        finally:
+            conn.close()
+
+        if queued and status == PENDING:
+            _bump_pending(1)
+
+    return queued
+
+
+def _bump_pending(delta: int):
+    # Caller holds _write_lock
+    global _pending_count
+    if _pending_count is not None:
+        _pending_count = max(0, _pending_count + delta)
+
+
+def resolve_unmatched_events(
+    batch_size: int | None = None,
+    path: str | None = None,
+    fetch_order=fetch_order_sync
+) -> int:
+    """
+    Looks up the order of up to batch_size UNMATCHED events, like the
+    reconciliation job does, and queues those whose order receipt/notes
+    name a TicketIssueId. Lookup errors count as attempts; an order
+    without a TicketIssueId is final. Returns the number queued.
+    """
+    batch_size = batch_size or WEBHOOK_BATCH_SIZE
+
+    conn = _connect(path)
+    try:
+        events = conn.execute("""
+            SELECT event_id, payment_id, payload, attempts
+            FROM webhook_events
+            WHERE status = ? AND attempts < ?
+            ORDER BY received_at
+            LIMIT ?
+        """, (UNMATCHED, WEBHOOK_MAX_ATTEMPTS, batch_size)).fetchall()
+    finally:
+        conn.close()
+
+    # (status, ticket_issue_id, attempts, last_error, event_id)
+    results = []
+    # Several events (payment.captured + order.paid) share an order
+    orders = {}
+
+    for ev in events:
+        order_id = _entity(json.loads(ev["payload"])["payload"], "payment").get("order_id")
+
+        try:
+            if not order_id:
+                raise LookupError("payment has no order_id")
+            if order_id not in orders:
+                orders[order_id] = ticket_issue_id_from_entity(fetch_order(order_id))
+            if orders[order_id] is None:
+                raise LookupError(f"order {order_id} has no TicketIssueId")
+
+        except LookupError as e:
+            logger.warning(f"Webhook {ev['event_id']} stays unmatched: {e}")
+            results.append((UNMATCHED, None, WEBHOOK_MAX_ATTEMPTS, str(e), ev["event_id"]))
+            continue
+
+        except Exception as e:
+            logger.error(f"Webhook {ev['event_id']} order lookup failed: {e}")
+            results.append((UNMATCHED, None, ev["attempts"] + 1, str(e), ev["event_id"]))
+            continue
+
+        # Issuance attempts start from zero
+        results.append((PENDING, orders[order_id], 0, None, ev["event_id"]))
+
+    if not results:
+        return 0
+
+    queued = sum(1 for r in results if r[0] == PENDING)
+
+    with _write_lock:
+        conn = _connect(path)
+        try:
+            conn.executemany("""
+                UPDATE webhook_events
+                SET status = ?, ticket_issue_id = ?, attempts = ?, last_error = ?
+                WHERE event_id = ? AND status = ?
+            """, [r + (UNMATCHED,) for r in results])
+            conn.commit()
+        finally:
+            conn.close()
+
+        _bump_pending(queued)
+
+    return queued
+
+
+def process_pending_events(
+    batch_size: int | None = None,
+    path: str | None = None,
+    issue=issue_tickets_once,
+    notify=send_email_and_whatsapp,
+    fetch_order=fetch_order_sync
+) -> dict:
+    """
+    Resolves UNMATCHED events through their order, then drains up to
+    batch_size pending events through the same issuance path as
+    /ticket/verifyPayment. issue/notify/fetch_order are injectable so
+    recorded payloads can be replayed without a database or network.
+    """
+    batch_size = batch_size or WEBHOOK_BATCH_SIZE
+    stats = {"processed": 0, "needs_review": 0, "failed": 0}
+
+    resolve_unmatched_events(batch_size, path, fetch_order)
+
+    conn = _connect(path)
+    try:
+        events = conn.execute("""
+            SELECT event_id, payment_id, ticket_issue_id, attempts
+            FROM webhook_events
+            WHERE status = ?
+            ORDER BY received_at
+            LIMIT ?
+        """, (PENDING, batch_size)).fetchall()
+    finally:
+        conn.close()
+
+    results = []
+
+    for ev in events:
+        try:
+            result, is_leader = issue(ev["ticket_issue_id"], ev["payment_id"])
+
+            if is_leader and result.notification:
+                notify(*result.notification)
+
+            if result.response.get("status") == 1:
+                results.append((DONE, ev["attempts"] + 1, None, ev["event_id"]))
+                stats["processed"] += 1
+            else:
+                message = result.response.get("message")
+                logger.warning(
+                    f"Webhook {ev['event_id']} needs review: payment {ev['payment_id']} "
+                    f"TicketIssueId={ev['ticket_issue_id']}: {message}"
+                )
+                results.append((NEEDS_REVIEW, ev["attempts"] + 1, message, ev["event_id"]))
+                stats["needs_review"] += 1
+
+        except Exception as e:
+            attempts = ev["attempts"] + 1
+            status = FAILED if attempts >= WEBHOOK_MAX_ATTEMPTS else PENDING
+            logger.error(f"Webhook {ev['event_id']} attempt {attempts} failed: {e}")
+
+            results.append((status, attempts, str(e), ev["event_id"]))
+            stats["failed"] += 1
+
+    global _pending_count
+
+    with _write_lock:
+        conn = _connect(path)
+        try:
+            if results:
+                conn.executemany("""
+                    UPDATE webhook_events
+                    SET status = ?, attempts = ?, last_error = ?, processed_at = ?
+                    WHERE event_id = ?
+                """, [(s, a, err, time.time(), eid) for s, a, err, eid in results])
+                conn.commit()
+
+            _pending_count = _count_pending(conn)
+        finally:
+            conn.close()
+
+    return stats
+
+
+def _count_pending(conn: sqlite3.Connection) -> int:
+    return conn.execute(
+        "SELECT COUNT(*) FROM webhook_events WHERE status = ?", (PENDING,)
+    ).fetchone()[0]
+
+
+def pending_event_count() -> int | None:
+    """
+    Pending webhook events as of the last processing run plus those
+    enqueued since. In memory only, safe to call from the event loop.
+    """
+    return _pending_count
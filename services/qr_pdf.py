@@ -1,54 +1,45 @@
 import os
-import qrcode
-from reportlab.lib.pagesizes import mm
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
-from dotenv import load_dotenv
-from utils.utils import encrypt_qr_data
+from core.config import settings
+from core.metrics import timed
 
-load_dotenv()
+# qrcode / reportlab are imported inside the functions below, they are only
+# needed once a payment is issued and add noticeably to process start-up.
+QR_PATH = settings.qr_path
+PDF_PATH = settings.pdf_path
 
-QR_PATH = os.getenv("TICKET_QR_CODE_PATH", "./qrs") 
-PDF_PATH = os.getenv("PDF_PATH", "./pdfs") 
-os.makedirs(QR_PATH, exist_ok=True)
-os.makedirs(PDF_PATH, exist_ok=True)
+# Part of the PDF file name. Bump it whenever the rendered ticket changes
+# in a way old copies must not be reused for (2: the QR is the stored
+# QRCode instead of the legacy base64 string the scanner rejects).
+PDF_FORMAT_VERSION = 2
 
 
-def generate_qr_code(ticket_master_id, country_code, mobile_no, details_id):
-    details_id = int(details_id)
-    details_str = f"{details_id:05d}"
+def ticket_pdf_path(details_id) -> str:
+    return os.path.join(PDF_PATH, f"ticket_{int(details_id)}.v{PDF_FORMAT_VERSION}.pdf")
 
-    qr_raw = f"{ticket_master_id}{country_code}{mobile_no}{details_str}"
-    encrypted_text = encrypt_qr_data(qr_raw)
 
-    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_Q)
-    qr.add_data(encrypted_text)
-    qr.make(fit=True)
-
-    img = qr.make_image(fill_color="black", back_color="white")
-    qr_file = os.path.join(QR_PATH, f"qr_{details_str}.png")
-    img.save(qr_file)
+def generate_qr_code(qr_code, details_id):
+    """
+    Renders the QR payload stored in TicketIssueDetails.QRCode, i.e. exactly
+    what the scanner decodes. Compact payloads are base45, so qrcode picks
+    alphanumeric mode and a smaller symbol version.
+    """
+    details_str = f"{int(details_id):05d}"
 
-    return qr_file
-
-def generate_qr_code_with_details(ticket_master_id, country_code, mobile_no, details_id):
-    details_id = int(details_id)
-    details_str = f"{details_id:05d}"
-
-    qr_raw = f"{ticket_master_id}{country_code}{mobile_no}{details_str}"
-    encrypted_text = encrypt_qr_data(qr_raw)
+    import qrcode
 
     qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_Q)
-    qr.add_data(encrypted_text)
+    qr.add_data(qr_code)
     qr.make(fit=True)
 
     img = qr.make_image(fill_color="black", back_color="white")
+    os.makedirs(QR_PATH, exist_ok=True)
     qr_file = os.path.join(QR_PATH, f"qr_{details_str}.png")
     img.save(qr_file)
 
-    return qr_file, encrypted_text
+    return qr_file
 
 
+@timed("pdf")
 def create_ticket_pdf(
     ticket_issue_id,
     ticket_master_id,
@@ -62,11 +53,14 @@ def create_ticket_pdf(
     image5_path=None,
     image6_path=None
 ):
-    qr_path = generate_qr_code(
-        ticket_master_id, country_code, mobile_no, details_id
-    )
+    from reportlab.lib.pagesizes import mm
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.utils import ImageReader
+
+    qr_path = generate_qr_code(qr_code, details_id)
 
-    pdf_file = os.path.join(PDF_PATH, f"ticket_{details_id}.pdf")
+    os.makedirs(PDF_PATH, exist_ok=True)
+    pdf_file = ticket_pdf_path(details_id)
 
     PAGE_WIDTH = 80 * mm
     PAGE_HEIGHT = 200 * mm
@@ -0,0 +1,144 @@
+from decimal import Decimal, ROUND_HALF_UP
+from core.config import settings
+from core.metrics import timed
+
+RAZORPAY_API_URL = settings.razorpay_api_url
+RAZORPAY_KEY_ID = settings.razorpay_key_id
+RAZORPAY_KEY_SECRET = settings.razorpay_key_secret
+RAZORPAY_TIMEOUT = settings.razorpay_timeout
+RAZORPAY_CONNECT_TIMEOUT = settings.razorpay_connect_timeout
+RAZORPAY_MAX_CONNECTIONS = settings.razorpay_max_connections
+
+# httpx.AsyncClient, created by the first order (httpx is imported lazily)
+_client = None
+
+
+class RazorpayError(Exception):
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def get_client():
+    """
+    Shared keep-alive client, so each order doesn't pay for a new TLS handshake.
+    """
+    import httpx
+
+    global _client
+
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            **_client_options(),
+            limits=httpx.Limits(
+                max_connections=RAZORPAY_MAX_CONNECTIONS,
+                max_keepalive_connections=RAZORPAY_MAX_CONNECTIONS
+            )
+        )
+
+    return _client
+
+
+async def close_client():
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _client_options() -> dict:
+    import httpx
+
+    return {
+        "base_url": RAZORPAY_API_URL,
+        "auth": (RAZORPAY_KEY_ID or "", RAZORPAY_KEY_SECRET or ""),
+        "timeout": httpx.Timeout(RAZORPAY_TIMEOUT, connect=RAZORPAY_CONNECT_TIMEOUT)
+    }
+
+
+@timed("razorpay")
+async def _request(method: str, path: str, **kwargs) -> dict:
+    import httpx
+
+    try:
+        response = await get_client().request(method, path, **kwargs)
+    except httpx.TimeoutException:
+        raise RazorpayError("Razorpay request timed out")
+    except httpx.HTTPError as e:
+        raise RazorpayError(f"Razorpay request failed: {e}")
+
+    return _parse_response(response)
+
+
+@timed("razorpay")
+def _request_sync(method: str, path: str, **kwargs) -> dict:
+    """
+    _request for background threads, which cannot use the event loop's
+    shared AsyncClient. Opens its own connection: rare lookups only.
+    """
+    import httpx
+
+    try:
+        with httpx.Client(**_client_options()) as client:
+            response = client.request(method, path, **kwargs)
+    except httpx.TimeoutException:
+        raise RazorpayError("Razorpay request timed out")
+    except httpx.HTTPError as e:
+        raise RazorpayError(f"Razorpay request failed: {e}")
+
+    return _parse_response(response)
+
+
+def _parse_response(response) -> dict:
+    if response.status_code >= 400:
+        try:
+            description = response.json()["error"]["description"]
+        except Exception:
+            description = response.text
+        raise RazorpayError(description, response.status_code)
+
+    return response.json()
+
+
+def to_paise(amount) -> int:
+    """
+    Rupees -> paise through Decimal, rounded half up. Orders and the
+    reconciliation amount check both use it so they never disagree by a
+    paisa (float * 100 truncates e.g. 1.15 to 114).
+    """
+    return int((Decimal(str(amount)) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+async def create_order(amount: int, currency: str, receipt: str, notes: dict | None = None) -> dict:
+    """
+    amount is in the smallest currency unit (paise).
+    """
+    return await _request("POST", "/orders", json={
+        "amount": amount,
+        "currency": currency,
+        "receipt": receipt,
+        "notes": notes or {}
+    })
+
+
+async def list_payments(from_ts: int, to_ts: int, skip: int = 0, count: int = 100) -> list:
+    """
+    One page of payments created in [from_ts, to_ts] (unix seconds), newest first.
+    Razorpay caps count at 100.
+    """
+    collection = await _request("GET", "/payments", params={
+        "from": from_ts,
+        "to": to_ts,
+        "skip": skip,
+        "count": count
+    })
+    return collection.get("items", [])
+
+
+async def fetch_order(order_id: str) -> dict:
+    return await _request("GET", f"/orders/{order_id}")
+
+
+def fetch_order_sync(order_id: str) -> dict:
+    return _request_sync("GET", f"/orders/{order_id}")
@@ -0,0 +1,246 @@
+import asyncio
+import argparse
+import time
+from core.database import get_connection
+from services.payment_webhook import ticket_issue_id_from_entity
+from services.razorpay_gateway import list_payments, fetch_order, close_client, to_paise
+from services.ticket_issuance import issue_tickets_once, send_email_and_whatsapp
+from utils.utils import logger
+
+PAGE_SIZE = 100
+INSERT_CHUNK_SIZE = 1000
+
+
+async def iter_captured_payments(from_ts: int, to_ts: int, fetch=list_payments, page_size: int = PAGE_SIZE):
+    """
+    Streams captured payments for the window, one gateway page at a time.
+    fetch(from_ts, to_ts, skip, count) -> list; swap it for a fake in tests.
+    """
+    skip = 0
+
+    while True:
+        items = await fetch(from_ts, to_ts, skip, page_size)
+
+        for payment in items:
+            if payment.get("status") == "captured":
+                yield payment
+
+        if len(items) < page_size:
+            return
+
+        skip += page_size
+
+
+async def _resolve_ticket_issue_id(payment: dict, fetch_order, orders: dict) -> int | None:
+    """
+    TicketIssueId from the payment's notes, else from its order (receipt
+    TICKET_<id> or notes), since payments don't always carry the order notes.
+    """
+    ticket_issue_id = ticket_issue_id_from_entity(payment)
+    order_id = payment.get("order_id")
+
+    if ticket_issue_id is not None or not order_id:
+        return ticket_issue_id
+
+    if order_id not in orders:
+        try:
+            orders[order_id] = ticket_issue_id_from_entity(await fetch_order(order_id))
+        except Exception as e:
+            logger.warning(f"Reconciliation: order {order_id} lookup failed: {e}")
+            return None
+
+    return orders[order_id]
+
+
+class _CapturedPaymentsTable:
+    """
+    #CapturedPayments temp table on one connection, filled in chunks with
+    fast_executemany so the gap check is a single join instead of a
+    lookup per payment.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.cursor.fast_executemany = True
+        self.pending = []
+        self.total = 0
+        # skip/count paging can repeat an item when new payments arrive mid-run
+        self.seen = set()
+
+        self.cursor.execute("""
+            CREATE TABLE #CapturedPayments
+            (
+                PaymentId NVARCHAR(64) NOT NULL PRIMARY KEY,
+                TicketIssueId INT NOT NULL,
+                AmountPaise BIGINT NOT NULL
+            )
+        """)
+
+    def add(self, payment_id: str, ticket_issue_id: int, amount_paise: int):
+        if payment_id in self.seen:
+            return
+        self.seen.add(payment_id)
+        self.pending.append((payment_id, ticket_issue_id, amount_paise))
+        if len(self.pending) >= INSERT_CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+
+        self.cursor.executemany("""
+            INSERT INTO #CapturedPayments (PaymentId, TicketIssueId, AmountPaise)
+            VALUES (?, ?, ?)
+        """, self.pending)
+        self.total += len(self.pending)
+        self.pending = []
+
+    def find_gaps(self) -> tuple:
+        """
+        Returns (gaps, mismatches): captured payments whose TicketIssue still
+        has a blank TransactionId, split by whether the amount matches.
+        """
+        self.flush()
+
+        self.cursor.execute("""
+            SELECT
+                cp.PaymentId,
+                cp.TicketIssueId,
+                cp.AmountPaise,
+                ti.TotalAmount
+            FROM #CapturedPayments cp
+            INNER JOIN TicketIssue ti
+                ON ti.TicketIssueId = cp.TicketIssueId
+            WHERE ti.TransactionId IS NULL
+               OR ti.TransactionId = ''
+        """)
+
+        gaps = []
+        mismatches = []
+        for row in self.cursor.fetchall():
+            item = {
+                "payment_id": row.PaymentId,
+                "ticket_issue_id": row.TicketIssueId,
+                "amount_paise": int(row.AmountPaise),
+                # Same rounding as the order amount at checkout
+                "expected_paise": to_paise(row.TotalAmount)
+            }
+            (gaps if item["amount_paise"] == item["expected_paise"] else mismatches).append(item)
+
+        return gaps, mismatches
+
+    def close(self):
+        self.cursor.close()
+
+
+async def reconcile_payments(
+    from_ts: int,
+    to_ts: int,
+    dry_run: bool = False,
+    fetch=list_payments,
+    fetch_order=fetch_order,
+    issue=issue_tickets_once,
+    notify=send_email_and_whatsapp
+) -> dict:
+    """
+    Finds captured Razorpay payments in the window whose TicketIssue was never
+    fulfilled and issues them through the normal issuance path.
+    Payments whose amount doesn't match TotalAmount are reported, not issued.
+    fetch_order(order_id) -> dict resolves payments without notes through
+    their order's receipt/notes.
+    """
+    report = {
+        "captured": 0,
+        "unmatched": [],
+        "gaps": [],
+        "amount_mismatches": [],
+        "issued": 0,
+        "failed": []
+    }
+
+    # order_id -> TicketIssueId, one gateway call per order
+    orders = {}
+    conn = get_connection()
+    table = None
+
+    try:
+        table = _CapturedPaymentsTable(conn)
+
+        async for payment in iter_captured_payments(from_ts, to_ts, fetch):
+            report["captured"] += 1
+            ticket_issue_id = await _resolve_ticket_issue_id(payment, fetch_order, orders)
+
+            if ticket_issue_id is None:
+                report["unmatched"].append(payment["id"])
+                continue
+
+            table.add(payment["id"], ticket_issue_id, int(payment.get("amount", 0)))
+
+        gaps, report["amount_mismatches"] = table.find_gaps()
+        report["gaps"] = gaps
+
+    finally:
+        if table:
+            table.close()
+        conn.close()
+
+    if dry_run:
+        return report
+
+    for gap in gaps:
+        try:
+            result, is_leader = issue(gap["ticket_issue_id"], gap["payment_id"])
+
+            if is_leader and result.notification:
+                notify(*result.notification)
+
+            if result.response.get("status") == 1:
+                report["issued"] += 1
+
+        except Exception as e:
+            logger.error(
+                f"Reconciliation issuance failed for TicketIssueId={gap['ticket_issue_id']}: {e}"
+            )
+            report["failed"].append({**gap, "error": str(e)})
+
+    logger.info(
+        f"Reconciliation {from_ts}-{to_ts}: captured={report['captured']} "
+        f"gaps={len(report['gaps'])} issued={report['issued']} "
+        f"mismatches={len(report['amount_mismatches'])} unmatched={len(report['unmatched'])}"
+    )
+
+    return report
+
+
+async def _run_job(from_ts: int, to_ts: int, dry_run: bool) -> dict:
+    try:
+        return await reconcile_payments(from_ts, to_ts, dry_run=dry_run)
+    finally:
+        await close_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Issue tickets for captured but unfulfilled Razorpay payments")
+    parser.add_argument("--hours", type=float, default=24, help="Window size ending now (default 24)")
+    parser.add_argument("--from-ts", type=int, help="Window start, unix seconds (overrides --hours)")
+    parser.add_argument("--to-ts", type=int, help="Window end, unix seconds (default now)")
+    parser.add_argument("--dry-run", action="store_true", help="Report gaps without issuing")
+    args = parser.parse_args()
+
+    to_ts = args.to_ts or int(time.time())
+    from_ts = args.from_ts or int(to_ts - args.hours * 3600)
+
+    report = asyncio.run(_run_job(from_ts, to_ts, args.dry_run))
+
+    print(
+        f"captured={report['captured']} gaps={len(report['gaps'])} "
+        f"issued={report['issued']} failed={len(report['failed'])} "
+        f"amount_mismatches={len(report['amount_mismatches'])} unmatched={len(report['unmatched'])}"
+    )
+    for gap in report["amount_mismatches"]:
+        print(f"AMOUNT MISMATCH {gap}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import time
+import argparse
+from datetime import date, datetime, timedelta
+from core.database import get_connection
+from core.metrics import registry
+from utils.utils import logger
+
+# Sales without a resolvable classification are bucketed here
+UNKNOWN_CLASSIFICATION = 0
+
+registry.describe("sales_hourly_backfill_seconds", "Duration of a TicketSalesHourly backfill")
+
+# ------------------------------------------------------------------
+# TicketSalesHourly (sql/schema.sql): one row per event, hour and ticket
+# classification, clustered on (TicketMasterId, BucketHour, ...) so a
+# chart is one range seek however many tickets the event sold.
+#
+# Buckets are keyed on TicketIssue.EntryDateTime (order time) so the
+# incremental path and the backfill always agree.
+# ------------------------------------------------------------------
+
+# Legacy TicketIssue rows have no TicketClassificationId; like the
+# /getReportData summary, they are matched on unit price.
+_CLASSIFICATION_BY_RATE = """
+    SELECT TOP 1 TicketClassificationId
+    FROM TicketClassification
+    WHERE TicketMasterId = ? AND TicketRate = ?
+    ORDER BY TicketClassificationId
+"""
+
+# UPDLOCK/SERIALIZABLE: concurrent first sales of the same bucket queue up
+# instead of both inserting
+_UPSERT_BUCKET = """
+    UPDATE TicketSalesHourly WITH (UPDLOCK, SERIALIZABLE)
+    SET Orders = Orders + 1,
+        Tickets = Tickets + ?,
+        Revenue = Revenue + ?
+    WHERE TicketMasterId = ?
+      AND BucketHour = ?
+      AND TicketClassificationId = ?;
+
+    IF @@ROWCOUNT = 0
+        INSERT INTO TicketSalesHourly
+            (TicketMasterId, BucketHour, TicketClassificationId, Orders, Tickets, Revenue)
+        VALUES (?, ?, ?, 1, ?, ?);
+"""
+
+# The event's bucket range is locked first, so issuances that reach
+# record_sale meanwhile wait for the rebuild. TicketIssue is read with
+# READPAST: a sale still being issued holds its row lock and would
+# otherwise deadlock with us; it is skipped here and adds itself to the
+# rebuilt bucket once the rebuild commits.
+_BACKFILL_QUERY = """
+    SELECT COUNT(*)
+    FROM TicketSalesHourly WITH (UPDLOCK, HOLDLOCK)
+    WHERE TicketMasterId = ?;
+
+    DELETE FROM TicketSalesHourly
+    WHERE TicketMasterId = ?;
+
+    INSERT INTO TicketSalesHourly
+        (TicketMasterId, BucketHour, TicketClassificationId, Orders, Tickets, Revenue)
+    SELECT
+        ti.TicketMasterId,
+        DATEADD(HOUR, DATEDIFF(HOUR, 0, ti.EntryDateTime), 0),
+        ISNULL(ISNULL(ti.TicketClassificationId, tc.TicketClassificationId), 0),
+        COUNT(*),
+        SUM(ti.TicketCount),
+        SUM(ti.TotalAmount)
+    FROM TicketIssue ti WITH (READPAST)
+    OUTER APPLY (
+        SELECT TOP 1 c.TicketClassificationId
+        FROM TicketClassification c
+        WHERE c.TicketMasterId = ti.TicketMasterId
+          AND c.TicketRate = ti.TotalAmount / NULLIF(ti.TicketCount, 0)
+        ORDER BY c.TicketClassificationId
+    ) tc
+    WHERE ti.TicketMasterId = ?
+      AND ti.TransactionId LIKE 'pay[_]%'
+    GROUP BY
+        ti.TicketMasterId,
+        DATEADD(HOUR, DATEDIFF(HOUR, 0, ti.EntryDateTime), 0),
+        ISNULL(ISNULL(ti.TicketClassificationId, tc.TicketClassificationId), 0);
+"""
+
+
+def bucket_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def record_sale(
+    cursor,
+    ticket_master_id: int,
+    ticket_classification_id: int | None,
+    entry_datetime: datetime | None,
+    ticket_count: int,
+    total_amount
+):
+    """
+    Adds one paid TicketIssue to its hourly bucket, on the caller's
+    cursor so it commits (or rolls back) with the issuance.
+    """
+    if ticket_classification_id is None and ticket_count:
+        cursor.execute(_CLASSIFICATION_BY_RATE, ticket_master_id, total_amount / ticket_count)
+        row = cursor.fetchone()
+        ticket_classification_id = row[0] if row else None
+
+    if ticket_classification_id is None:
+        ticket_classification_id = UNKNOWN_CLASSIFICATION
+
+    hour = bucket_hour(entry_datetime or datetime.now())
+
+    cursor.execute(
+        _UPSERT_BUCKET,
+        ticket_count, total_amount,
+        ticket_master_id, hour, ticket_classification_id,
+        ticket_master_id, hour, ticket_classification_id, ticket_count, total_amount
+    )
+
+
+def backfill_event(ticket_master_id: int):
+    """
+    Rebuilds an event's buckets from TicketIssue in one transaction.
+    Issuances that upserted before the range lock was granted have
+    committed and are in the rebuild; the rest upsert after it.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(_BACKFILL_QUERY, ticket_master_id, ticket_master_id, ticket_master_id)
+        # Drain every statement's result so the whole batch has run before commit
+        while cursor.nextset():
+            pass
+        conn.commit()
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def backfill(ticket_master_ids: list | None = None) -> int:
+    """
+    Backfills the given events, or every event with a paid ticket.
+    Returns the number of events rebuilt.
+    """
+    started = time.perf_counter()
+
+    if ticket_master_ids is None:
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+                SELECT DISTINCT TicketMasterId
+                FROM TicketIssue
+                WHERE TransactionId LIKE 'pay[_]%'
+            """)
+            ticket_master_ids = [row[0] for row in cursor.fetchall()]
+
+        finally:
+            cursor.close()
+            conn.close()
+
+    for ticket_master_id in ticket_master_ids:
+        backfill_event(ticket_master_id)
+        logger.info(f"TicketSalesHourly backfilled for TicketMasterId={ticket_master_id}")
+
+    registry.observe("sales_hourly_backfill_seconds", time.perf_counter() - started)
+    return len(ticket_master_ids)
+
+
+def get_hourly_sales(
+    ticket_master_id: int,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    ticket_classification_id: int | None = None,
+    bucket: str = "hour"
+) -> dict:
+    """
+    Orders, tickets and revenue per bucket ("hour" or "day") and ticket
+    classification, oldest first, plus totals over the range.
+    """
+    if bucket not in ("hour", "day"):
+        raise ValueError("bucket must be hour or day")
+
+    where = ["s.TicketMasterId = ?"]
+    params = [ticket_master_id]
+
+    if date_from:
+        where.append("s.BucketHour >= ?")
+        params.append(datetime.combine(date_from, datetime.min.time()))
+
+    if date_to:
+        where.append("s.BucketHour < ?")
+        params.append(datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+
+    if ticket_classification_id is not None:
+        where.append("s.TicketClassificationId = ?")
+        params.append(ticket_classification_id)
+
+    bucket_expr = "s.BucketHour" if bucket == "hour" else "CAST(CAST(s.BucketHour AS DATE) AS DATETIME)"
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(f"""
+            SELECT
+                {bucket_expr} AS Bucket,
+                s.TicketClassificationId,
+                tc.TicketType,
+                SUM(s.Orders) AS Orders,
+                SUM(s.Tickets) AS Tickets,
+                SUM(s.Revenue) AS Revenue
+            FROM TicketSalesHourly s
+            LEFT JOIN TicketClassification tc
+                ON tc.TicketClassificationId = s.TicketClassificationId
+            WHERE {" AND ".join(where)}
+            GROUP BY {bucket_expr}, s.TicketClassificationId, tc.TicketType
+            ORDER BY Bucket, s.TicketClassificationId
+        """, *params)
+
+        series = [
+            {
+                "bucket": row.Bucket,
+                "ticket_classification_id": row.TicketClassificationId,
+                "ticket_type": row.TicketType,
+                "orders": row.Orders,
+                "tickets": row.Tickets,
+                "revenue": row.Revenue
+            }
+            for row in cursor.fetchall()
+        ]
+
+    finally:
+        cursor.close()
+        conn.close()
+
+    return {
+        "ticket_master_id": ticket_master_id,
+        "bucket": bucket,
+        "totals": {
+            "orders": sum(p["orders"] for p in series),
+            "tickets": sum(p["tickets"] for p in series),
+            "revenue": sum(p["revenue"] for p in series)
+        },
+        "series": series
+    }
+
+
+# --------------------------------
+# CLI: python -m services.sales_analytics [--event-id N ...]
+# --------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild TicketSalesHourly from TicketIssue")
+    parser.add_argument("--event-id", type=int, action="append", dest="event_ids",
+                        help="TicketMasterId to rebuild (repeatable); default: every event with sales")
+    args = parser.parse_args()
+
+    count = backfill(args.event_ids)
+    print(f"backfilled events={count}")
+
+
+if __name__ == "__main__":
+    main()
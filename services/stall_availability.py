@@ -0,0 +1,84 @@
+from core.config import settings
+from core.database import get_connection
+from utils.cache import TTLCache
+from utils.fast_json import dumps, rows_to_dicts
+
+# Encoded availability bodies keyed by EventMasterId
+stall_availability_cache = TTLCache(ttl=settings.stall_availability_cache_ttl, maxsize=256)
+
+# Every stall of the event with its booking, if any. A stall has at most
+# one booking (UX_StallBookingMaster_StallMasterId, sql/schema.sql).
+_AVAILABILITY_QUERY = """
+    SELECT
+        sm.StallMasterId,
+        sm.StallNo,
+        sm.StallExpenses,
+        sm.Eminities,
+        sm.DepositAmount,
+        sbm.StallBookingMasterId,
+        sbm.TenantName,
+        sbm.TenantBrandName
+    FROM [EventManagement].[dbo].[StallMaster] sm
+    LEFT JOIN [EventManagement].[dbo].[StallBookingMaster] sbm
+        ON sbm.StallMasterId = sm.StallMasterId
+    WHERE sm.EventMasterId = ?
+    ORDER BY sm.StallNo, sm.StallMasterId
+"""
+
+
+def load_stall_availability(event_master_id: int) -> bytes:
+    """
+    {"event_master_id", "total", "booked", "free", "stalls": [...]} with
+    each stall's status ("booked" / "free") and booking, as a JSON body.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(_AVAILABILITY_QUERY, event_master_id)
+        stalls = rows_to_dicts(cursor, cursor.fetchall())
+
+    finally:
+        cursor.close()
+        conn.close()
+
+    booked = 0
+    for stall in stalls:
+        booking_id = stall.pop("StallBookingMasterId")
+        tenant_name = stall.pop("TenantName")
+        brand_name = stall.pop("TenantBrandName")
+
+        if booking_id is None:
+            stall["status"] = "free"
+            stall["booking"] = None
+        else:
+            booked += 1
+            stall["status"] = "booked"
+            stall["booking"] = {
+                "StallBookingMasterId": booking_id,
+                "TenantName": tenant_name,
+                "TenantBrandName": brand_name
+            }
+
+    return dumps({
+        "event_master_id": event_master_id,
+        "total": len(stalls),
+        "booked": booked,
+        "free": len(stalls) - booked,
+        "stalls": stalls
+    })
+
+
+def get_stall_availability(event_master_id: int) -> bytes:
+    return stall_availability_cache.get_or_load(event_master_id, load_stall_availability, event_master_id)
+
+
+def invalidate_stall_availability(event_master_id: int | None = None):
+    """
+    Drops one event's cached map, or all of them. Call after a stall or a
+    stall booking is written.
+    """
+    if event_master_id is None:
+        stall_availability_cache.clear()
+    else:
+        stall_availability_cache.invalidate(event_master_id)
@@ -0,0 +1,261 @@
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from core.config import settings
+from core.database import get_connection, has_column, has_table
+from services.mail_service import send_ticket_email
+from services.qr_pdf import create_ticket_pdf
+from services.inventory import inventory
+from services.sales_analytics import record_sale
+from services.whatsapp_service import send_whatsapp_with_pdf
+from utils.single_flight import SingleFlight
+from utils.utils import generate_qr_string, logger
+
+IMAGE_BASE_PATH = settings.image_base_path
+
+# Concurrent verifications of the same payment share one issuance run
+payment_flight = SingleFlight()
+
+
+@dataclass
+class IssuanceResult:
+    response: dict
+    # Positional args for send_email_and_whatsapp, set only when tickets were issued
+    notification: tuple | None = None
+
+
+def send_email_and_whatsapp(
+    email_id,
+    name,
+    mobile_no,
+    entry_datetime,
+    ticket_count,
+    total_amount,
+    pdf_files
+):
+    # EMAIL
+    send_ticket_email(
+        email_id,
+        name,
+        mobile_no,
+        entry_datetime,
+        ticket_count,
+        total_amount,
+        "USD",
+        "Event Name",
+        None,
+        pdf_files
+    )
+
+    # WHATSAPP (ONE MESSAGE PER TICKET)
+    for i, pdf in enumerate(pdf_files, start=1):
+        send_whatsapp_with_pdf(
+            mobile_no=mobile_no,
+            pdf_file=pdf,
+            ticket_no=i,
+            total_tickets=ticket_count
+        )
+
+
+def issue_tickets(ticket_issue_id: int, razorpay_payment_id: str) -> IssuanceResult:
+    """
+    Marks a TicketIssue as paid and creates its TicketIssueDetails, QRs and PDFs.
+
+    The TransactionId update is a conditional claim: only the caller whose
+    UPDATE matches an unpaid row goes on to issue tickets, everyone else
+    (other workers, retries) gets "already processed" without repeating work.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        # ---------------------------
+        # Claim TicketIssue
+        # ---------------------------
+        # TicketClassificationId only exists once sql/schema.sql has run
+        if has_column("dbo.TicketIssue", "TicketClassificationId"):
+            classification_column = "INSERTED.TicketClassificationId"
+        else:
+            classification_column = "CAST(NULL AS INT) AS TicketClassificationId"
+
+        cursor.execute(f"""
+            UPDATE TicketIssue
+            SET TransactionId = ?
+            OUTPUT
+                INSERTED.TicketMasterId,
+                INSERTED.MobileNo,
+                INSERTED.EmailId,
+                INSERTED.TicketCount,
+                INSERTED.TotalAmount,
+                INSERTED.Name,
+                INSERTED.EntryDateTime,
+                {classification_column}
+            WHERE TicketIssueId = ?
+              AND (TransactionId IS NULL OR TransactionId NOT LIKE 'pay[_]%')
+        """, (
+            razorpay_payment_id,
+            ticket_issue_id
+        ))
+
+        row = cursor.fetchone()
+
+        if not row:
+            conn.rollback()
+
+            cursor.execute("""
+                SELECT TransactionId
+                FROM TicketIssue
+                WHERE TicketIssueId = ?
+            """, ticket_issue_id)
+
+            existing = cursor.fetchone()
+            if not existing:
+                return IssuanceResult({
+                    "status": 0,
+                    "message": "TicketIssue not found"
+                })
+
+            # Same payment retried -> same (successful) outcome
+            return IssuanceResult({
+                "status": 1 if existing.TransactionId == razorpay_payment_id else 0,
+                "message": "Payment already processed"
+            })
+
+        ticket_master_id = row.TicketMasterId
+        mobile_no = row.MobileNo
+        email_id = row.EmailId
+        ticket_count = row.TicketCount
+        total_amount = row.TotalAmount
+        name = row.Name
+        entry_datetime = datetime.now()
+
+        # ----------------------------
+        # Get Ticket Images
+        # ----------------------------
+        cursor.execute("""
+            SELECT Image5, Image6
+            FROM TicketMaster
+            WHERE TicketMasterId = ?
+        """, ticket_master_id)
+
+        img_row = cursor.fetchone()
+        image5_path = None
+        image6_path = None
+
+        if img_row:
+            if img_row.Image5:
+                image5_path = os.path.join(IMAGE_BASE_PATH, img_row.Image5)
+            if img_row.Image6:
+                image6_path = os.path.join(IMAGE_BASE_PATH, img_row.Image6)
+
+        # --------------------------------------------------
+        # TicketIssueDetails + QR + PDF
+        # --------------------------------------------------
+        pdf_files = []
+
+        for i in range(1, ticket_count + 1):
+
+            cursor.execute("""
+                INSERT INTO TicketIssueDetails (TicketIssueId)
+                OUTPUT INSERTED.TicketIssueDetailsId
+                VALUES (?)
+            """, ticket_issue_id)
+
+            details_id = int(cursor.fetchone()[0])
+
+            qr_string = generate_qr_string(
+                ticket_issue_id,
+                details_id
+            )
+
+            cursor.execute("""
+                UPDATE TicketIssueDetails
+                SET QRCode = ?
+                WHERE TicketIssueDetailsId = ?
+            """, (qr_string, details_id))
+
+            pdf_path = create_ticket_pdf(
+                ticket_issue_id=ticket_issue_id,
+                ticket_master_id=ticket_master_id,
+                country_code="91",
+                mobile_no=mobile_no,
+                name=name,
+                ticket_no=i,
+                total_tickets=ticket_count,
+                details_id=details_id,
+                qr_code=qr_string,
+                image5_path=image5_path,
+                image6_path=image6_path
+            )
+
+            pdf_files.append(pdf_path)
+
+        # Hourly sales bucket, last so its row lock is held only until commit.
+        # Skipped until sql/schema.sql has created TicketSalesHourly (the
+        # backfill job fills it in afterwards). A failed upsert is rolled
+        # back to the savepoint and the issuance still commits. If the error
+        # killed the whole transaction (deadlock victim, doomed transaction)
+        # there is nothing left to commit, so it is re-raised.
+        if has_table("dbo.TicketSalesHourly"):
+            cursor.execute("SAVE TRANSACTION sales_bucket")
+            try:
+                record_sale(
+                    cursor,
+                    ticket_master_id,
+                    row.TicketClassificationId,
+                    row.EntryDateTime,
+                    ticket_count,
+                    total_amount
+                )
+            except Exception as e:
+                cursor.execute("SELECT XACT_STATE()")
+                if cursor.fetchone()[0] != 1:
+                    raise
+                cursor.execute("ROLLBACK TRANSACTION sales_bucket")
+                logger.error(f"TicketSalesHourly update failed for TicketIssueId={ticket_issue_id}: {e}")
+
+        with inventory.sale():
+            conn.commit()
+            inventory.confirm(ticket_issue_id, ticket_master_id, ticket_count)
+
+        logger.info(
+            f"Issued {ticket_count} tickets for TicketIssueId={ticket_issue_id} "
+            f"payment={razorpay_payment_id}"
+        )
+
+        return IssuanceResult(
+            {
+                "status": 1,
+                "message": "Payment verified and tickets issued successfully"
+            },
+            (
+                email_id,
+                name,
+                mobile_no,
+                entry_datetime,
+                ticket_count,
+                total_amount,
+                pdf_files
+            )
+        )
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def issue_tickets_once(ticket_issue_id: int, razorpay_payment_id: str) -> tuple:
+    """
+    issue_tickets() behind the in-process single-flight map.
+    Returns (IssuanceResult, is_leader); only the leader should send notifications.
+    """
+    return payment_flight.do(
+        (ticket_issue_id, razorpay_payment_id),
+        issue_tickets,
+        ticket_issue_id,
+        razorpay_payment_id
+    )
@@ -0,0 +1,192 @@
+import os
+from datetime import datetime
+from core.config import settings
+from core.database import get_connection
+from services.mail_service import send_ticket_email
+from services.qr_pdf import create_ticket_pdf, ticket_pdf_path
+from services.whatsapp_service import send_whatsapp_with_pdf
+from utils.utils import logger
+
+IMAGE_BASE_PATH = settings.image_base_path
+LOOKUP_LIMIT = 50
+
+# Served by IX_TicketIssue_MobileNo / IX_TicketIssue_EmailId (sql/indexes.sql)
+_LOOKUP_QUERY = """
+    SELECT TOP (?)
+        ti.TicketIssueId,
+        ti.TicketMasterId,
+        tm.EventName,
+        tm.EventDate,
+        ti.Name,
+        ti.MobileNo,
+        ti.EmailId,
+        ti.TicketCount,
+        ti.TotalAmount,
+        ti.EntryDateTime,
+        ti.TransactionId
+    FROM TicketIssue ti
+    INNER JOIN TicketMaster tm
+        ON tm.TicketMasterId = ti.TicketMasterId
+    WHERE ti.{column} = ?
+      AND ti.TransactionId LIKE 'pay[_]%'
+    ORDER BY ti.TicketIssueId DESC
+"""
+
+
+def find_tickets(mobile_no: str | None = None, email_id: str | None = None, limit: int = LOOKUP_LIMIT) -> list:
+    """
+    Paid TicketIssues for a mobile number or email, newest first.
+    """
+    if mobile_no:
+        column, value = "MobileNo", mobile_no.strip()
+    elif email_id:
+        column, value = "EmailId", email_id.strip()
+    else:
+        raise ValueError("mobile_no or email_id is required")
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(_LOOKUP_QUERY.format(column=column), limit, value)
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _load_issue(cursor, ticket_issue_id: int):
+    cursor.execute("""
+        SELECT
+            ti.TicketIssueId,
+            ti.TicketMasterId,
+            ti.Name,
+            ti.MobileNo,
+            ti.EmailId,
+            ti.TicketCount,
+            ti.TotalAmount,
+            ti.EntryDateTime,
+            tm.EventName,
+            tm.Currency,
+            tm.Image5,
+            tm.Image6
+        FROM TicketIssue ti
+        INNER JOIN TicketMaster tm
+            ON tm.TicketMasterId = ti.TicketMasterId
+        WHERE ti.TicketIssueId = ?
+          AND ti.TransactionId LIKE 'pay[_]%'
+    """, ticket_issue_id)
+    return cursor.fetchone()
+
+
+def prepare_ticket_artifacts(ticket_issue_id: int) -> dict | None:
+    """
+    Issue row and PDF paths of an issued ticket, without rendering
+    anything: "missing" lists the details without a current-format PDF
+    on disk (see qr_pdf.PDF_FORMAT_VERSION).
+    Returns None when the TicketIssue is unknown or unpaid.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        issue = _load_issue(cursor, ticket_issue_id)
+        if issue is None:
+            return None
+
+        cursor.execute("""
+            SELECT TicketIssueDetailsId, QRCode
+            FROM TicketIssueDetails
+            WHERE TicketIssueId = ?
+            ORDER BY TicketIssueDetailsId
+        """, ticket_issue_id)
+        details = cursor.fetchall()
+
+    finally:
+        cursor.close()
+        conn.close()
+
+    pdf_files = []
+    missing = []
+
+    for ticket_no, detail in enumerate(details, start=1):
+        # Only the current PDF_FORMAT_VERSION is reused: older copies carry
+        # a QR the scanner no longer accepts
+        pdf_path = ticket_pdf_path(detail.TicketIssueDetailsId)
+        if not os.path.isfile(pdf_path):
+            missing.append((ticket_no, detail))
+        pdf_files.append(pdf_path)
+
+    return {
+        "issue": issue,
+        "pdf_files": pdf_files,
+        "missing": missing
+    }
+
+
+def render_missing_pdfs(artifacts: dict):
+    """
+    Renders the PDFs prepare_ticket_artifacts found missing, from the
+    QRCode stored at issue time. Runs in the background task.
+    """
+    issue = artifacts["issue"]
+    total = len(artifacts["pdf_files"])
+    image5_path = os.path.join(IMAGE_BASE_PATH, issue.Image5) if issue.Image5 else None
+    image6_path = os.path.join(IMAGE_BASE_PATH, issue.Image6) if issue.Image6 else None
+
+    for ticket_no, detail in artifacts["missing"]:
+        artifacts["pdf_files"][ticket_no - 1] = create_ticket_pdf(
+            ticket_issue_id=issue.TicketIssueId,
+            ticket_master_id=issue.TicketMasterId,
+            country_code="91",
+            mobile_no=issue.MobileNo,
+            name=issue.Name,
+            ticket_no=ticket_no,
+            total_tickets=total,
+            details_id=detail.TicketIssueDetailsId,
+            qr_code=detail.QRCode,
+            image5_path=image5_path,
+            image6_path=image6_path
+        )
+
+
+def send_ticket_copies(artifacts: dict, channels: list):
+    issue = artifacts["issue"]
+
+    try:
+        render_missing_pdfs(artifacts)
+    except Exception as e:
+        logger.error(f"Ticket resend PDF render failed for TicketIssueId={issue.TicketIssueId}: {e}")
+        return
+
+    pdf_files = artifacts["pdf_files"]
+
+    if "email" in channels and issue.EmailId:
+        try:
+            send_ticket_email(
+                issue.EmailId,
+                issue.Name,
+                issue.MobileNo,
+                issue.EntryDateTime or datetime.now(),
+                issue.TicketCount,
+                issue.TotalAmount,
+                issue.Currency,
+                issue.EventName,
+                None,
+                pdf_files
+            )
+        except Exception as e:
+            logger.error(f"Ticket resend email failed for TicketIssueId={issue.TicketIssueId}: {e}")
+
+    if "whatsapp" in channels and issue.MobileNo:
+        for i, pdf in enumerate(pdf_files, start=1):
+            send_whatsapp_with_pdf(
+                mobile_no=issue.MobileNo,
+                pdf_file=pdf,
+                ticket_no=i,
+                total_tickets=len(pdf_files)
+            )
+
+    logger.info(f"Resent {len(pdf_files)} tickets for TicketIssueId={issue.TicketIssueId} via {channels}")
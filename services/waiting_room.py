@@ -0,0 +1,173 @@
+import hmac
+import json
+import time
+import base64
+import hashlib
+import secrets
+import threading
+from core.config import settings
+
+WAITING_ROOM_ENABLED = settings.waiting_room_enabled
+WAITING_ROOM_SECRET = (settings.waiting_room_secret or secrets.token_hex(32)).encode("utf-8")
+# Checkout sessions admitted per second, per event
+WAITING_ROOM_ADMIT_RATE = settings.waiting_room_admit_rate
+# Sessions admitted immediately when nobody is waiting
+WAITING_ROOM_BURST = settings.waiting_room_burst
+QUEUE_TOKEN_TTL = settings.waiting_room_queue_token_ttl
+ADMISSION_TOKEN_TTL = settings.waiting_room_admission_ttl
+
+QUEUE = "q"
+ADMISSION = "a"
+
+
+class AdmissionError(Exception):
+    pass
+
+
+# --------------------------------
+# SIGNED TOKENS
+# --------------------------------
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _unb64(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def sign_token(claims: dict) -> str:
+    body = _b64(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    sig = hmac.new(WAITING_ROOM_SECRET, body.encode("ascii"), hashlib.sha256).digest()
+    return f"{body}.{_b64(sig[:16])}"
+
+
+def verify_token(token: str | None, kind: str) -> dict:
+    if not token or "." not in token:
+        raise AdmissionError("Missing token")
+
+    body, sig = token.rsplit(".", 1)
+
+    try:
+        expected = hmac.new(WAITING_ROOM_SECRET, body.encode("ascii"), hashlib.sha256).digest()[:16]
+        valid = hmac.compare_digest(_unb64(sig), expected)
+        claims = json.loads(_unb64(body)) if valid else None
+    except ValueError:
+        valid = False
+
+    if not valid or not isinstance(claims, dict) or claims.get("t") != kind:
+        raise AdmissionError("Invalid token")
+
+    if claims.get("exp", 0) < time.time():
+        raise AdmissionError("Token expired")
+
+    return claims
+
+
+# --------------------------------
+# QUEUE
+# --------------------------------
+class _EventQueue:
+    def __init__(self, burst: int):
+        self.next_seq = 0
+        self.admitted_upto = float(burst)
+        self.last_tick = time.monotonic()
+
+
+class WaitingRoom:
+    """
+    Per-event FIFO admission, entirely in memory.
+
+    Every session joining gets a sequence number inside a signed queue token.
+    A watermark advances at admit_rate per second and everyone at or below
+    it may check out. The watermark never runs more than burst ahead of the
+    last joined session, so an idle event admits a burst immediately and
+    a spike is drained at a steady rate.
+    """
+
+    def __init__(self, admit_rate: float = WAITING_ROOM_ADMIT_RATE, burst: int = WAITING_ROOM_BURST):
+        self.admit_rate = admit_rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._queues = {}
+
+    def _queue(self, ticket_master_id: int) -> _EventQueue:
+        # Caller holds self._lock
+        q = self._queues.get(ticket_master_id)
+        if q is None:
+            q = self._queues[ticket_master_id] = _EventQueue(self.burst)
+
+        now = time.monotonic()
+        q.admitted_upto = min(
+            q.admitted_upto + self.admit_rate * (now - q.last_tick),
+            q.next_seq + self.burst
+        )
+        q.last_tick = now
+        return q
+
+    def _status(self, ticket_master_id: int, seq: int, queue_token: str, q: _EventQueue) -> dict:
+        position = max(0, seq - int(q.admitted_upto))
+        status = {
+            "queue_token": queue_token,
+            "admitted": position == 0,
+            "position": position,
+            "estimated_wait_seconds": round(position / self.admit_rate) if self.admit_rate else None,
+        }
+
+        if position == 0:
+            status["admission_token"] = sign_token({
+                "t": ADMISSION,
+                "e": ticket_master_id,
+                "exp": int(time.time()) + ADMISSION_TOKEN_TTL
+            })
+
+        return status
+
+    def join(self, ticket_master_id: int) -> dict:
+        with self._lock:
+            q = self._queue(ticket_master_id)
+            q.next_seq += 1
+            seq = q.next_seq
+
+        queue_token = sign_token({
+            "t": QUEUE,
+            "e": ticket_master_id,
+            "s": seq,
+            "exp": int(time.time()) + QUEUE_TOKEN_TTL
+        })
+
+        return self._status(ticket_master_id, seq, queue_token, q)
+
+    def status(self, queue_token: str) -> dict:
+        claims = verify_token(queue_token, QUEUE)
+        ticket_master_id, seq = claims["e"], claims["s"]
+
+        with self._lock:
+            q = self._queue(ticket_master_id)
+            # Token issued before a restart: keep its place in the new queue
+            q.next_seq = max(q.next_seq, seq)
+
+        return self._status(ticket_master_id, seq, queue_token, q)
+
+    def depth(self) -> dict:
+        with self._lock:
+            return {
+                tm_id: max(0, q.next_seq - int(q.admitted_upto))
+                for tm_id, q in self._queues.items()
+            }
+
+
+waiting_room = WaitingRoom()
+
+
+def check_admission(admission_token: str | None, ticket_master_id: int):
+    """
+    Raises AdmissionError unless the token admits this event.
+    No-op while the waiting room is disabled.
+    """
+    if not WAITING_ROOM_ENABLED:
+        return
+
+    claims = verify_token(admission_token, ADMISSION)
+
+    if claims.get("e") != ticket_master_id:
+        raise AdmissionError("Admission token is for another event")
@@ -1,20 +1,28 @@
-import os
 import json
-from twilio.rest import Client
-from dotenv import load_dotenv
+from functools import lru_cache
+from core.config import settings
 from utils.utils import logger
+from core.metrics import timed
 
-load_dotenv()
+TWILIO_ACCOUNT_SID = settings.twilio_account_sid
+TWILIO_AUTH_TOKEN = settings.twilio_auth_token
+TWILIO_SERVICE_ID = settings.twilio_service_id
+TWILIO_CONTENT_SID = settings.twilio_content_sid
+# Approved template for event notices ({{1}} event, {{2}} message); free text when unset
+TWILIO_NOTICE_CONTENT_SID = settings.twilio_notice_content_sid
 
-TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
-TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
-TWILIO_SERVICE_ID = os.getenv("TWILIO_SERVICE_ID")   
-TWILIO_CONTENT_SID = os.getenv("TWILIO_CONTENT_SID")
 
+@lru_cache(maxsize=1)
+def get_twilio_client():
+    """
+    Built on first send: the twilio SDK is slow to import and not needed to serve requests.
+    """
+    from twilio.rest import Client
 
-client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+    return Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
 
 
+@timed("whatsapp")
 def send_whatsapp_with_pdf(
     mobile_no: str,
     pdf_file: str,  
@@ -27,7 +35,7 @@ def send_whatsapp_with_pdf(
             "2": pdf_file    
         })
 
-        message = client.messages.create(
+        message = get_twilio_client().messages.create(
             messaging_service_sid=TWILIO_SERVICE_ID,
             to=f"whatsapp:{mobile_no}",
             content_sid=TWILIO_CONTENT_SID,
@@ -38,3 +46,27 @@ def send_whatsapp_with_pdf(
 
     except Exception as e:
         logger.error(f"WhatsApp send failed: {e}")
+
+
+@timed("whatsapp")
+def send_whatsapp_text(mobile_no: str, event_name: str, text: str) -> str:
+    """
+    Event notice to a ticket holder. Unlike send_whatsapp_with_pdf, errors
+    are raised so bulk senders can count and retry them. Returns the SID.
+    """
+    if TWILIO_NOTICE_CONTENT_SID:
+        message = get_twilio_client().messages.create(
+            messaging_service_sid=TWILIO_SERVICE_ID,
+            to=f"whatsapp:{mobile_no}",
+            content_sid=TWILIO_NOTICE_CONTENT_SID,
+            content_variables=json.dumps({"1": event_name, "2": text})
+        )
+    else:
+        # Free-form text is only delivered inside a 24h customer session
+        message = get_twilio_client().messages.create(
+            messaging_service_sid=TWILIO_SERVICE_ID,
+            to=f"whatsapp:{mobile_no}",
+            body=text
+        )
+
+    return message.sid
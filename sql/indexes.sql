@@ -0,0 +1,166 @@
+-- Supporting indexes for the API's hot queries (SQL Server).
+-- Idempotent: safe to re-run on every deploy.
+
+-- /getEventList: range on EventDate, keyset order (EventDate, TicketMasterId),
+-- Country / status filters and the default public columns covered.
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'IX_TicketMaster_EventDate' AND object_id = OBJECT_ID('dbo.TicketMaster')
+)
+CREATE NONCLUSTERED INDEX IX_TicketMaster_EventDate
+    ON dbo.TicketMaster (EventDate, TicketMasterId)
+    INCLUDE (
+        Country, EventClose, EventPostpone, EventDay, Venue, CountryCode,
+        Currency, EntryDateTime, EntryUserMasterId, MaxLimit, EventName, EventTime
+    );
+GO
+
+-- /getEventList?country=...
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'IX_TicketMaster_Country_EventDate' AND object_id = OBJECT_ID('dbo.TicketMaster')
+)
+CREATE NONCLUSTERED INDEX IX_TicketMaster_Country_EventDate
+    ON dbo.TicketMaster (Country, EventDate, TicketMasterId)
+    INCLUDE (EventClose, EventPostpone);
+GO
+
+-- Enquiry follow-up claim (UPDATE TOP (n) ... WHERE IsSend = 0): only unsent rows
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'IX_TicketEnquiry_Unsent' AND object_id = OBJECT_ID('dbo.TicketEnquiry')
+)
+CREATE NONCLUSTERED INDEX IX_TicketEnquiry_Unsent
+    ON dbo.TicketEnquiry (EntryDateTime)
+    INCLUDE (TicketMasterId)
+    WHERE IsSend = 0;
+GO
+
+-- /admin/tickets?mobile_no=... support lookup
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'IX_TicketIssue_MobileNo' AND object_id = OBJECT_ID('dbo.TicketIssue')
+)
+CREATE NONCLUSTERED INDEX IX_TicketIssue_MobileNo
+    ON dbo.TicketIssue (MobileNo, TicketIssueId)
+    INCLUDE (TicketMasterId, TransactionId);
+GO
+
+-- /admin/tickets?email_id=... support lookup
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'IX_TicketIssue_EmailId' AND object_id = OBJECT_ID('dbo.TicketIssue')
+)
+CREATE NONCLUSTERED INDEX IX_TicketIssue_EmailId
+    ON dbo.TicketIssue (EmailId, TicketIssueId)
+    INCLUDE (TicketMasterId, TransactionId);
+GO
+
+-- Per-event paid tickets: inventory counts, event notices
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'IX_TicketIssue_TicketMasterId' AND object_id = OBJECT_ID('dbo.TicketIssue')
+)
+CREATE NONCLUSTERED INDEX IX_TicketIssue_TicketMasterId
+    ON dbo.TicketIssue (TicketMasterId, TicketIssueId)
+    INCLUDE (TransactionId, TicketCount, MobileNo, EmailId, Name);
+GO
+
+-- Ticket details (stored QRCode) of one TicketIssue: resend, QR scan
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'IX_TicketIssueDetails_TicketIssueId' AND object_id = OBJECT_ID('dbo.TicketIssueDetails')
+)
+CREATE NONCLUSTERED INDEX IX_TicketIssueDetails_TicketIssueId
+    ON dbo.TicketIssueDetails (TicketIssueId)
+    INCLUDE (QRCode);
+GO
+
+-- /getStallBookingMasters?event_id=...
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'IX_StallBookingMaster_EventMasterId' AND object_id = OBJECT_ID('dbo.StallBookingMaster')
+)
+CREATE NONCLUSTERED INDEX IX_StallBookingMaster_EventMasterId
+    ON dbo.StallBookingMaster (EventMasterId, StallBookingMasterId);
+GO
+
+-- /getStallBookingMasters?category_id=...
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'IX_StallBookingMaster_CategoryId' AND object_id = OBJECT_ID('dbo.StallBookingMaster')
+)
+CREATE NONCLUSTERED INDEX IX_StallBookingMaster_CategoryId
+    ON dbo.StallBookingMaster (CategoryId, StallBookingMasterId);
+GO
+
+-- /getStallBookingMasters?date_from=...&date_to=...
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'IX_StallBookingMaster_EntryDateTime' AND object_id = OBJECT_ID('dbo.StallBookingMaster')
+)
+CREATE NONCLUSTERED INDEX IX_StallBookingMaster_EntryDateTime
+    ON dbo.StallBookingMaster (EntryDateTime);
+GO
+
+-- /getStallBookingMasters?q=... (prefix LIKE, one seek per column)
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'IX_StallBookingMaster_TenantName' AND object_id = OBJECT_ID('dbo.StallBookingMaster')
+)
+CREATE NONCLUSTERED INDEX IX_StallBookingMaster_TenantName
+    ON dbo.StallBookingMaster (TenantName);
+GO
+
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'IX_StallBookingMaster_TenantBrandName' AND object_id = OBJECT_ID('dbo.StallBookingMaster')
+)
+CREATE NONCLUSTERED INDEX IX_StallBookingMaster_TenantBrandName
+    ON dbo.StallBookingMaster (TenantBrandName);
+GO
+
+-- /getSponsorMasters?event_id=...
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'IX_SponsorMaster_EventMasterId' AND object_id = OBJECT_ID('dbo.SponsorMaster')
+)
+CREATE NONCLUSTERED INDEX IX_SponsorMaster_EventMasterId
+    ON dbo.SponsorMaster (EventMasterId, SponsorMasterId);
+GO
+
+-- /getSponsorMasters?date_from=...&date_to=...
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'IX_SponsorMaster_EntryDateTime' AND object_id = OBJECT_ID('dbo.SponsorMaster')
+)
+CREATE NONCLUSTERED INDEX IX_SponsorMaster_EntryDateTime
+    ON dbo.SponsorMaster (EntryDateTime);
+GO
+
+-- /getSponsorMasters?q=... (prefix LIKE, one seek per column)
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'IX_SponsorMaster_SponsorName' AND object_id = OBJECT_ID('dbo.SponsorMaster')
+)
+CREATE NONCLUSTERED INDEX IX_SponsorMaster_SponsorName
+    ON dbo.SponsorMaster (SponsorName);
+GO
+
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'IX_SponsorMaster_SponsorCompanyName' AND object_id = OBJECT_ID('dbo.SponsorMaster')
+)
+CREATE NONCLUSTERED INDEX IX_SponsorMaster_SponsorCompanyName
+    ON dbo.SponsorMaster (SponsorCompanyName);
+GO
+
+-- /getStallAvailability/{event_id}: the event's stall grid
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'IX_StallMaster_EventMasterId' AND object_id = OBJECT_ID('dbo.StallMaster')
+)
+CREATE NONCLUSTERED INDEX IX_StallMaster_EventMasterId
+    ON dbo.StallMaster (EventMasterId, StallNo)
+    INCLUDE (StallExpenses, Eminities, DepositAmount);
+GO
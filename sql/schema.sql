@@ -0,0 +1,53 @@
+-- Schema additions the API relies on (SQL Server).
+-- Idempotent: safe to re-run on every deploy.
+--
+-- Deploy order: run this script, then deploy the API.
+--   * StallBookingMaster.StallMasterId is optional at runtime: until it
+--     exists, /addStallBookingMaster stores bookings without a stall (503
+--     when one is requested), /getStallAvailability answers 503 and the
+--     stall booking list omits the column.
+--   * TicketIssue.TicketClassificationId is optional at runtime: until it
+--     exists, orders are stored without it (analytics match them on unit
+--     price).
+--   * TicketSalesHourly is optional at runtime: until it exists, ticket
+--     issuance skips the hourly bucket update. Run
+--     `python -m services.sales_analytics` after creating it.
+
+-- Stall booked by a StallBookingMaster row (NULL for bookings taken
+-- before stalls were assigned). Used by /getStallAvailability.
+IF COL_LENGTH('dbo.StallBookingMaster', 'StallMasterId') IS NULL
+    ALTER TABLE dbo.StallBookingMaster ADD StallMasterId INT NULL;
+GO
+
+-- A stall can only be booked once
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'UX_StallBookingMaster_StallMasterId' AND object_id = OBJECT_ID('dbo.StallBookingMaster')
+)
+CREATE UNIQUE NONCLUSTERED INDEX UX_StallBookingMaster_StallMasterId
+    ON dbo.StallBookingMaster (StallMasterId)
+    WHERE StallMasterId IS NOT NULL;
+GO
+
+-- Classification the order was placed for (NULL on orders taken before
+-- this column existed; analytics match those on unit price)
+IF COL_LENGTH('dbo.TicketIssue', 'TicketClassificationId') IS NULL
+    ALTER TABLE dbo.TicketIssue ADD TicketClassificationId INT NULL;
+GO
+
+-- Pre-aggregated paid sales per event, hour and classification
+-- (0 = unknown). Maintained by ticket issuance; rebuilt by
+-- `python -m services.sales_analytics`.
+IF OBJECT_ID('dbo.TicketSalesHourly', 'U') IS NULL
+CREATE TABLE dbo.TicketSalesHourly
+(
+    TicketMasterId INT NOT NULL,
+    BucketHour DATETIME NOT NULL,
+    TicketClassificationId INT NOT NULL,
+    Orders INT NOT NULL,
+    Tickets INT NOT NULL,
+    Revenue DECIMAL(18, 2) NOT NULL,
+    CONSTRAINT PK_TicketSalesHourly
+        PRIMARY KEY CLUSTERED (TicketMasterId, BucketHour, TicketClassificationId)
+);
+GO
@@ -0,0 +1,44 @@
+import os
+import pytest
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+class FakeGateway:
+    """
+    In-memory Razorpay: payments are served in skip/count pages like
+    GET /payments, orders by id like GET /orders/{id}.
+    """
+
+    def __init__(self):
+        self.payments = []
+        self.orders = {}
+        self.page_calls = []
+        self.order_calls = []
+
+    async def fetch(self, from_ts: int, to_ts: int, skip: int, count: int) -> list:
+        self.page_calls.append((skip, count))
+        return self.payments[skip:skip + count]
+
+    async def fetch_order(self, order_id: str) -> dict:
+        self.order_calls.append(order_id)
+        if order_id not in self.orders:
+            raise KeyError(order_id)
+        return self.orders[order_id]
+
+
+@pytest.fixture
+def fake_gateway():
+    return FakeGateway()
+
+
+@pytest.fixture
+def webhook_body():
+    """
+    Raw bytes of a recorded Razorpay webhook in fixtures/razorpay/.
+    """
+    def load(name: str) -> bytes:
+        with open(os.path.join(FIXTURES_DIR, "razorpay", f"{name}.json"), "rb") as f:
+            return f.read()
+
+    return load
@@ -0,0 +1,104 @@
+import os
+
+import pytest
+
+from services.enquiry_buffer import EnquiryBuffer, _read_segment
+
+
+class FakeTicketEnquiry:
+    """
+    Injected insert/reachable pair: rows with a "bad" marker are rejected,
+    and nothing goes through while the database is down.
+    """
+
+    def __init__(self):
+        self.rows = []
+        self.calls = 0
+        self.down = False
+        self.down_after = None
+
+    def insert(self, records: list):
+        self.calls += 1
+        if self.down_after is not None and len(self.rows) >= self.down_after:
+            self.down = True
+        if self.down:
+            raise ConnectionError("login timeout expired")
+        if any(r.get("bad") for r in records):
+            raise ValueError("String or binary data would be truncated")
+        self.rows += records
+
+    def reachable(self) -> bool:
+        return not self.down
+
+
+@pytest.fixture
+def db():
+    return FakeTicketEnquiry()
+
+
+@pytest.fixture
+def buffer(tmp_path, db):
+    return EnquiryBuffer(spill_dir=str(tmp_path), batch_size=100, insert=db.insert, reachable=db.reachable)
+
+
+def _files(buffer, prefix: str) -> list:
+    return sorted(name for name in os.listdir(buffer.spill_dir) if name.startswith(prefix))
+
+
+def _add(buffer, *ids, bad=()):
+    for i in ids:
+        buffer.add({"id": i, "bad": i in bad})
+
+
+def test_flush_inserts_and_removes_segment(buffer, db):
+    _add(buffer, 1, 2, 3)
+
+    assert buffer.flush() == 3
+    assert [r["id"] for r in db.rows] == [1, 2, 3]
+    assert db.calls == 1
+    assert _files(buffer, "enquiries-") == []
+    assert buffer.pending() == 0
+
+
+def test_rejected_row_is_dead_lettered(buffer, db):
+    _add(buffer, 1, 2, 3, bad={2})
+
+    assert buffer.flush() == 2
+    assert [r["id"] for r in db.rows] == [1, 3]
+
+    dead = _files(buffer, "dead-")
+    assert len(dead) == 1
+    assert [r["id"] for r in _read_segment(os.path.join(buffer.spill_dir, dead[0]))] == [2]
+    assert _files(buffer, "enquiries-") == []
+    assert buffer.pending() == 0
+
+
+def test_unreachable_database_skips_per_row_retry(buffer, db):
+    _add(buffer, *range(50))
+    db.down = True
+
+    assert buffer.flush() == 0
+    # One batch attempt, no connect per row
+    assert db.calls == 1
+    assert _files(buffer, "dead-") == []
+    assert buffer.pending() == 50
+
+    db.down = False
+    assert buffer.flush() == 50
+    assert buffer.pending() == 0
+
+
+def test_database_lost_during_per_row_retry(buffer, db):
+    _add(buffer, 1, 2, 3, 4, 5, bad={2})
+    # Batch fails on row 2, then rows 1 and 3 go in and the database drops
+    db.down_after = 2
+
+    assert buffer.flush() == 2
+    assert [r["id"] for r in db.rows] == [1, 3]
+    assert _files(buffer, "dead-") == []
+
+    segment = _files(buffer, "enquiries-")
+    assert len(segment) == 1
+    kept = _read_segment(os.path.join(buffer.spill_dir, segment[0]))
+    assert [r["id"] for r in kept] == [2, 4, 5]
+    assert buffer.pending() == 3
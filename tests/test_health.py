@@ -0,0 +1,62 @@
+from core import database
+from services import health
+
+
+class FakeConnection:
+    def __init__(self):
+        self.timeout = 0
+        self.executed = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql):
+        self.executed.append(sql)
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+def test_database_check_bounds_login_and_query(monkeypatch):
+    connects = []
+    conn = FakeConnection()
+
+    def connect(connection_string, **kwargs):
+        connects.append(kwargs)
+        return conn
+
+    monkeypatch.setattr(database.pyodbc, "connect", connect)
+    monkeypatch.setattr(health, "HEALTH_CHECK_TIMEOUT", 2.5)
+
+    health.check_database()
+
+    assert connects == [{"timeout": 2}]
+    assert conn.timeout == 2
+    assert conn.executed == ["SELECT 1"]
+
+
+def test_unreachable_database_is_down(monkeypatch):
+    def connect(connection_string, **kwargs):
+        raise ConnectionError("Login timeout expired")
+
+    monkeypatch.setattr(database.pyodbc, "connect", connect)
+
+    result = health._timed_check(health.check_database)
+    assert result["status"] == "DOWN"
+    assert result["error"] == "Login timeout expired"
+
+
+def test_other_connections_keep_the_driver_default(monkeypatch):
+    connects = []
+
+    def connect(connection_string, **kwargs):
+        connects.append(kwargs)
+        return FakeConnection()
+
+    monkeypatch.setattr(database.pyodbc, "connect", connect)
+
+    database.get_connection().close()
+    assert connects == [{}]
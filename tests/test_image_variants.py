@@ -0,0 +1,38 @@
+import os
+
+import pytest
+from PIL import Image
+
+from services import image_variants
+
+
+@pytest.fixture
+def image_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_variants, "IMAGE_BASE_PATH", str(tmp_path))
+    os.makedirs(tmp_path / "7")
+    return tmp_path
+
+
+def _upload(image_dir, name: str, color: str):
+    Image.new("RGB", (640, 320), color).save(image_dir / "7" / name)
+
+
+def test_same_stem_uploads_get_separate_variants(image_dir):
+    _upload(image_dir, "a.png", "red")
+    _upload(image_dir, "a.jpg", "blue")
+
+    png = image_variants.generate_image_variants(7, "a.png")
+    jpg = image_variants.generate_image_variants(7, "a.jpg")
+
+    assert len(png) == len(jpg) == len(image_variants._wanted_variants(7, "a.png"))
+    assert not {path for _, _, path in png} & {path for _, _, path in jpg}
+
+    smallest = {ext: path for width, ext, path in png if width == image_variants.VARIANT_WIDTHS[0]}
+    with Image.open(smallest["jpg"]) as img:
+        assert img.convert("RGB").getpixel((0, 0))[0] > 200
+
+
+def test_variant_names():
+    assert image_variants._variant_name("a.png", 320, "webp") == "a_png_320w.webp"
+    assert image_variants._variant_name("a.jpg", 320, "webp") == "a_jpg_320w.webp"
+    assert image_variants._variant_name("banner", 640, "jpg") == "banner_640w.jpg"
@@ -0,0 +1,213 @@
+import time
+import threading
+
+import pytest
+
+from services.inventory import InventoryManager, SoldOutError
+
+
+class FakeTicketIssue:
+    """
+    Loader over an in-memory sold count per event, like _load_counts.
+    """
+
+    def __init__(self, max_limits: dict):
+        self.max_limits = max_limits
+        self.sold = {tm_id: 0 for tm_id in max_limits}
+        self.before_read = None
+
+    def load(self, ticket_master_ids=None) -> dict:
+        if self.before_read:
+            self.before_read()
+        ids = ticket_master_ids or list(self.max_limits)
+        return {tm_id: (self.max_limits[tm_id], self.sold[tm_id]) for tm_id in ids if tm_id in self.max_limits}
+
+
+@pytest.fixture
+def db():
+    return FakeTicketIssue({1: 10, 2: None})
+
+
+@pytest.fixture
+def inventory(db):
+    return InventoryManager(hold_seconds=60, loader=db.load)
+
+
+def _sell(inventory, db, ticket_issue_id: int, ticket_master_id: int, count: int):
+    # What ticket_issuance does once the claim and details are written
+    with inventory.sale():
+        db.sold[ticket_master_id] += count
+        inventory.confirm(ticket_issue_id, ticket_master_id, count)
+
+
+def test_reserve_bind_confirm(inventory, db):
+    hold_id = inventory.reserve(1, 5, 4)
+    inventory.bind(hold_id, 100)
+
+    assert inventory.snapshot(1)[1] == {
+        "maxLimit": 10, "sold": 0, "held": 4, "available": 6, "heldByClassification": {5: 4}
+    }
+
+    _sell(inventory, db, 100, 1, 4)
+
+    counts = inventory.snapshot(1)[1]
+    assert (counts["sold"], counts["held"], counts["available"]) == (4, 0, 6)
+    assert inventory.active_holds() == 0
+
+
+def test_sold_out(inventory):
+    inventory.reserve(1, 5, 8)
+
+    with pytest.raises(SoldOutError) as e:
+        inventory.reserve(1, 5, 3)
+    assert e.value.available == 2
+    assert str(e.value) == "Only 2 tickets left"
+
+    inventory.reserve(1, 5, 2)
+    with pytest.raises(SoldOutError, match="Tickets sold out"):
+        inventory.reserve(1, 5, 1)
+
+
+def test_unlimited_event(inventory):
+    for _ in range(100):
+        inventory.reserve(2, 1, 10)
+    assert inventory.snapshot(2)[2]["available"] is None
+
+
+def test_release_by_hold_and_by_ticket_issue(inventory):
+    first = inventory.reserve(1, 5, 3)
+    second = inventory.reserve(1, 5, 3)
+    inventory.bind(second, 200)
+
+    inventory.release(first)
+    inventory.release(ticket_issue_id=200)
+    inventory.release("unknown")
+
+    assert inventory.snapshot(1)[1]["available"] == 10
+    assert inventory.active_holds() == 0
+
+
+def test_release_expired(inventory, monkeypatch):
+    inventory.reserve(1, 5, 3)
+    inventory.hold_seconds = 0
+    inventory.reserve(1, 5, 2)
+
+    assert inventory.release_expired() == 1
+    assert inventory.snapshot(1)[1]["held"] == 3
+
+
+def test_confirm_after_hold_expired_still_counts(inventory, db):
+    inventory.hold_seconds = 0
+    hold_id = inventory.reserve(1, 5, 3)
+    inventory.bind(hold_id, 300)
+    inventory.release_expired()
+
+    _sell(inventory, db, 300, 1, 3)
+
+    assert inventory.snapshot(1)[1]["sold"] == 3
+    assert inventory.snapshot(1)[1]["held"] == 0
+
+
+def test_no_oversell_under_concurrency(inventory):
+    barrier = threading.Barrier(20)
+    held = []
+    sold_out = []
+
+    def checkout():
+        barrier.wait()
+        try:
+            held.append(inventory.reserve(1, 5, 1))
+        except SoldOutError:
+            sold_out.append(1)
+
+    threads = [threading.Thread(target=checkout) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(held) == 10
+    assert len(sold_out) == 10
+    assert inventory.snapshot(1)[1]["available"] == 0
+
+
+def test_reconcile_resets_sold_counts(inventory, db):
+    inventory.reserve(1, 5, 1)
+    db.sold[1] = 6
+    db.max_limits[1] = 12
+
+    inventory.reconcile()
+
+    assert inventory.snapshot(1)[1] == {
+        "maxLimit": 12, "sold": 6, "held": 1, "available": 5, "heldByClassification": {5: 1}
+    }
+
+
+def test_sale_during_reconcile_is_counted_once(inventory, db):
+    inventory.reserve(1, 5, 1)
+
+    query_started = threading.Event()
+    finish_query = threading.Event()
+
+    def slow_read():
+        query_started.set()
+        finish_query.wait(5)
+
+    db.before_read = slow_read
+    reconciler = threading.Thread(target=inventory.reconcile)
+    reconciler.start()
+    assert query_started.wait(5)
+
+    # Issuance committing while the query runs waits for reconcile
+    seller = threading.Thread(target=_sell, args=(inventory, db, 400, 1, 2))
+    seller.start()
+    time.sleep(0.05)
+    assert db.sold[1] == 0
+
+    finish_query.set()
+    reconciler.join(5)
+    seller.join(5)
+
+    assert db.sold[1] == 2
+    assert inventory.snapshot(1)[1]["sold"] == 2
+
+
+def test_reconcile_waits_for_sales_in_flight(inventory, db):
+    inventory.reserve(1, 5, 1)
+    committed = threading.Event()
+    finish_sale = threading.Event()
+
+    def sell():
+        with inventory.sale():
+            db.sold[1] += 2
+            committed.set()
+            finish_sale.wait(5)
+            inventory.confirm(500, 1, 2)
+
+    seller = threading.Thread(target=sell)
+    seller.start()
+    assert committed.wait(5)
+
+    reconciler = threading.Thread(target=inventory.reconcile)
+    reconciler.start()
+    time.sleep(0.05)
+    finish_sale.set()
+    seller.join(5)
+    reconciler.join(5)
+
+    assert inventory.snapshot(1)[1]["sold"] == 2
+
+
+def test_failed_reconcile_lets_sales_through(inventory, db):
+    inventory.reserve(1, 5, 1)
+
+    def broken_read():
+        raise RuntimeError("database unavailable")
+
+    db.before_read = broken_read
+    with pytest.raises(RuntimeError):
+        inventory.reconcile()
+
+    db.before_read = None
+    _sell(inventory, db, 600, 1, 1)
+    assert inventory.snapshot(1)[1]["sold"] == 1
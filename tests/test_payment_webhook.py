@@ -0,0 +1,215 @@
+import hmac
+import asyncio
+import json
+import hashlib
+
+import pytest
+
+from services import payment_webhook
+from services.payment_webhook import (
+    DONE,
+    FAILED,
+    NEEDS_REVIEW,
+    PENDING,
+    UNMATCHED,
+    enqueue_webhook_event,
+    parse_payment_event,
+    pending_event_count,
+    process_pending_events,
+    verify_webhook_signature
+)
+from services.ticket_issuance import IssuanceResult
+
+SECRET = "whsec_test"
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / "webhooks.db")
+
+
+def _sign(body: bytes) -> str:
+    return hmac.new(SECRET.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+def _events(path: str) -> dict:
+    conn = payment_webhook._connect(path)
+    try:
+        return {row["event_id"]: dict(row) for row in conn.execute("SELECT * FROM webhook_events")}
+    finally:
+        conn.close()
+
+
+def _issuer(response: dict, notification=None, calls=None):
+    def issue(ticket_issue_id, payment_id):
+        if calls is not None:
+            calls.append((ticket_issue_id, payment_id))
+        return IssuanceResult(response, notification), True
+
+    return issue
+
+
+def test_signature_is_checked_on_the_raw_body(webhook_body):
+    body = webhook_body("payment_captured")
+
+    assert verify_webhook_signature(body, _sign(body), SECRET)
+    assert not verify_webhook_signature(body.replace(b"50000", b"5"), _sign(body), SECRET)
+    assert not verify_webhook_signature(body, None, SECRET)
+    assert not verify_webhook_signature(body, "é" * 64, SECRET)
+    assert not verify_webhook_signature(body, _sign(body), "")
+
+
+def test_parse_recorded_payloads(webhook_body):
+    captured = parse_payment_event(json.loads(webhook_body("payment_captured")))
+    assert captured == {
+        "event": "payment.captured",
+        "payment_id": "pay_NfWb6yqHb8cT1A",
+        "ticket_issue_id": 1042
+    }
+
+    # Payment notes are empty; the order receipt carries the TicketIssueId
+    paid = parse_payment_event(json.loads(webhook_body("order_paid")))
+    assert paid["payment_id"] == "pay_NfXk2sLq0VbT7m"
+    assert paid["ticket_issue_id"] == 1043
+
+    assert parse_payment_event(json.loads(webhook_body("payment_failed"))) is None
+
+
+def test_enqueue_deduplicates_redeliveries(webhook_body, queue_path):
+    payload = json.loads(webhook_body("payment_captured"))
+
+    assert enqueue_webhook_event("evt_1", payload, queue_path)
+    assert not enqueue_webhook_event("evt_1", payload, queue_path)
+    assert not enqueue_webhook_event("evt_2", json.loads(webhook_body("payment_failed")), queue_path)
+
+    events = _events(queue_path)
+    assert list(events) == ["evt_1"]
+    assert events["evt_1"]["status"] == PENDING
+    assert events["evt_1"]["ticket_issue_id"] == 1042
+
+
+def test_enqueue_without_ticket_issue_id_is_unmatched(webhook_body, queue_path):
+    payload = json.loads(webhook_body("payment_captured"))
+    payload["payload"]["payment"]["entity"]["notes"] = []
+
+    assert enqueue_webhook_event("evt_1", payload, queue_path)
+    assert _events(queue_path)["evt_1"]["status"] == UNMATCHED
+
+
+def test_issued_event_is_done_and_notified(webhook_body, queue_path):
+    enqueue_webhook_event("evt_1", json.loads(webhook_body("payment_captured")), queue_path)
+
+    calls = []
+    notified = []
+    stats = process_pending_events(
+        path=queue_path,
+        issue=_issuer({"status": 1, "message": "issued"}, ("mail", "args"), calls),
+        notify=lambda *args: notified.append(args)
+    )
+
+    assert stats == {"processed": 1, "needs_review": 0, "failed": 0}
+    assert calls == [(1042, "pay_NfWb6yqHb8cT1A")]
+    assert notified == [("mail", "args")]
+    assert _events(queue_path)["evt_1"]["status"] == DONE
+    assert pending_event_count() == 0
+
+
+def test_status_zero_needs_review(webhook_body, queue_path):
+    enqueue_webhook_event("evt_1", json.loads(webhook_body("order_paid")), queue_path)
+
+    stats = process_pending_events(
+        path=queue_path,
+        issue=_issuer({"status": 0, "message": "Payment already processed"}),
+        notify=lambda *args: pytest.fail("nothing was issued")
+    )
+
+    event = _events(queue_path)["evt_1"]
+    assert stats == {"processed": 0, "needs_review": 1, "failed": 0}
+    assert event["status"] == NEEDS_REVIEW
+    assert event["last_error"] == "Payment already processed"
+
+
+def test_errors_retry_until_max_attempts(webhook_body, queue_path, monkeypatch):
+    monkeypatch.setattr(payment_webhook, "WEBHOOK_MAX_ATTEMPTS", 2)
+    enqueue_webhook_event("evt_1", json.loads(webhook_body("payment_captured")), queue_path)
+
+    def issue(ticket_issue_id, payment_id):
+        raise RuntimeError("database unavailable")
+
+    process_pending_events(path=queue_path, issue=issue)
+    event = _events(queue_path)["evt_1"]
+    assert (event["status"], event["attempts"]) == (PENDING, 1)
+    assert pending_event_count() == 1
+
+    process_pending_events(path=queue_path, issue=issue)
+    event = _events(queue_path)["evt_1"]
+    assert (event["status"], event["attempts"]) == (FAILED, 2)
+    assert event["last_error"] == "database unavailable"
+    assert pending_event_count() == 0
+
+
+def test_non_object_payloads_are_ignored():
+    assert parse_payment_event([]) is None
+    assert parse_payment_event("payment.captured") is None
+    assert parse_payment_event({"event": "payment.captured", "payload": []}) is None
+    assert parse_payment_event({"event": "payment.captured", "payload": {"payment": []}}) is None
+
+
+def _unmatched_payload(webhook_body, order_id="order_NfWb5s9kVxHcQ2"):
+    payload = json.loads(webhook_body("payment_captured"))
+    entity = payload["payload"]["payment"]["entity"]
+    entity["notes"] = []
+    entity["order_id"] = order_id
+    return payload
+
+
+def test_unmatched_event_is_resolved_through_its_order(webhook_body, queue_path, fake_gateway):
+    fake_gateway.orders["order_NfWb5s9kVxHcQ2"] = {"id": "order_NfWb5s9kVxHcQ2", "receipt": "TICKET_1042"}
+    enqueue_webhook_event("evt_1", _unmatched_payload(webhook_body), queue_path)
+
+    calls = []
+    stats = process_pending_events(
+        path=queue_path,
+        issue=_issuer({"status": 1, "message": "issued"}, calls=calls),
+        fetch_order=lambda order_id: asyncio.run(fake_gateway.fetch_order(order_id))
+    )
+
+    event = _events(queue_path)["evt_1"]
+    assert stats["processed"] == 1
+    assert calls == [(1042, "pay_NfWb6yqHb8cT1A")]
+    assert (event["status"], event["ticket_issue_id"]) == (DONE, 1042)
+
+
+def test_unmatched_event_without_ticket_order_stays_unmatched(webhook_body, queue_path, fake_gateway):
+    fake_gateway.orders["order_plain"] = {"id": "order_plain", "receipt": "rcpt_1"}
+    enqueue_webhook_event("evt_1", _unmatched_payload(webhook_body, "order_plain"), queue_path)
+
+    def fetch_order(order_id):
+        return asyncio.run(fake_gateway.fetch_order(order_id))
+
+    process_pending_events(path=queue_path, issue=_issuer({"status": 1}), fetch_order=fetch_order)
+    process_pending_events(path=queue_path, issue=_issuer({"status": 1}), fetch_order=fetch_order)
+
+    event = _events(queue_path)["evt_1"]
+    assert event["status"] == UNMATCHED
+    assert event["last_error"] == "order order_plain has no TicketIssueId"
+    # Given up after the first lookup
+    assert fake_gateway.order_calls == ["order_plain"]
+
+
+def test_order_lookup_errors_are_retried(webhook_body, queue_path, monkeypatch):
+    monkeypatch.setattr(payment_webhook, "WEBHOOK_MAX_ATTEMPTS", 2)
+    enqueue_webhook_event("evt_1", _unmatched_payload(webhook_body), queue_path)
+
+    lookups = []
+
+    def fetch_order(order_id):
+        lookups.append(order_id)
+        raise RuntimeError("Razorpay request timed out")
+
+    for _ in range(3):
+        process_pending_events(path=queue_path, issue=_issuer({"status": 1}), fetch_order=fetch_order)
+
+    event = _events(queue_path)["evt_1"]
+    assert (event["status"], event["attempts"]) == (UNMATCHED, 2)
+    assert len(lookups) == 2
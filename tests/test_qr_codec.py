@@ -0,0 +1,224 @@
+import base64
+import dataclasses
+
+import pytest
+
+from utils import qr_codec
+from utils.qr_codec import (
+    QR_VERSION_ED25519,
+    QR_VERSION_HMAC,
+    QRPayload,
+    base45_decode,
+    base45_encode,
+    decode_qr_payload,
+    decode_varint,
+    encode_qr_payload,
+    encode_varint
+)
+from utils.utils import (
+    ENCRYPTION_KEY,
+    QR_STATUS_MALFORMED,
+    QR_STATUS_OK,
+    QR_STATUS_TAMPERED,
+    decode_qr_batch,
+    decode_ticket_qr
+)
+
+ISSUED_AT = 1760000000
+# Any 32-byte seed; the real one comes from QR_SIGNING_KEY
+SIGNING_SEED = base64.b64encode(bytes(range(32))).decode("ascii")
+
+
+def _clear_key_caches():
+    for cached in (qr_codec._mac_key, qr_codec._signing_key, qr_codec._verify_key):
+        cached.cache_clear()
+
+
+@pytest.fixture
+def qr_settings(monkeypatch):
+    """
+    Swaps QR settings for one test: qr_settings(qr_signing_key=..., ...).
+    """
+    def apply(**overrides):
+        monkeypatch.setattr(qr_codec, "settings", dataclasses.replace(qr_codec.settings, **overrides))
+        _clear_key_caches()
+
+    yield apply
+    _clear_key_caches()
+
+
+@pytest.fixture
+def signing_key(qr_settings):
+    qr_settings(qr_signing_key=SIGNING_SEED)
+
+
+def _legacy(ticket_issue_id: int, details_id: int, ts: int = ISSUED_AT) -> str:
+    """
+    AES-ECB payload of tickets issued before the compact codec.
+    """
+    from Crypto.Cipher import AES
+
+    plain = f"{ticket_issue_id}|{details_id}|{ts}".encode("utf-8")
+    plain += b" " * (-len(plain) % 16)
+    return base64.b64encode(AES.new(ENCRYPTION_KEY, AES.MODE_ECB).encrypt(plain)).decode("ascii")
+
+
+def _flip_last_char(code: str) -> str:
+    alphabet = qr_codec.BASE45_ALPHABET
+    return code[:-1] + alphabet[(alphabet.index(code[-1]) + 1) % len(alphabet)]
+
+
+# --------------------------------
+# Primitives
+# --------------------------------
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 300, 2 ** 31, 2 ** 63 - 1])
+def test_varint_round_trip(value):
+    data = encode_varint(value) + b"\xff"
+    assert decode_varint(data, 0) == (value, len(data) - 1)
+
+
+def test_varint_rejects_truncated_and_negative():
+    with pytest.raises(ValueError):
+        decode_varint(b"\x80\x80", 0)
+    with pytest.raises(ValueError):
+        encode_varint(-1)
+
+
+@pytest.mark.parametrize("data", [b"", b"\x00", b"ab", b"abc", bytes(range(256))])
+def test_base45_round_trip(data):
+    text = base45_encode(data)
+    assert qr_codec.is_compact_payload(text) or not data
+    assert base45_decode(text) == data
+
+
+@pytest.mark.parametrize("text", ["a", "A", "ABCD", "GGW", ":::"])
+def test_base45_rejects_invalid(text):
+    with pytest.raises(ValueError):
+        base45_decode(text)
+
+
+# --------------------------------
+# Codec
+# --------------------------------
+def test_v1_hmac_round_trip():
+    code = encode_qr_payload(1042, 7, issued_at=ISSUED_AT, version=QR_VERSION_HMAC)
+
+    assert qr_codec.is_compact_payload(code)
+    assert decode_qr_payload(code) == QRPayload(QR_VERSION_HMAC, 1042, 7, ISSUED_AT)
+    assert decode_ticket_qr(code) == QRPayload(QR_VERSION_HMAC, 1042, 7, ISSUED_AT)
+
+
+def test_v2_ed25519_round_trip(signing_key):
+    code = encode_qr_payload(1042, 7, issued_at=ISSUED_AT)
+
+    assert qr_codec.default_version() == QR_VERSION_ED25519
+    assert decode_qr_payload(code) == QRPayload(QR_VERSION_ED25519, 1042, 7, ISSUED_AT)
+    assert len(qr_codec.public_key_bytes()) == 32
+
+
+def test_v2_verifies_offline_with_public_key(signing_key):
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+
+    data = base45_decode(encode_qr_payload(1042, 7, issued_at=ISSUED_AT))
+    body_size = qr_codec.parse_qr_bytes(data)[-1]
+
+    # What a scanner does with GET /qr/publicKey
+    Ed25519PublicKey.from_public_bytes(qr_codec.public_key_bytes()).verify(data[body_size:], data[:body_size])
+
+
+def test_v2_requires_signing_key(qr_settings):
+    qr_settings(qr_signing_key=None)
+    with pytest.raises(RuntimeError):
+        encode_qr_payload(1, 2, version=QR_VERSION_ED25519)
+
+
+@pytest.mark.parametrize("version", [QR_VERSION_HMAC, QR_VERSION_ED25519])
+def test_tampered_payload_is_rejected(signing_key, version):
+    code = encode_qr_payload(1042, 7, issued_at=ISSUED_AT, version=version)
+    data = bytearray(base45_decode(code))
+    # Same length, different details_id
+    data[3] ^= 0x01
+    forged = base45_encode(bytes(data))
+
+    with pytest.raises(ValueError, match="tampered"):
+        decode_qr_payload(forged)
+    assert decode_qr_payload(forged, verify=False).details_id == 6
+
+
+def test_hmac_key_change_invalidates_v1(qr_settings):
+    code = encode_qr_payload(1042, 7, version=QR_VERSION_HMAC)
+    qr_settings(qr_hmac_key=b"another-key")
+
+    with pytest.raises(ValueError):
+        decode_qr_payload(code)
+
+
+@pytest.mark.parametrize("code", ["", "1", "ZZZZ", base45_encode(b"\x09\x01\x02\x03" + bytes(8))])
+def test_malformed_payloads_are_rejected(code):
+    with pytest.raises(ValueError):
+        decode_qr_payload(code)
+
+
+def test_legacy_aes_fallback():
+    assert decode_ticket_qr(_legacy(1042, 7)) == QRPayload(0, 1042, 7, ISSUED_AT)
+    assert decode_ticket_qr(_legacy(1042, 7) + "\r\n") == QRPayload(0, 1042, 7, ISSUED_AT)
+
+    with pytest.raises(ValueError):
+        decode_ticket_qr(base64.b64encode(b"not sixteen").decode("ascii"))
+
+
+# --------------------------------
+# Batch decode
+# --------------------------------
+def test_batch_matches_single_decode(signing_key):
+    v1 = encode_qr_payload(1042, 7, issued_at=ISSUED_AT, version=QR_VERSION_HMAC)
+    v2 = encode_qr_payload(1043, 8, issued_at=ISSUED_AT, version=QR_VERSION_ED25519)
+    codes = [
+        v1,
+        v2,
+        _legacy(1044, 9),
+        _flip_last_char(v1),
+        _flip_last_char(v2),
+        "ZZZZ",
+        "not base64!",
+        "",
+        None,
+        base64.b64encode(b"x" * 16).decode("ascii"),
+        v1 + "\n",
+        _legacy(1045, 10, ts=ISSUED_AT + 1),
+    ]
+
+    batch = decode_qr_batch(codes)
+    assert len(batch) == len(codes)
+
+    for code, (ticket_issue_id, details_id, issued_at, status) in zip(codes, batch.rows()):
+        try:
+            single = decode_ticket_qr(code or "")
+        except ValueError:
+            assert status != QR_STATUS_OK, code
+            assert (ticket_issue_id, details_id, issued_at) == (0, 0, 0)
+            continue
+
+        assert status == QR_STATUS_OK, code
+        assert (ticket_issue_id, details_id, issued_at) == (
+            single.ticket_issue_id, single.details_id, single.issued_at
+        )
+
+
+def test_batch_statuses(signing_key):
+    v1 = encode_qr_payload(1042, 7, issued_at=ISSUED_AT, version=QR_VERSION_HMAC)
+
+    batch = decode_qr_batch([v1, _flip_last_char(v1), "ZZZZ", _legacy(1044, 9)])
+
+    assert list(batch.status) == [QR_STATUS_OK, QR_STATUS_TAMPERED, QR_STATUS_MALFORMED, QR_STATUS_OK]
+    assert list(batch.ticket_issue_id) == [1042, 0, 0, 1044]
+
+
+def test_batch_v2_without_verify_key_is_tampered(qr_settings):
+    qr_settings(qr_signing_key=SIGNING_SEED)
+    v2 = encode_qr_payload(1043, 8, issued_at=ISSUED_AT)
+    qr_settings(qr_signing_key=None)
+
+    assert list(decode_qr_batch([v2]).status) == [QR_STATUS_TAMPERED]
+    with pytest.raises(ValueError):
+        decode_ticket_qr(v2)
@@ -0,0 +1,160 @@
+import asyncio
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from services import reconciliation
+from services.razorpay_gateway import to_paise
+from services.ticket_issuance import IssuanceResult
+
+
+class FakeCursor:
+    """
+    Just enough of a pyodbc cursor for the #CapturedPayments gap query.
+    """
+
+    def __init__(self, ticket_issues: dict):
+        self.ticket_issues = ticket_issues
+        self.captured = {}
+        self.rows = []
+        self.fast_executemany = False
+
+    def execute(self, query: str, *params):
+        if "FROM #CapturedPayments" in query:
+            self.rows = [
+                SimpleNamespace(
+                    PaymentId=payment_id,
+                    TicketIssueId=ticket_issue_id,
+                    AmountPaise=amount_paise,
+                    TotalAmount=self.ticket_issues[ticket_issue_id]["TotalAmount"]
+                )
+                for payment_id, (ticket_issue_id, amount_paise) in self.captured.items()
+                if ticket_issue_id in self.ticket_issues
+                and not self.ticket_issues[ticket_issue_id]["TransactionId"]
+            ]
+
+    def executemany(self, query: str, rows: list):
+        for payment_id, ticket_issue_id, amount_paise in rows:
+            self.captured[payment_id] = (ticket_issue_id, amount_paise)
+
+    def fetchall(self) -> list:
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, ticket_issues: dict):
+        self.ticket_issues = ticket_issues
+
+    def cursor(self):
+        return FakeCursor(self.ticket_issues)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def ticket_issues(monkeypatch):
+    issues = {
+        # 1.15 * 100 truncates to 114 as a float
+        1: {"TotalAmount": Decimal("1.15"), "TransactionId": ""},
+        2: {"TotalAmount": Decimal("500.00"), "TransactionId": None},
+        3: {"TotalAmount": Decimal("250.00"), "TransactionId": ""},
+        4: {"TotalAmount": Decimal("100.00"), "TransactionId": "pay_done"},
+    }
+    monkeypatch.setattr(reconciliation, "get_connection", lambda: FakeConnection(issues))
+    return issues
+
+
+def _payment(payment_id: str, amount: int, status: str = "captured", **fields) -> dict:
+    return {"id": payment_id, "amount": amount, "status": status, **fields}
+
+
+def _reconcile(fake_gateway, issued: list, dry_run: bool = False) -> dict:
+    def issue(ticket_issue_id, payment_id):
+        issued.append((ticket_issue_id, payment_id))
+        return IssuanceResult({"status": 1, "message": "ok"}), True
+
+    return asyncio.run(reconciliation.reconcile_payments(
+        0, 1,
+        dry_run=dry_run,
+        fetch=fake_gateway.fetch,
+        fetch_order=fake_gateway.fetch_order,
+        issue=issue,
+        notify=lambda *args: None
+    ))
+
+
+def test_to_paise_rounds_half_up():
+    assert to_paise(1.15) == 115
+    assert to_paise(Decimal("1.15")) == 115
+    assert to_paise(Decimal("999.995")) == 100000
+    assert to_paise(250) == 25000
+
+
+def test_reconcile_matched_unmatched_and_mismatch(fake_gateway, ticket_issues):
+    fake_gateway.payments = [
+        _payment("pay_a", 115, notes={"ticket_issue_id": "1"}),
+        _payment("pay_b", 40000, notes={"ticket_issue_id": "2"}),
+        _payment("pay_c", 25000, order_id="order_3", notes=[]),
+        _payment("pay_d", 5000),
+        _payment("pay_e", 10000, status="failed", notes={"ticket_issue_id": "3"}),
+        _payment("pay_f", 10000, notes={"ticket_issue_id": "4"}),
+    ]
+    fake_gateway.orders["order_3"] = {"id": "order_3", "receipt": "TICKET_3"}
+
+    issued = []
+    report = _reconcile(fake_gateway, issued)
+
+    assert report["captured"] == 5
+    assert report["unmatched"] == ["pay_d"]
+    assert sorted(g["payment_id"] for g in report["gaps"]) == ["pay_a", "pay_c"]
+    assert report["amount_mismatches"] == [{
+        "payment_id": "pay_b",
+        "ticket_issue_id": 2,
+        "amount_paise": 40000,
+        "expected_paise": 50000
+    }]
+    assert sorted(issued) == [(1, "pay_a"), (3, "pay_c")]
+    assert report["issued"] == 2
+    assert report["failed"] == []
+    assert fake_gateway.order_calls == ["order_3"]
+
+
+def test_reconcile_dry_run_issues_nothing(fake_gateway, ticket_issues):
+    fake_gateway.payments = [_payment("pay_a", 115, notes={"ticket_issue_id": "1"})]
+
+    issued = []
+    report = _reconcile(fake_gateway, issued, dry_run=True)
+
+    assert [g["payment_id"] for g in report["gaps"]] == ["pay_a"]
+    assert issued == []
+    assert report["issued"] == 0
+
+
+def test_reconcile_unknown_order_is_unmatched(fake_gateway, ticket_issues):
+    fake_gateway.payments = [
+        _payment("pay_x", 100, order_id="order_missing"),
+        _payment("pay_y", 100, order_id="order_plain"),
+    ]
+    fake_gateway.orders["order_plain"] = {"id": "order_plain", "receipt": "rcpt_1"}
+
+    report = _reconcile(fake_gateway, [])
+
+    assert report["unmatched"] == ["pay_x", "pay_y"]
+    assert report["gaps"] == []
+
+
+def test_reconcile_pages_through_payments(fake_gateway, ticket_issues):
+    fake_gateway.payments = [
+        _payment(f"pay_{i}", 100, status="failed") for i in range(reconciliation.PAGE_SIZE)
+    ] + [_payment("pay_a", 115, notes={"ticket_issue_id": "1"})]
+
+    report = _reconcile(fake_gateway, [])
+
+    assert fake_gateway.page_calls == [(0, reconciliation.PAGE_SIZE), (reconciliation.PAGE_SIZE, reconciliation.PAGE_SIZE)]
+    assert report["captured"] == 1
+    assert report["issued"] == 1
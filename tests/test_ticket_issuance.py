@@ -0,0 +1,229 @@
+import time
+import threading
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from services import ticket_issuance
+from services.ticket_issuance import issue_tickets, issue_tickets_once
+
+
+class FakeDatabase:
+    """
+    TicketIssue rows plus the one property the claim relies on: the
+    conditional UPDATE is atomic, and rolled back with its transaction.
+    """
+
+    def __init__(self, ticket_issues: dict):
+        self.ticket_issues = ticket_issues
+        self.details = []
+        self.lock = threading.Lock()
+
+    def connect(self):
+        return FakeConnection(self)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.db = conn.db
+        self.row = None
+
+    def execute(self, query: str, *params):
+        if len(params) == 1 and isinstance(params[0], tuple):
+            params = params[0]
+        self.row = None
+
+        if "UPDATE TicketIssue" in query:
+            payment_id, ticket_issue_id = params
+            with self.db.lock:
+                issue = self.db.ticket_issues.get(ticket_issue_id)
+                if issue and not (issue["TransactionId"] or "").startswith("pay_"):
+                    self.conn.undo.append((issue, issue["TransactionId"]))
+                    issue["TransactionId"] = payment_id
+                    self.row = SimpleNamespace(
+                        TicketMasterId=7,
+                        MobileNo="9876543210",
+                        EmailId="guest@example.com",
+                        TicketCount=issue["TicketCount"],
+                        TotalAmount=issue["TicketCount"] * 250,
+                        Name="Guest",
+                        EntryDateTime=None,
+                        TicketClassificationId=3
+                    )
+
+        elif "SELECT TransactionId" in query:
+            issue = self.db.ticket_issues.get(params[0])
+            if issue:
+                self.row = SimpleNamespace(TransactionId=issue["TransactionId"])
+
+        elif "INSERT INTO TicketIssueDetails" in query:
+            with self.db.lock:
+                self.db.details.append(params[0])
+                self.row = (len(self.db.details),)
+
+    def fetchone(self):
+        return self.row
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+        self.undo = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.undo = []
+
+    def rollback(self):
+        with self.db.lock:
+            for issue, transaction_id in reversed(self.undo):
+                issue["TransactionId"] = transaction_id
+        self.undo = []
+
+    def close(self):
+        pass
+
+
+class FakeInventory:
+    def __init__(self):
+        self.confirmed = []
+
+    @contextmanager
+    def sale(self):
+        yield
+
+    def confirm(self, ticket_issue_id, ticket_master_id, ticket_count):
+        self.confirmed.append(ticket_issue_id)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = FakeDatabase({
+        1: {"TransactionId": "", "TicketCount": 2},
+        2: {"TransactionId": None, "TicketCount": 1},
+    })
+    monkeypatch.setattr(ticket_issuance, "get_connection", database.connect)
+    monkeypatch.setattr(ticket_issuance, "has_column", lambda table, column: True)
+    monkeypatch.setattr(ticket_issuance, "has_table", lambda table: False)
+    monkeypatch.setattr(ticket_issuance, "generate_qr_string", lambda tid, did: f"QR{tid}-{did}")
+    monkeypatch.setattr(ticket_issuance, "inventory", FakeInventory())
+    monkeypatch.setattr(ticket_issuance, "create_ticket_pdf", lambda **kw: f"ticket_{kw['details_id']}.pdf")
+    return database
+
+
+def _slow_pdf(monkeypatch, started: threading.Event, release: threading.Event):
+    def create_ticket_pdf(**kw):
+        started.set()
+        release.wait(5)
+        return f"ticket_{kw['details_id']}.pdf"
+
+    monkeypatch.setattr(ticket_issuance, "create_ticket_pdf", create_ticket_pdf)
+
+
+def _run_concurrently(*calls) -> tuple:
+    results = [None] * len(calls)
+
+    def run(i, fn, args):
+        results[i] = fn(*args)
+
+    threads = [threading.Thread(target=run, args=(i, fn, args)) for i, (fn, args) in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_concurrent_verify_and_webhook_issue_once(db, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    _slow_pdf(monkeypatch, started, release)
+
+    # /ticket/verifyPayment and the webhook worker for the same payment
+    threads, results = _run_concurrently(
+        (issue_tickets_once, (1, "pay_A")),
+        (issue_tickets_once, (1, "pay_A"))
+    )
+    assert started.wait(5)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert [r.response["status"] for r, _ in results] == [1, 1]
+    # The follower shares the leader's result; only the leader notifies
+    assert sorted(is_leader for _, is_leader in results) == [False, True]
+    assert results[0][0] is results[1][0]
+    assert db.details == [1, 1]
+    assert ticket_issuance.inventory.confirmed == [1]
+    assert ticket_issuance.payment_flight.in_flight() == 0
+
+
+def test_claim_is_exclusive_without_single_flight(db, monkeypatch):
+    # Two workers (other processes) each get past their own single-flight map
+    started, release = threading.Event(), threading.Event()
+    _slow_pdf(monkeypatch, started, release)
+
+    threads, results = _run_concurrently(
+        (issue_tickets, (1, "pay_A")),
+        (issue_tickets, (1, "pay_A"))
+    )
+    # The loser's claim matches no row, so it finishes while the winner renders
+    assert started.wait(5)
+    deadline = time.monotonic() + 5
+    while not any(results) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert any(results)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    issued = [r for r in results if r.notification]
+    assert len(issued) == 1
+    assert all(r.response["status"] == 1 for r in results)
+    assert db.details == [1, 1]
+
+
+def test_same_payment_retry_returns_status_1(db):
+    first = issue_tickets(1, "pay_A")
+    retry = issue_tickets(1, "pay_A")
+
+    assert first.response["status"] == 1
+    assert first.notification[-1] == ["ticket_1.pdf", "ticket_2.pdf"]
+    assert retry.response == {"status": 1, "message": "Payment already processed"}
+    assert retry.notification is None
+    assert db.details == [1, 1]
+
+
+def test_different_payment_is_rejected(db):
+    issue_tickets(2, "pay_A")
+    other = issue_tickets(2, "pay_B")
+
+    assert other.response == {"status": 0, "message": "Payment already processed"}
+    assert other.notification is None
+    assert db.ticket_issues[2]["TransactionId"] == "pay_A"
+    assert db.details == [2]
+
+
+def test_unknown_ticket_issue(db):
+    assert issue_tickets(99, "pay_A").response == {"status": 0, "message": "TicketIssue not found"}
+
+
+def test_failed_issuance_releases_the_claim(db, monkeypatch):
+    def broken_pdf(**kw):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(ticket_issuance, "create_ticket_pdf", broken_pdf)
+    with pytest.raises(OSError):
+        issue_tickets_once(2, "pay_A")
+
+    assert db.ticket_issues[2]["TransactionId"] is None
+    assert ticket_issuance.payment_flight.in_flight() == 0
+
+    monkeypatch.setattr(ticket_issuance, "create_ticket_pdf", lambda **kw: "ticket.pdf")
+    result, is_leader = issue_tickets_once(2, "pay_A")
+    assert is_leader and result.response["status"] == 1
@@ -0,0 +1,218 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from services import waiting_room as waiting_room_module
+from services.waiting_room import (
+    ADMISSION,
+    QUEUE,
+    AdmissionError,
+    WaitingRoom,
+    check_admission,
+    sign_token,
+    verify_token
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(waiting_room_module.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(waiting_room_module, "WAITING_ROOM_ENABLED", True)
+
+
+def _admission(ticket_master_id: int, ttl: int = 60) -> str:
+    return sign_token({"t": ADMISSION, "e": ticket_master_id, "exp": int(time.time()) + ttl})
+
+
+# --------------------------------
+# Tokens
+# --------------------------------
+def test_token_round_trip():
+    token = sign_token({"t": QUEUE, "e": 7, "s": 3, "exp": int(time.time()) + 60})
+    claims = verify_token(token, QUEUE)
+    assert (claims["e"], claims["s"]) == (7, 3)
+
+
+@pytest.mark.parametrize("token", [None, "", "no-dot", "e30.AAAA", "é.é"])
+def test_malformed_tokens_are_rejected(token):
+    with pytest.raises(AdmissionError):
+        verify_token(token, ADMISSION)
+
+
+def test_tampered_token_is_rejected():
+    body, sig = _admission(7).rsplit(".", 1)
+    forged = waiting_room_module._b64(b'{"t":"a","e":8,"exp":9999999999}')
+
+    with pytest.raises(AdmissionError, match="Invalid token"):
+        verify_token(f"{forged}.{sig}", ADMISSION)
+    with pytest.raises(AdmissionError, match="Invalid token"):
+        verify_token(f"{body}.{sig[:-2]}AA", ADMISSION)
+
+
+def test_token_kind_is_checked():
+    queue_token = sign_token({"t": QUEUE, "e": 7, "s": 1, "exp": int(time.time()) + 60})
+    with pytest.raises(AdmissionError, match="Invalid token"):
+        verify_token(queue_token, ADMISSION)
+
+
+def test_expired_token_is_rejected():
+    with pytest.raises(AdmissionError, match="Token expired"):
+        verify_token(_admission(7, ttl=-1), ADMISSION)
+
+
+def test_check_admission(enabled):
+    check_admission(_admission(7), 7)
+
+    with pytest.raises(AdmissionError, match="another event"):
+        check_admission(_admission(7), 8)
+    with pytest.raises(AdmissionError):
+        check_admission(None, 7)
+
+
+def test_check_admission_is_a_no_op_when_disabled(monkeypatch):
+    monkeypatch.setattr(waiting_room_module, "WAITING_ROOM_ENABLED", False)
+    check_admission(None, 7)
+
+
+# --------------------------------
+# Watermark
+# --------------------------------
+def test_burst_is_admitted_then_queued(clock):
+    room = WaitingRoom(admit_rate=2, burst=3)
+    joined = [room.join(7) for _ in range(5)]
+
+    assert [s["admitted"] for s in joined] == [True, True, True, False, False]
+    assert [s["position"] for s in joined] == [0, 0, 0, 1, 2]
+    assert joined[4]["estimated_wait_seconds"] == 1
+    assert "admission_token" not in joined[3]
+    assert verify_token(joined[0]["admission_token"], ADMISSION)["e"] == 7
+    assert room.depth() == {7: 2}
+
+
+def test_watermark_advances_at_admit_rate(clock):
+    room = WaitingRoom(admit_rate=2, burst=1)
+    room.join(7)
+    waiting = [room.join(7) for _ in range(4)]
+
+    clock.now += 1
+    statuses = [room.status(s["queue_token"]) for s in waiting]
+    assert [s["admitted"] for s in statuses] == [True, True, False, False]
+
+    clock.now += 1
+    assert room.status(waiting[3]["queue_token"])["admitted"]
+    assert room.depth() == {7: 0}
+
+
+def test_idle_event_does_not_bank_admissions(clock):
+    room = WaitingRoom(admit_rate=10, burst=2)
+    room.join(7)
+
+    # An hour idle still only admits burst sessions ahead of the queue
+    clock.now += 3600
+    joined = [room.join(7) for _ in range(4)]
+    assert [s["admitted"] for s in joined] == [True, True, False, False]
+
+
+def test_events_queue_independently(clock):
+    room = WaitingRoom(admit_rate=1, burst=1)
+    room.join(7)
+
+    assert not room.join(7)["admitted"]
+    assert room.join(8)["admitted"]
+
+
+def test_queue_token_survives_restart(clock):
+    # Fifth in line when the previous process went away
+    queued = sign_token({"t": QUEUE, "e": 7, "s": 5, "exp": int(time.time()) + 60})
+    room = WaitingRoom(admit_rate=1, burst=1)
+
+    assert room.status(queued)["position"] == 4
+    # Sessions joining after the restart queue behind the old token
+    assert room.join(7)["position"] == 5
+
+
+def test_status_rejects_admission_tokens(clock):
+    with pytest.raises(AdmissionError):
+        WaitingRoom().status(_admission(7))
+
+
+# --------------------------------
+# Checkout endpoints
+# --------------------------------
+class FakeCursor:
+    description = []
+
+    def execute(self, *args):
+        pass
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def cursor(self):
+        return FakeCursor()
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch, enabled):
+    import main
+
+    def create_pending_ticket_issue(data):
+        raise HTTPException(409, "admitted")
+
+    monkeypatch.setattr(main, "get_connection", FakeConnection)
+    monkeypatch.setattr(main, "create_pending_ticket_issue", create_pending_ticket_issue)
+    return TestClient(main.app)
+
+
+ORDER = {
+    "ticket_master_id": 7,
+    "ticket_classification_id": 1,
+    "name": "Guest",
+    "mobile_no": "9876543210",
+    "email_id": "guest@example.com",
+    "ticket_count": 1
+}
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Admission-Token": "bogus"}, {"X-Admission-Token": _admission(8)}])
+def test_checkout_endpoints_require_admission(client, headers):
+    rates = client.get("/getEventTicketRate/7", headers=headers)
+    order = client.post("/ticket/addTicketIssue", json=ORDER, headers=headers)
+
+    assert rates.status_code == 403
+    assert order.status_code == 403
+    assert order.json()["detail"].startswith("Waiting room:")
+
+
+def test_checkout_endpoints_admit_with_token(client):
+    headers = {"X-Admission-Token": _admission(7)}
+
+    rates = client.get("/getEventTicketRate/7", headers=headers)
+    order = client.post("/ticket/addTicketIssue", json=ORDER, headers=headers)
+
+    assert rates.status_code == 200
+    assert (order.status_code, order.json()["detail"]) == (409, "admitted")
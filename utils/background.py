@@ -0,0 +1,68 @@
+import time
+import threading
+from utils.utils import logger
+
+_tasks = []
+
+
+class PeriodicTask:
+    """
+    Runs func every interval_seconds on a daemon thread until stopped.
+    Exceptions are logged and the loop keeps going.
+    """
+
+    def __init__(self, name: str, interval_seconds: float, func):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.running = False
+        self.last_run = None
+        self.last_error = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.running = True
+            try:
+                self.func()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Background task {self.name} failed: {e}")
+            finally:
+                self.running = False
+                self.last_run = time.time()
+
+    def status(self) -> dict:
+        return {
+            "alive": self._thread.is_alive(),
+            "running": self.running,
+            "interval_seconds": self.interval_seconds,
+            "last_run": self.last_run,
+            "last_error": self.last_error
+        }
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+
+def start_periodic_task(name: str, interval_seconds: float, func) -> PeriodicTask:
+    task = PeriodicTask(name, interval_seconds, func)
+    task.start()
+    _tasks.append(task)
+    return task
+
+
+def periodic_task_status() -> dict:
+    return {task.name: task.status() for task in _tasks}
+
+
+def stop_periodic_tasks(timeout: float = 5):
+    while _tasks:
+        _tasks.pop().stop(timeout)
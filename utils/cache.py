@@ -0,0 +1,80 @@
+import time
+import threading
+from collections import OrderedDict
+from utils.single_flight import SingleFlight
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache with per-entry expiry and LRU eviction.
+
+    get_or_load() goes through a SingleFlight, so when an entry expires under
+    load only one caller runs the loader and the rest share its result.
+    A load that overlaps invalidate() is returned but not stored, and None
+    results are never cached.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._flight = SingleFlight()
+        # Bumped by invalidate()/clear(), checked before storing a load
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl: float | None = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key, loader, *args):
+        _missing = object()
+        value = self.get(key, _missing)
+        if value is not _missing:
+            return value
+
+        def load():
+            generation = self._generation
+            value = loader(*args)
+            with self._lock:
+                stale = generation != self._generation
+            if value is not None and not stale:
+                self.set(key, value)
+            return value
+
+        value, _ = self._flight.do(key, load)
+        return value
+
+    def invalidate(self, key) -> bool:
+        with self._lock:
+            self._generation += 1
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,43 @@
+from decimal import Decimal
+import orjson
+from fastapi.responses import Response
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    # Same output as FastAPI's jsonable_encoder for the types pyodbc returns
+    if isinstance(obj, Decimal):
+        return int(obj) if obj.as_tuple().exponent >= 0 else float(obj)
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode("utf-8")
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj) -> bytes:
+    """
+    orjson with Decimal/bytes support. datetime, date and time are
+    encoded natively in ISO format.
+    """
+    return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+
+def rows_to_dicts(cursor, rows) -> list:
+    """
+    pyodbc rows -> list of {column: value}. Values are left as-is (Decimal,
+    datetime, ...) for dumps() to encode in one pass.
+    """
+    columns = tuple(col[0] for col in cursor.description)
+    return [dict(zip(columns, row)) for row in rows]
+
+
+class RawJSONResponse(Response):
+    """
+    Response for bodies already encoded with dumps(). Returning it from an
+    endpoint skips FastAPI's jsonable_encoder pass over the payload.
+    """
+    media_type = "application/json"
+
+
+def json_response(payload, status_code: int = 200, headers: dict | None = None) -> RawJSONResponse:
+    return RawJSONResponse(dumps(payload), status_code=status_code, headers=headers)
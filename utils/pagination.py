@@ -0,0 +1,56 @@
+import base64
+from datetime import date, datetime
+
+MAX_PAGE_SIZE = 200
+
+
+def _encode_value(value) -> str:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(*values) -> str:
+    """
+    Opaque keyset cursor from the sort key of the last row of a page.
+    """
+    raw = "|".join(_encode_value(v) for v in values)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """
+    Inverse of encode_cursor. types are callables parsing each part
+    (int, date.fromisoformat, ...). Raises ValueError for a bad cursor.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        parts = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").split("|")
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+    if len(parts) != len(types):
+        raise ValueError("Invalid cursor")
+
+    try:
+        return tuple(t(p) for t, p in zip(types, parts))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def parse_fields(fields: str | None, allowed: tuple, default: tuple, required: tuple = ()) -> list:
+    """
+    Sparse field selection: "a,b,c" -> columns in allowed order. Required
+    columns (the keyset sort key) are always included.
+    Raises ValueError naming unknown fields.
+    """
+    if not fields:
+        wanted = set(default)
+    else:
+        wanted = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = wanted - set(allowed)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    wanted.update(required)
+    return [column for column in allowed if column in wanted]
@@ -0,0 +1,264 @@
+import hmac
+import base64
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from core.config import settings
+
+# ------------------------------------------------------------------
+# Ticket QR payload
+#
+#   version (1 byte) | varint ticket_issue_id | varint details_id
+#   | varint issued_at (seconds since QR_EPOCH) | tag
+#
+#   v1: tag = HMAC-SHA256(QR_HMAC_KEY, body)[:8]   (server-side check)
+#   v2: tag = Ed25519 signature (64 bytes)         (offline, public key)
+#
+# The bytes are base45 encoded: only QR alphanumeric characters, so the
+# code is stored in alphanumeric mode (5.5 bits/char instead of 8).
+# ------------------------------------------------------------------
+QR_VERSION_HMAC = 1
+QR_VERSION_ED25519 = 2
+QR_EPOCH = 1704067200  # 2024-01-01 UTC
+QR_MAC_SIZE = 8
+QR_SIGNATURE_SIZE = 64
+
+BASE45_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+_BASE45_INDEX = {c: i for i, c in enumerate(BASE45_ALPHABET)}
+
+
+@dataclass(frozen=True)
+class QRPayload:
+    version: int
+    ticket_issue_id: int
+    details_id: int
+    issued_at: int  # unix seconds
+
+
+# -----------------------------
+# Primitives
+# -----------------------------
+def encode_varint(value: int) -> bytes:
+    if value < 0:
+        raise ValueError("varint must be non-negative")
+
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def decode_varint(data: bytes, pos: int) -> tuple:
+    """
+    (value, next position)
+    """
+    value = 0
+    shift = 0
+
+    while True:
+        if pos >= len(data) or shift > 63:
+            raise ValueError("Truncated varint")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def base45_encode(data: bytes) -> str:
+    out = []
+    for i in range(0, len(data) - 1, 2):
+        n = data[i] * 256 + data[i + 1]
+        n, c = divmod(n, 45)
+        e, d = divmod(n, 45)
+        out += (BASE45_ALPHABET[c], BASE45_ALPHABET[d], BASE45_ALPHABET[e])
+
+    if len(data) % 2:
+        d, c = divmod(data[-1], 45)
+        out += (BASE45_ALPHABET[c], BASE45_ALPHABET[d])
+
+    return "".join(out)
+
+
+def base45_decode(text: str) -> bytes:
+    try:
+        values = [_BASE45_INDEX[c] for c in text]
+    except KeyError:
+        raise ValueError("Invalid base45 character")
+
+    if len(values) % 3 == 1:
+        raise ValueError("Invalid base45 length")
+
+    out = bytearray()
+    for i in range(0, len(values), 3):
+        chunk = values[i:i + 3]
+        if len(chunk) == 3:
+            n = chunk[0] + chunk[1] * 45 + chunk[2] * 2025
+            if n > 0xFFFF:
+                raise ValueError("Invalid base45 group")
+            out += n.to_bytes(2, "big")
+        else:
+            n = chunk[0] + chunk[1] * 45
+            if n > 0xFF:
+                raise ValueError("Invalid base45 group")
+            out.append(n)
+
+    return bytes(out)
+
+
+def is_compact_payload(text: str) -> bool:
+    return bool(text) and all(c in _BASE45_INDEX for c in text)
+
+
+# -----------------------------
+# Keys
+# -----------------------------
+@lru_cache
+def _mac_key() -> bytes:
+    if settings.qr_hmac_key:
+        return settings.qr_hmac_key
+    # Derived from the AES key so existing deployments work without a new secret
+    return hmac.new(settings.encryption_key, b"ticket-qr-mac", hashlib.sha256).digest()
+
+
+@lru_cache
+def _signing_key():
+    """
+    Ed25519 private key from QR_SIGNING_KEY (base64 32-byte seed), or None.
+    """
+    if not settings.qr_signing_key:
+        return None
+
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+    return Ed25519PrivateKey.from_private_bytes(base64.b64decode(settings.qr_signing_key))
+
+
+@lru_cache
+def _verify_key():
+    private_key = _signing_key()
+    return private_key.public_key() if private_key else None
+
+
+def public_key_bytes() -> bytes | None:
+    """
+    Raw 32-byte Ed25519 public key scanners use to verify v2 payloads.
+    """
+    from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+
+    key = _verify_key()
+    return key.public_bytes(Encoding.Raw, PublicFormat.Raw) if key else None
+
+
+def default_version() -> int:
+    return QR_VERSION_ED25519 if settings.qr_signing_key else QR_VERSION_HMAC
+
+
+def new_mac():
+    """
+    Keyed HMAC state; copy() it per payload instead of re-keying.
+    """
+    return hmac.new(_mac_key(), digestmod=hashlib.sha256)
+
+
+def _mac(body: bytes, template=None) -> bytes:
+    mac = (template or new_mac()).copy()
+    mac.update(body)
+    return mac.digest()[:QR_MAC_SIZE]
+
+
+# -----------------------------
+# Codec
+# -----------------------------
+def encode_qr_payload(
+    ticket_issue_id: int,
+    details_id: int,
+    issued_at: int | None = None,
+    version: int | None = None
+) -> str:
+    """
+    Signed, base45 encoded ticket QR payload.
+    """
+    version = version or default_version()
+    if issued_at is None:
+        issued_at = int(datetime.utcnow().timestamp())
+
+    body = (
+        bytes([version])
+        + encode_varint(int(ticket_issue_id))
+        + encode_varint(int(details_id))
+        + encode_varint(max(0, int(issued_at) - QR_EPOCH))
+    )
+
+    if version == QR_VERSION_HMAC:
+        tag = _mac(body)
+    elif version == QR_VERSION_ED25519:
+        key = _signing_key()
+        if key is None:
+            raise RuntimeError("QR_SIGNING_KEY is not set in environment")
+        tag = key.sign(body)
+    else:
+        raise ValueError(f"Unknown QR payload version {version}")
+
+    return base45_encode(body + tag)
+
+
+def parse_qr_bytes(data: bytes) -> tuple:
+    """
+    (version, ticket_issue_id, details_id, issued_at, body_size) of raw
+    payload bytes, without verifying the tag.
+    """
+    if not data:
+        raise ValueError("Empty QR payload")
+
+    version = data[0]
+    if version == QR_VERSION_HMAC:
+        tag_size = QR_MAC_SIZE
+    elif version == QR_VERSION_ED25519:
+        tag_size = QR_SIGNATURE_SIZE
+    else:
+        raise ValueError(f"Unknown QR payload version {version}")
+
+    ticket_issue_id, pos = decode_varint(data, 1)
+    details_id, pos = decode_varint(data, pos)
+    issued_at, pos = decode_varint(data, pos)
+
+    if len(data) - pos != tag_size:
+        raise ValueError("Invalid QR payload length")
+
+    return version, ticket_issue_id, details_id, issued_at + QR_EPOCH, pos
+
+
+def verify_qr_tag(version: int, body: bytes, tag: bytes, mac_template=None) -> bool:
+    if version == QR_VERSION_HMAC:
+        return hmac.compare_digest(tag, _mac(body, mac_template))
+
+    key = _verify_key()
+    if key is None:
+        raise ValueError("No QR verification key configured")
+
+    from cryptography.exceptions import InvalidSignature
+
+    try:
+        key.verify(tag, body)
+        return True
+    except InvalidSignature:
+        return False
+
+
+def decode_qr_payload(text: str, verify: bool = True) -> QRPayload:
+    """
+    Parses (and by default verifies) a payload from encode_qr_payload.
+    Raises ValueError for malformed, unknown or tampered payloads.
+    """
+    data = base45_decode(text)
+    version, ticket_issue_id, details_id, issued_at, body_size = parse_qr_bytes(data)
+
+    if verify and not verify_qr_tag(version, data[:body_size], data[body_size:]):
+        raise ValueError("Invalid or tampered QR code")
+
+    return QRPayload(version, ticket_issue_id, details_id, issued_at)
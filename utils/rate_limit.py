@@ -0,0 +1,32 @@
+import time
+import threading
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket: rate tokens per second, up to burst banked.
+    acquire() blocks until a token is available, so a pool of workers
+    sharing one limiter never exceeds the provider's send rate.
+    """
+
+    def __init__(self, rate: float, burst: int | None = None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
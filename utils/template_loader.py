@@ -1,5 +1,4 @@
 from pathlib import Path
-from jinja2 import Template
 
 # Points to /akadit/app
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -10,6 +9,8 @@ def render_html_template(template_path: str, context: dict) -> str:
     template_path example:
     'templates/ticket_mail.html'
     """
+    from jinja2 import Template
+
     full_path = BASE_DIR / template_path
 
     if not full_path.exists():
@@ -1,17 +1,19 @@
-import os
 import base64
+import binascii
 import logging
-from dotenv import load_dotenv
-from datetime import datetime
-from Crypto.Cipher import AES
-
-load_dotenv()
+from array import array
+from dataclasses import dataclass
+from core.config import settings
+from utils.qr_codec import (
+    QRPayload, base45_decode, decode_qr_payload, encode_qr_payload,
+    is_compact_payload, new_mac, parse_qr_bytes, verify_qr_tag
+)
 
 # -----------------------------
 # LOGGING (SAFE & CORRECT)
 # -----------------------------
-LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
-ENCRPYTION_KEY = os.getenv("ENCRYPTION_KEY", "ThisIsA16ByteKey!")[:16].encode("utf-8")
+LOG_LEVEL = settings.log_level
+ENCRYPTION_KEY = settings.encryption_key
 
 logging.basicConfig(
     level=getattr(logging, LOG_LEVEL, logging.INFO),
@@ -21,82 +23,163 @@ logging.basicConfig(
 logger = logging.getLogger("ticket-system")
 
 # -----------------------------
-# ENCRYPT / DECRYPT (QR PAYLOAD)
+# QR PAYLOAD
 # -----------------------------
-def encrypt_qr_data(data: str) -> str:
+def generate_qr_string(ticket_issue_id: int, details_id: int) -> str:
     """
-    Simple reversible encryption for QR payload.
-    Used only for obfuscation + tamper detection.
+    Creates the signed QR payload to store in DB (see utils.qr_codec)
     """
-
-    key = os.getenv("ENCRPYTION_KEY")
-    if not key:
-        raise RuntimeError("ENCRPYTION_KEY is not set in environment")
-
-    payload = f"{data}|{key}"
-    encoded = base64.urlsafe_b64encode(payload.encode("utf-8")).decode("utf-8")
-    return encoded
+    return encode_qr_payload(ticket_issue_id, details_id)
 
 
-def decrypt_qr_data(encoded_data: str) -> str:
+def decrypt_qr_data(encrypted_data: str) -> str:
     """
-    Decrypt and validate QR payload.
-    Returns original data if valid.
+    Legacy AES-ECB payload ("ticket_issue_id|details_id|ts") of tickets
+    issued before the compact codec.
     """
+    from Crypto.Cipher import AES
 
     try:
-        decoded_bytes = base64.urlsafe_b64decode(encoded_data.encode("utf-8"))
-        decoded_str = decoded_bytes.decode("utf-8")
-    except Exception:
-        logger.error("QR decode failed: Invalid Base64")
-        raise ValueError("Invalid QR format")
+        # Step 1: Base64 decode
+        encrypted_bytes = base64.b64decode(encrypted_data)
+
+        # Step 2: AES decrypt
+        cipher = AES.new(ENCRYPTION_KEY, AES.MODE_ECB)
+        decrypted = cipher.decrypt(encrypted_bytes)
 
-    if "|" not in decoded_str:
-        logger.error("QR decode failed: Invalid payload structure")
-        raise ValueError("Invalid QR payload")
+        # Step 3: Remove padding
+        decoded = decrypted.decode("utf-8").rstrip(" ")
 
-    data, key = decoded_str.rsplit("|", 1)
-    expected_key = os.getenv("ENCRPYTION_KEY")
+        return decoded
 
-    if key != expected_key:
-        logger.warning("QR validation failed: Key mismatch")
-        raise ValueError("Invalid or tampered QR code")
+    except Exception as e:
+        logger.error(f"QR decode failed: {e}")
+        raise ValueError("Invalid QR code")
 
-    return data
 
-def generate_qr_string(ticket_issue_id: int, details_id: int) -> str:
+def decode_ticket_qr(qr_code: str) -> QRPayload:
     """
-    Creates encrypted QR payload to store in DB
+    Verified payload of a scanned ticket QR, compact or legacy AES.
+    Raises ValueError when it is invalid.
     """
-    raw_payload = f"{ticket_issue_id}|{details_id}|{int(datetime.utcnow().timestamp())}"
+    # Not strip(): space is a base45 character
+    qr_code = qr_code.strip("\r\n\t")
 
-    cipher = AES.new(ENCRPYTION_KEY, AES.MODE_ECB)
+    if is_compact_payload(qr_code):
+        try:
+            return decode_qr_payload(qr_code)
+        except ValueError as e:
+            logger.warning(f"QR validation failed: {e}")
+            raise
 
-    padded_data = raw_payload.encode("utf-8")
-    padded_data += b" " * (16 - len(padded_data) % 16)
+    decoded = decrypt_qr_data(qr_code)
 
-    encrypted = cipher.encrypt(padded_data)
+    try:
+        ticket_issue_id, details_id, ts = decoded.split("|")
+        return QRPayload(0, int(ticket_issue_id), int(details_id), int(ts))
+    except Exception:
+        raise ValueError("Invalid QR code format")
 
-    return base64.b64encode(encrypted).decode("utf-8")
 
-logger = logging.getLogger("ticket-system")
+# -----------------------------
+# BATCH QR DECODE
+# -----------------------------
+QR_STATUS_OK = 0
+QR_STATUS_MALFORMED = 1
+QR_STATUS_TAMPERED = 2
 
-ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY", "ThisIsA16ByteKey!")[:16].encode("utf-8")
 
-def decrypt_qr_data(encrypted_data: str) -> str:
-    try:
-        # Step 1: Base64 decode
-        encrypted_bytes = base64.b64decode(encrypted_data)
+@dataclass
+class QRBatch:
+    """
+    Column arrays, one entry per input code. Ids/timestamp are 0 unless
+    status is QR_STATUS_OK.
+    """
+    ticket_issue_id: array
+    details_id: array
+    issued_at: array
+    status: array
 
-        # Step 2: AES decrypt
-        cipher = AES.new(ENCRYPTION_KEY, AES.MODE_ECB)
-        decrypted = cipher.decrypt(encrypted_bytes)
+    def __len__(self):
+        return len(self.status)
 
-        # Step 3: Remove padding
-        decoded = decrypted.decode("utf-8").rstrip(" ")
+    def rows(self):
+        return zip(self.ticket_issue_id, self.details_id, self.issued_at, self.status)
 
-        return decoded
 
-    except Exception as e:
-        logger.error(f"QR decode failed: {e}")
-        raise ValueError("Invalid QR code")
\ No newline at end of file
+def decode_qr_batch(qr_codes: list) -> QRBatch:
+    """
+    decode_ticket_qr over many codes (manifests, batch scans). Results go
+    into preallocated arrays; the HMAC key state is built once and all
+    legacy AES codes are decrypted in one ECB call. Bad codes only set
+    their status, nothing is raised or logged per code.
+    """
+    n = len(qr_codes)
+    batch = QRBatch(
+        array("q", bytes(8 * n)),
+        array("q", bytes(8 * n)),
+        array("q", bytes(8 * n)),
+        array("b", bytes(n))
+    )
+
+    mac_template = new_mac()
+    legacy_index = []
+    legacy_blocks = []
+
+    for i, qr_code in enumerate(qr_codes):
+        qr_code = (qr_code or "").strip("\r\n\t")
+
+        if not is_compact_payload(qr_code):
+            try:
+                encrypted = base64.b64decode(qr_code, validate=True)
+            except (binascii.Error, ValueError):
+                encrypted = b""
+
+            if encrypted and len(encrypted) % 16 == 0:
+                legacy_index.append(i)
+                legacy_blocks.append(encrypted)
+            else:
+                batch.status[i] = QR_STATUS_MALFORMED
+            continue
+
+        try:
+            data = base45_decode(qr_code)
+            version, ticket_issue_id, details_id, issued_at, body_size = parse_qr_bytes(data)
+        except ValueError:
+            batch.status[i] = QR_STATUS_MALFORMED
+            continue
+
+        try:
+            valid = verify_qr_tag(version, data[:body_size], data[body_size:], mac_template)
+        except ValueError:
+            valid = False
+
+        if not valid:
+            batch.status[i] = QR_STATUS_TAMPERED
+            continue
+
+        batch.ticket_issue_id[i] = ticket_issue_id
+        batch.details_id[i] = details_id
+        batch.issued_at[i] = issued_at
+
+    if legacy_blocks:
+        from Crypto.Cipher import AES
+
+        # ECB blocks are independent: one call for the whole batch
+        decrypted = AES.new(ENCRYPTION_KEY, AES.MODE_ECB).decrypt(b"".join(legacy_blocks))
+        offset = 0
+
+        for i, encrypted in zip(legacy_index, legacy_blocks):
+            plain = decrypted[offset:offset + len(encrypted)]
+            offset += len(encrypted)
+
+            try:
+                ticket_issue_id, details_id, ts = plain.decode("utf-8").rstrip(" ").split("|")
+                batch.ticket_issue_id[i] = int(ticket_issue_id)
+                batch.details_id[i] = int(details_id)
+                batch.issued_at[i] = int(ts)
+            except (UnicodeDecodeError, ValueError, OverflowError):
+                batch.ticket_issue_id[i] = batch.details_id[i] = batch.issued_at[i] = 0
+                batch.status[i] = QR_STATUS_MALFORMED
+
+    return batch